@@ -1,4 +1,8 @@
+import argparse
+import time
+from datetime import datetime, timezone
 from pathlib import Path
+
 import pandas as pd
 
 from src.data_loader import (
@@ -11,113 +15,542 @@ from src.data_loader import (
     build_data_before_engineering,
     build_team_rolling_features,
     build_match_level_features,
+    build_partitioned,
+    build_partitioned_from_store,
+    ingest_streaming,
+    join_report,
+    load_model_data_from_store,
+    STREAM_CHUNK_ROWS,
+)
+from src.models import (
+    evaluate_bookmaker,
+    evaluate_permutation_importance,
+    train_models,
+    write_results_summary,
 )
-from src.models import evaluate_bookmaker, train_models
 
-from src.probabilistic_evaluation import run_probabilistic_evaluation
+from src.probabilistic_evaluation import BOOK_COLUMNS, bookmaker_probabilities, run_probabilistic_evaluation
 
 from src.statistics_analysis import run_stats
 
+from src.rendering import set_plots_enabled, wait_for_figures
 
+from src import prediction_history, run_registry
 
+from src.profiling import PROFILE_DIR, StageProfiler
 
-def main():
-    print("""
-    =================================================
-    - EPL MATCH OUTCOME PREDICTION -
-    -------------------------------------------------
-    This script:
-    1. Builds a clean match-level dataset
-    2. Engineers rolling team features
-    3. Trains ML models (LogReg, RF)
-    4. Compares predictions to bookmaker odds
-    =================================================
-    """)
+from src.schema import memory_report
 
+from src.dataset_store import STORE_DIR, export_csv, load_dataset, read_manifest, write_dataset
 
-    Path("data/processed").mkdir(parents=True, exist_ok=True)
-    Path("results").mkdir(parents=True, exist_ok=True)
+from src.feature_store import FEATURE_METRICS, KEY_COLS, SORT_KEYS, build_feature_store
 
+from src.ratings import MATCH_COLUMNS, RATINGS_PATH, add_rating_features, save_ratings
 
-    print("▶ Step 1: build matchdata_base.csv")
-    df_base = load_raw()
-    df_base.to_csv("data/processed/matchdata_base.csv", index=False)
-    print("matchdata_base.csv done")
+from src.scoreline import evaluate_dixon_coles
 
+from src.online import run_online_evaluation
 
-    print("▶ Step 2: build matchdata_clean.csv")
-    df_loaded = load_base()
-    home, away = prepare_home_away(df_loaded)
-    df_clean = pivot_matches(home, away)
-    df_clean.to_csv("data/processed/matchdata_clean.csv", index=False)
-    print("matchdata_clean.csv done")
+from src.feature_matrix import run_backtest
 
- 
-    print("▶ Step 3: build all_matches_clean.csv")
-    df_all = build_all()
-    df_all.to_csv("data/processed/all_matches_clean.csv", index=False)
-    print("all_matches_clean.csv done")
+from src.season_simulator import DEFAULT_SIMULATIONS, run_season_simulation
 
+from src.dates import parse_dates
 
-    print("▶ Step 4: merge datasets")
-    df_merged = merge_dataset(df_clean, df_all)
-    df_merged.to_csv("data/processed/data_merged.csv", index=False)
-    print("data_merged.csv done")
+from src.dag import DEFAULT_JOBS, run_stages, run_summary, stage
 
+from src.watch import WATCH_INTERVAL_S, watch
 
-    print("▶ Step 5: team-level table")
-    df_before = build_data_before_engineering(df_merged)
 
-    df_before.to_csv(
-        "data/processed/data_before_engineering.csv",
-        index=False
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="EPL match outcome prediction pipeline")
+    parser.add_argument(
+        "--no-plots",
+        action="store_true",
+        help="headless mode: skip all figure rendering (metrics and reports are still written)",
     )
-    print("data_before_engineering.csv done")
-
-
-
-    print("▶ Step 6: rolling features")
-    df_after = build_team_rolling_features(df_before)
-
-    df_after.to_csv(
-        "data/processed/data_after_engineering.csv",
-        index=False
+    parser.add_argument(
+        "--no-registry",
+        action="store_true",
+        help="do not record this run in results/run_registry.sqlite and results/prediction_history.sqlite",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="record tracemalloc peak allocations per stage in the profile (slower)",
+    )
+    parser.add_argument(
+        "--cprofile",
+        action="store_true",
+        help="write a cProfile dump per stage to results/profiles/cprofile/",
+    )
+    parser.add_argument(
+        "--partitioned",
+        action="store_true",
+        help="build steps 2-7 per (league, season) partition in a process pool",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="stream raw files into the partitioned store in chunks, then build per partition",
     )
-    print("data_after_engineering.csv done")
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=STREAM_CHUNK_ROWS,
+        help="rows read per chunk with --stream",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="worker processes for --partitioned/--stream, the backtest and the season simulation (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--seasons",
+        type=int,
+        nargs="+",
+        default=None,
+        help="train and evaluate on these seasons only (end years, e.g. 2024 2025)",
+    )
+    parser.add_argument(
+        "--simulations",
+        type=int,
+        default=DEFAULT_SIMULATIONS,
+        help="Monte Carlo runs of the rest of the latest season (0 skips the simulation)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help="pipeline stages run at the same time (1 runs them in sequence)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running: rebuild the partitions, datasets and predictions affected by changes in data/raw",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=WATCH_INTERVAL_S,
+        help="seconds between checks of data/raw in --watch mode",
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
+        "--until",
+        nargs="+",
+        metavar="STAGE",
+        help="run these stages and the stages they depend on (e.g. build_all train_models)",
+    )
+    target.add_argument(
+        "--only",
+        nargs="+",
+        metavar="STAGE",
+        help="run only these stages, reading their inputs from the saved processed datasets",
+    )
+    return parser.parse_args(argv)
 
 
+def record_run(args, df_test, log_model, rf_model, metrics, book_metrics, test_proba):
+    """
+    Record config, data fingerprint, metrics and per-match test-set
+    probabilities of this run in the run registry.
 
-    print("▶ Step 7: final ML dataset")
-    df_model = build_match_level_features(df_after)
-    df_model.to_csv("data/processed/model_data.csv", index=False)
-    print("model_data.csv done")
+    The model probabilities are those train_models() computed (test_proba),
+    aligned to df_test by match_id.
+    """
+    config = {
+        "train_fraction": 0.8,
+        "n_test": len(df_test),
+        "no_plots": args.no_plots,
+        "features": df_test.filter(regex="^diff_").columns.tolist(),
+        "log_reg": log_model.named_steps["clf"].get_params(),
+        "rf": rf_model.get_params(),
+    }
+    data_hash = run_registry.hash_files(Path("data/raw").glob("*.csv"))
+    run_id = run_registry.start_run(config, data_hash)
+
+    book = pd.DataFrame(bookmaker_probabilities(df_test))[BOOK_COLUMNS]
+
+    run_registry.log_metrics(run_id, "bookmaker", book_metrics)
+    run_registry.log_predictions(run_id, "bookmaker", df_test, book.to_numpy())
+
+    for name in ["log_reg", "rf"]:
+        run_registry.log_metrics(run_id, name, metrics[name])
+        run_registry.log_predictions(run_id, name, df_test, test_proba[name].loc[df_test["match_id"]].to_numpy())
+
+    if "dixon_coles" in metrics:
+        run_registry.log_metrics(run_id, "dixon_coles", metrics["dixon_coles"])
+
+    return run_id
+
+
+
+PROCESSED_DIR = Path("data/processed")
+
+
+def read_processed(name):
+    """
+    Read a processed dataset saved by an earlier run (used by --only).
+    """
+    df = pd.read_csv(PROCESSED_DIR / f"{name}.csv")
+    df["match_date"] = parse_dates(df["match_date"])
+    return df
+
+
+def build_stages(args):
+    """
+    The pipeline as a stage graph (see src.dag).
+
+    Steps 1-7 depend on the build mode (serial, --partitioned or --stream);
+    from step 7a on, the graph is the same. Stages only wait for the stages
+    whose outputs they use, e.g. the odds files (step 3) are loaded while the
+    team statistics (steps 1-2) are cleaned, and the bookmaker baseline,
+    the Dixon-Coles model and the probabilistic evaluation run alongside
+    model training.
+
+    Args:
+        args (argparse.Namespace): Parsed command line.
+
+    Returns:
+        list[dict]: Stage definitions in dependency order.
+    """
+    def save_csv(df, name):
+        df.to_csv(PROCESSED_DIR / f"{name}.csv", index=False)
+        write_dataset(df, name)
+        print(f"{name}.csv done")
+
+    def save(dep, name):
+        # CSV + store writes run alongside the stages that use dep; with
+        # --only, a stage after a save reads the file an earlier run saved
+        return stage(f"save_{name}", lambda df: save_csv(df, name), deps=[dep], load=lambda: None)
+
+    def processed(name):
+        return lambda: read_processed(name)
+
+    stages = []
+
+    # ---------- steps 1-7: processed datasets ----------
+
+    if args.stream:
+        def ingest():
+            manifests = ingest_streaming(chunksize=args.chunk_rows)
+            for name, manifest in manifests.items():
+                rows = sum(p["rows"] for p in manifest["partitions"])
+                print(f"{name}: {rows} rows in {len(manifest['partitions'])} partitions")
+            return manifests
+
+        def export_store(manifests):
+            # one partition in memory at a time; model_data is saved after step 7a
+            for name in manifests:
+                if name != "model_data":
+                    export_csv(name, PROCESSED_DIR / f"{name}.csv")
+            print(f"{len(manifests) - 1} datasets exported from {STORE_DIR}/ partition by partition")
+
+        def match_results():
+            return load_dataset("data_merged", columns=MATCH_COLUMNS + ["league"])
+
+        def team_table():
+            needed = set(KEY_COLS) | set(SORT_KEYS) | set(FEATURE_METRICS)
+            columns = [c for c in read_manifest("data_before_engineering")["columns"] if c in needed]
+            return load_dataset("data_before_engineering", columns=columns)
+
+        parts = "build_partitioned_from_store"
+        stages += [
+            stage("ingest_streaming", ingest, title="Step 1: stream raw files into the partitioned store"),
+            stage(
+                parts,
+                lambda _: build_partitioned_from_store(max_workers=args.workers),
+                deps=["ingest_streaming"],
+                title="Steps 2-7: build datasets per (league, season) partition into the store",
+            ),
+            stage("save_partitioned", export_store, deps=[parts]),
+            # downstream stages read the store back, pruned to the columns they use
+            stage("load_match_results", lambda _: match_results(), deps=[parts], load=match_results),
+            stage("load_team_table", lambda _: team_table(), deps=[parts], load=team_table),
+            stage("load_model_data", lambda _: load_model_data_from_store(), deps=[parts]),
+        ]
+
+        merged = "load_match_results"
+        before = "load_team_table"
+        model = "load_model_data"
+    elif args.partitioned:
+        def save_parts(parts):
+            for name, df in parts.items():
+                if name != "model_data":
+                    save_csv(df, name)
+            print(f"{len(parts)} datasets built from partitioned outputs")
+
+        stages += [
+            stage("load_raw", load_raw, title="Step 1: build matchdata_base.csv", load=load_base),
+            save("load_raw", "matchdata_base"),
+            stage(
+                "build_partitioned",
+                lambda base: build_partitioned(base, max_workers=args.workers),
+                deps=["load_raw"],
+                title="Steps 2-7: build datasets per (league, season) partition",
+            ),
+            stage("save_partitioned", save_parts, deps=["build_partitioned"]),
+        ]
+
+        merged = ("build_partitioned", "data_merged")
+        before = ("build_partitioned", "data_before_engineering")
+        model = ("build_partitioned", "model_data")
+    else:
+        def clean_matches(_):
+            # reads matchdata_base.csv back, as the CSV round trip fixes its dtypes
+            return pivot_matches(*prepare_home_away(load_base()))
+
+        stages += [
+            stage("load_raw", load_raw, title="Step 1: build matchdata_base.csv", load=load_base),
+            save("load_raw", "matchdata_base"),
+            stage(
+                "pivot_matches", clean_matches, deps=["save_matchdata_base"],
+                title="Step 2: build matchdata_clean.csv", load=processed("matchdata_clean"),
+            ),
+            save("pivot_matches", "matchdata_clean"),
+            stage(
+                "build_all", build_all,
+                title="Step 3: build all_matches_clean.csv", load=processed("all_matches_clean"),
+            ),
+            save("build_all", "all_matches_clean"),
+            stage(
+                "merge_dataset", merge_dataset, deps=["pivot_matches", "build_all"],
+                title="Step 4: merge datasets", load=processed("data_merged"),
+            ),
+            save("merge_dataset", "data_merged"),
+            stage(
+                "build_data_before_engineering", build_data_before_engineering, deps=["merge_dataset"],
+                title="Step 5: team-level table", load=processed("data_before_engineering"),
+            ),
+            save("build_data_before_engineering", "data_before_engineering"),
+            stage(
+                "build_team_rolling_features", build_team_rolling_features,
+                deps=["build_data_before_engineering"],
+                title="Step 6: rolling features", load=processed("data_after_engineering"),
+            ),
+            save("build_team_rolling_features", "data_after_engineering"),
+            stage(
+                "build_match_level_features", build_match_level_features,
+                deps=["build_team_rolling_features"], title="Step 7: final ML dataset",
+            ),
+        ]
+        merged = "merge_dataset"
+        before = "build_data_before_engineering"
+        model = "build_match_level_features"
+
+    # ---------- steps 7a-7b: ratings and feature store ----------
+
+    def add_ratings(df_model, df_merged):
+        df_model, ratings = add_rating_features(df_model, df_merged)
+        save_ratings(ratings)
+        print(f"Ratings of {len(ratings['teams'])} teams as of {ratings['as_of']} saved to {RATINGS_PATH}")
+        return df_model
+
+    def feature_store(df_before):
+        df_features = build_feature_store(df_before)
+        write_dataset(df_features, "team_features")
+        print(f"{df_features.shape[1]} columns saved to {STORE_DIR}/team_features/")
+
+    def reports(*_):
+        print("\nIn-memory frame sizes (default dtypes -> compact schema, MB)")
+        print(memory_report(reset=True).round(2).to_string(index=False))
+        print("\nJoin diagnostics (rows whose match key is unmatched or duplicated)")
+        print(join_report(reset=True).to_string(index=False))
+        print(f"Partitioned copies saved to {STORE_DIR}/")
+
+    stages += [
+        stage(
+            "add_rating_features", add_ratings, deps=[model, merged],
+            title="Step 7a: Elo team ratings", load=processed("model_data"),
+        ),
+        save("add_rating_features", "model_data"),
+        stage(
+            "build_feature_store", feature_store, deps=[before],
+            title="Step 7b: multi-window team feature store",
+        ),
+        stage(
+            "reports", reports,
+            deps=[s["name"] for s in stages if s["name"].startswith("save_")]
+            + ["save_model_data", "build_feature_store"],
+        ),
+    ]
+
+    # ---------- steps 8-12: models and evaluation ----------
+
+    def select_seasons(df_model, _):
+        if args.seasons:
+            df_model = load_dataset("model_data", seasons=args.seasons)
+            print(f"Restricted to seasons {args.seasons}: {len(df_model)} matches")
+        return df_model
+
+    def bookmaker(df_model):
+        split_idx = int(len(df_model) * 0.8)
+        return evaluate_bookmaker(df_model.iloc[split_idx:].reset_index(drop=True))
+
+    def split(df_model):
+        df_model = df_model.assign(match_date=parse_dates(df_model["match_date"]))
+        df_model = df_model.sort_values("match_date").reset_index(drop=True)
+        df_model = df_model.dropna().reset_index(drop=True)
+        split_idx = int(len(df_model) * 0.8)
+        return {"model": df_model, "test": df_model.iloc[split_idx:].reset_index(drop=True)}
+
+    def train(df_model):
+        return train_models(df_model, write_summary=False)
+
+    def summary(trained, book_metrics, dc_metrics):
+        metrics = trained[2]
+        metrics["dixon_coles"] = dc_metrics
+        write_results_summary(metrics, book_metrics)
+        return metrics
+
+    def record_predictions(trained, df_test, df_merged):
+        log_model, rf_model, _, test_proba = trained
+        teams = df_merged[["match_id", "home_team", "away_team"]].drop_duplicates("match_id")
+        df_test = df_test.merge(teams, on="match_id", how="left")
+        predicted_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        added = sum(
+            prediction_history.append_predictions(
+                df_test, name, prediction_history.model_version(name, model),
+                test_proba[name].loc[df_test["match_id"]].to_numpy(), prediction_time=predicted_at,
+            )
+            for name, model in [("log_reg", log_model), ("rf", rf_model)]
+        )
+        print(f"{added} predictions appended to {prediction_history.HISTORY_PATH}")
+
+    def record(trained, metrics, book_metrics, df_test):
+        log_model, rf_model, _, test_proba = trained
+        run_id = record_run(args, df_test, log_model, rf_model, metrics, book_metrics, test_proba)
+        print(f"Run {run_id} recorded in {run_registry.REGISTRY_PATH}")
+        return run_id
+
+    stages += [
+        # --seasons reads the saved model_data partitions
+        stage("select_seasons", select_seasons, deps=["add_rating_features", "save_model_data"]),
+        stage(
+            "evaluate_bookmaker", bookmaker, deps=["select_seasons"],
+            title="Step 8: bookmaker baseline evaluation",
+        ),
+        stage(
+            "split_train_test", split, deps=["select_seasons"],
+            load=lambda: split(select_seasons(read_processed("model_data"), None)),
+        ),
+        stage(
+            "train_models", train, deps=[("split_train_test", "model")],
+            title="Step 9: training ML models",
+        ),
+        stage(
+            "evaluate_dixon_coles", evaluate_dixon_coles, deps=[merged, ("split_train_test", "test")],
+            title="Step 9b: Dixon-Coles scoreline model",
+        ),
+        stage(
+            "permutation_importance",
+            lambda trained, df_model: evaluate_permutation_importance(
+                df_model, *trained[:2], test_proba=trained[3]
+            ),
+            deps=["train_models", ("split_train_test", "model")],
+            title="Step 9c: permutation feature importance",
+        ),
+        stage(
+            "online_walk_forward", run_online_evaluation, deps=[("split_train_test", "model")],
+            title="Step 9d: online logistic regression, updated per matchweek",
+        ),
+        stage(
+            "backtest",
+            lambda df_model: run_backtest(df_model, max_workers=args.workers),
+            deps=[("split_train_test", "model")],
+            title="Step 9e: walk-forward backtest on the memory-mapped feature matrix",
+        ),
+        stage(
+            "write_results_summary", summary,
+            deps=["train_models", "evaluate_bookmaker", "evaluate_dixon_coles"],
+        ),
+    ]
+    if not args.no_registry:
+        stages += [
+            stage(
+                "record_run", record,
+                deps=["train_models", "write_results_summary", "evaluate_bookmaker", ("split_train_test", "test")],
+            ),
+            stage(
+                "record_predictions", record_predictions,
+                deps=["train_models", ("split_train_test", "test"), merged],
+            ),
+        ]
+
+    stages += [
+        stage(
+            "run_probabilistic_evaluation", lambda _: run_probabilistic_evaluation(),
+            deps=["save_model_data"],
+            # run_stats reads the comparison CSV an earlier run wrote
+            load=lambda: None,
+            title="Step 10: probabilistic model vs bookmaker evaluation",
+        ),
+        stage(
+            "run_stats", lambda _: run_stats(), deps=["run_probabilistic_evaluation"],
+            title="Step 11: stats + plots on probabilistic comparison",
+        ),
+    ]
+    if args.simulations:
+        stages.append(stage(
+            "run_season_simulation",
+            lambda df_merged: run_season_simulation(
+                df_merged, n_sims=args.simulations, max_workers=args.workers
+            ),
+            deps=[merged],
+            title="Step 12: season simulation (league table probabilities)",
+        ))
+
+    return stages
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.no_plots:
+        set_plots_enabled(False)
 
-    print("\n▶ Step 8: bookmaker baseline evaluation")
-    split_idx = int(len(df_model) * 0.8)
-    df_test = df_model.iloc[split_idx:].reset_index(drop=True)
-    book_metrics = evaluate_bookmaker(df_test)
+    print("""
+    =================================================
+    - EPL MATCH OUTCOME PREDICTION -
+    -------------------------------------------------
+    This script:
+    1. Builds a clean match-level dataset
+    2. Engineers rolling team features
+    3. Trains ML models (LogReg, RF)
+    4. Compares predictions to bookmaker odds
+    =================================================
+    """)
 
-    
-    print("\n▶ Step 9: training ML models")
 
-    df_model["match_date"] = pd.to_datetime(df_model["match_date"])
-    df_model = df_model.sort_values("match_date").reset_index(drop=True)
-    df_model = df_model.dropna().reset_index(drop=True)
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    Path("results").mkdir(parents=True, exist_ok=True)
 
-    log_model, rf_model, metrics = train_models(df_model, book_metrics)
+    prof = StageProfiler(
+        trace_memory=args.trace_memory,
+        cprofile_dir=PROFILE_DIR / "cprofile" if args.cprofile else None,
+    )
 
-    Path("results").mkdir(exist_ok=True)
+    if args.watch:
+        watch(interval=args.watch_interval, max_workers=args.workers)
+        return
 
-    split_idx = int(len(df_model) * 0.8)
-    df_test = df_model.iloc[split_idx:].reset_index(drop=True)
+    # per-stage memory peaks and cProfile dumps need stages to run one at a time
+    jobs = 1 if args.trace_memory or args.cprofile else args.jobs
 
+    stages = build_stages(args)
+    stats = {}
+    _, wall_s = run_stages(stages, until=args.until, only=args.only, max_workers=jobs, prof=prof, stats=stats)
 
-    print("\n▶ Step 10: probabilistic model vs bookmaker evaluation")
-    run_probabilistic_evaluation()
+    n_figures = prof.call("wait_for_figures", wait_for_figures)
+    if n_figures:
+        print(f"{n_figures} figures saved to results/visualisation/")
 
-    print("\n▶ Step 11: stats + plots on probabilistic comparison")
-    run_stats()
+    profile_path = prof.write()
+    print(f"\nStage profile saved to {profile_path}")
+    print(prof.summary()[["stage", "wall_s", "cpu_s", "rows_in", "rows_out"]].to_string(index=False, na_rep="-"))
 
+    print(f"\n{run_summary(stages, wall_s, stats)}")
 
     print("PIPELINE FINISHED SUCCESSFULLY")
 
@@ -0,0 +1,162 @@
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_loader import (
+    load_raw,
+    load_base,
+    prepare_home_away,
+    pivot_matches,
+    build_all,
+    merge_dataset,
+    build_data_before_engineering,
+    build_team_rolling_features,
+    build_match_level_features,
+)
+from src.profiling import StageProfiler
+from src.synthetic_data import generate_raw_dataset
+
+
+# ======================================================
+# DATA PIPELINE SCALING BENCHMARK
+# ======================================================
+
+BENCHMARK_DIR = Path("results/benchmarks")
+
+# (n_seasons, n_leagues); today's data is 4 EPL seasons, so these are 1x..50x
+DEFAULT_SIZES = [(4, 1), (8, 2), (20, 5), (40, 5)]
+
+
+def run_data_loader_stages(meta, work_dir, prof):
+    """
+    Run every data_loader stage on one synthetic dataset under a profiler.
+
+    Args:
+        meta (dict): Output of generate_raw_dataset().
+        work_dir (Path): Scratch directory for the intermediate base CSV.
+        prof (StageProfiler): Profiler collecting one record per stage.
+
+    Returns:
+        pd.DataFrame: Final match-level model dataset.
+    """
+    df_base = prof.call("load_raw", load_raw, meta["matchdata"])
+
+    base_path = Path(work_dir) / "matchdata_base.csv"
+    df_base.to_csv(base_path, index=False)
+
+    df_loaded = prof.call("load_base", load_base, base_path)
+    home, away = prof.call("prepare_home_away", prepare_home_away, df_loaded)
+    df_clean = prof.call("pivot_matches", pivot_matches, home, away)
+    df_all = prof.call(
+        "build_all", build_all, meta["raw_dir"], season_prefixes=meta["season_prefixes"]
+    )
+    df_merged = prof.call("merge_dataset", merge_dataset, df_clean, df_all)
+    df_before = prof.call("build_data_before_engineering", build_data_before_engineering, df_merged)
+    df_after = prof.call("build_team_rolling_features", build_team_rolling_features, df_before)
+    return prof.call("build_match_level_features", build_match_level_features, df_after)
+
+
+def scaling_exponents(results):
+    """
+    Fit time ~ n_matches ** k per stage on a log-log scale.
+
+    An exponent close to 1 means linear scaling; values well above 1 flag
+    stages that will dominate as more seasons and leagues are added.
+
+    Args:
+        results (pd.DataFrame): Benchmark records with stage, n_matches, wall_s.
+
+    Returns:
+        pd.Series: Exponent k per stage.
+    """
+    def fit(group):
+        group = group[group["wall_s"] > 0]
+        if group["n_matches"].nunique() < 2:
+            return np.nan
+        slope, _ = np.polyfit(np.log(group["n_matches"]), np.log(group["wall_s"]), 1)
+        return slope
+
+    return results.groupby("stage", sort=False)[["n_matches", "wall_s"]].apply(fit).rename("exponent")
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, teams_per_league=20, repeats=1, seed=0, trace_memory=False):
+    """
+    Time each data_loader function on synthetic datasets of increasing size.
+
+    For every (n_seasons, n_leagues) size a raw dataset is generated in a
+    temporary directory and the full data_loader chain is run `repeats` times;
+    the fastest run per stage is kept.
+
+    Args:
+        sizes: Iterable of (n_seasons, n_leagues) pairs.
+        teams_per_league (int): Teams per generated league.
+        repeats (int): Runs per size (best-of).
+        seed (int): Random seed for data generation.
+        trace_memory (bool): Also record tracemalloc peaks per stage.
+
+    Returns:
+        pd.DataFrame: One row per (size, stage) with wall_s, cpu_s, rows and,
+        when enabled, tracemalloc_peak_mb.
+    """
+    rows = []
+    for n_seasons, n_leagues in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            meta = generate_raw_dataset(tmp, n_seasons, n_leagues, teams_per_league, seed)
+            print(
+                f"Size {n_seasons} seasons x {n_leagues} leagues: "
+                f"{meta['n_matches']} matches"
+            )
+
+            runs = []
+            for _ in range(repeats):
+                prof = StageProfiler(trace_memory=trace_memory)
+                run_data_loader_stages(meta, tmp, prof)
+                runs.append(prof.summary())
+
+            best = pd.concat(runs).groupby("stage", sort=False).min(numeric_only=True).reset_index()
+            best.insert(0, "n_seasons", n_seasons)
+            best.insert(1, "n_leagues", n_leagues)
+            best.insert(2, "n_matches", meta["n_matches"])
+            rows.append(best)
+
+    return pd.concat(rows, ignore_index=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark data_loader scaling on synthetic data")
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        default=[f"{s}x{l}" for s, l in DEFAULT_SIZES],
+        help="dataset sizes as SEASONSxLEAGUES, e.g. 4x1 40x5",
+    )
+    parser.add_argument("--teams", type=int, default=20, help="teams per league")
+    parser.add_argument("--repeats", type=int, default=1, help="runs per size (best-of)")
+    parser.add_argument("--trace-memory", action="store_true", help="record tracemalloc peaks")
+    parser.add_argument("--out", default=str(BENCHMARK_DIR / "data_loader_scaling.csv"))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [tuple(int(v) for v in size.lower().split("x")) for size in args.sizes]
+
+    results = run_benchmark(sizes, args.teams, args.repeats, trace_memory=args.trace_memory)
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(out_path, index=False)
+
+    curves = results.pivot_table(index="stage", columns="n_matches", values="wall_s", sort=False)
+    curves["exponent"] = scaling_exponents(results)
+
+    print("\nWall time (s) by number of matches")
+    print(curves.round(3).to_string())
+    print(f"\nBenchmark results saved to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.profiling import count_rows
+
+
+# ======================================================
+# STAGE GRAPH EXECUTION
+# ======================================================
+
+DEFAULT_JOBS = 4
+
+
+def stage(name, func, deps=(), title=None, load=None):
+    """
+    Declare one pipeline stage.
+
+    Args:
+        name (str): Unique stage name (also the profile record name).
+        func (callable): Called with the outputs of deps, in order.
+        deps (sequence): Stage names, or (stage name, key) pairs to pass one
+            entry of a stage that returns a dict.
+        title (str | None): Progress line printed when the stage starts.
+        load (callable | None): Rebuilds the stage's output from the files it
+            saved, so --only can run downstream stages without it.
+
+    Returns:
+        dict: Stage definition for run_stages().
+    """
+    return {"name": name, "func": func, "deps": list(deps), "title": title, "load": load}
+
+
+def _dep_name(dep):
+    return dep[0] if isinstance(dep, tuple) else dep
+
+
+def _dep_value(dep, outputs):
+    if isinstance(dep, tuple):
+        name, key = dep
+        return outputs[name][key]
+    return outputs[dep]
+
+
+def select_stages(stages, until=None, only=None):
+    """
+    Names of the stages to run.
+
+    Args:
+        stages (list[dict]): Stage definitions.
+        until (list[str] | None): Run these stages and everything they depend on.
+        only (list[str] | None): Run exactly these stages.
+
+    Returns:
+        list[str]: Selected stage names in definition order.
+
+    Raises:
+        ValueError: On unknown stage names or when both until and only are given.
+    """
+    by_name = {s["name"]: s for s in stages}
+    if until and only:
+        raise ValueError("use either until or only, not both")
+
+    targets = until or only
+    unknown = [t for t in targets or [] if t not in by_name]
+    if unknown:
+        raise ValueError(f"unknown stages {unknown}; available: {list(by_name)}")
+
+    if only:
+        selected = set(only)
+    elif until:
+        selected, todo = set(), list(until)
+        while todo:
+            name = todo.pop()
+            if name not in selected:
+                selected.add(name)
+                todo.extend(_dep_name(d) for d in by_name[name]["deps"])
+    else:
+        selected = set(by_name)
+
+    return [s["name"] for s in stages if s["name"] in selected]
+
+
+def critical_path(stages, wall_s):
+    """
+    Longest chain of dependent stages by measured wall time.
+
+    With unlimited workers the run cannot finish faster than this chain.
+
+    Args:
+        stages (list[dict]): Stage definitions (in dependency order).
+        wall_s (dict[str, float]): Wall time of every stage that ran.
+
+    Returns:
+        tuple[list[str], float]: Stage names along the path and its total time.
+    """
+    finish, previous = {}, {}
+    for s in stages:
+        name = s["name"]
+        if name not in wall_s:
+            continue
+        deps = [_dep_name(d) for d in s["deps"] if _dep_name(d) in finish]
+        before = max(deps, key=finish.get) if deps else None
+        finish[name] = wall_s[name] + (finish[before] if before else 0.0)
+        previous[name] = before
+
+    if not finish:
+        return [], 0.0
+
+    node = max(finish, key=finish.get)
+    total = finish[node]
+    path = []
+    while node is not None:
+        path.append(node)
+        node = previous[node]
+    return path[::-1], total
+
+
+def run_stages(stages, until=None, only=None, max_workers=DEFAULT_JOBS, prof=None, stats=None):
+    """
+    Run a stage graph, starting each stage as soon as its inputs are ready.
+
+    Independent stages run concurrently on a thread pool (pandas, numpy and
+    scikit-learn release the GIL in their heavy loops, and stages that need
+    processes start their own pools). Inputs of selected stages that come
+    from unselected ones are read back with those stages' load functions.
+    The first failing stage stops the scheduling of new stages and its
+    exception is raised once the running ones have finished.
+
+    Args:
+        stages (list[dict]): Stage definitions (see stage()), deps first.
+        until, only: Stage selection (see select_stages()).
+        max_workers (int): Stages running at the same time.
+        prof (StageProfiler | None): Records every stage when given.
+        stats (dict | None): Filled with the run's elapsed_s and
+            max_concurrent (most stages that actually ran at once).
+
+    Returns:
+        tuple[dict, dict]: Output and wall time (s) of every stage that ran.
+
+    Raises:
+        ValueError: If a selected stage needs an unselected one that has no
+            load function.
+    """
+    by_name = {s["name"]: s for s in stages}
+    selected = select_stages(stages, until, only)
+
+    outputs = {}
+    for name in selected:
+        for dep in by_name[name]["deps"]:
+            dep = _dep_name(dep)
+            if dep in selected or dep in outputs:
+                continue
+            if by_name[dep]["load"] is None:
+                raise ValueError(f"{name} needs the output of {dep}, which is not saved; run it too")
+            outputs[dep] = by_name[dep]["load"]()
+
+    wall_s = {}
+
+    def run(s):
+        args = [_dep_value(d, outputs) for d in s["deps"]]
+        if s["title"]:
+            print(f"\n▶ {s['title']}")
+        t0 = time.perf_counter()
+        if prof is None:
+            result = s["func"](*args)
+        else:
+            with prof.stage(s["name"], rows_in=count_rows(args)) as record:
+                result = s["func"](*args)
+                record["rows_out"] = count_rows(result)
+        wall_s[s["name"]] = time.perf_counter() - t0
+        return result
+
+    pending = list(selected)
+    running = {}
+    error = None
+    max_concurrent = 0
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while pending or running:
+            if error is None:
+                for name in list(pending):
+                    deps = [_dep_name(d) for d in by_name[name]["deps"]]
+                    if all(d in outputs for d in deps):
+                        pending.remove(name)
+                        running[pool.submit(run, by_name[name])] = name
+            if not running:
+                break
+            max_concurrent = max(max_concurrent, min(len(running), max(1, max_workers)))
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    outputs[name] = future.result()
+                except Exception as exc:  # finish the running stages, then re-raise
+                    error = error or exc
+
+    if stats is not None:
+        stats.update(elapsed_s=time.perf_counter() - t0, max_concurrent=max_concurrent)
+    if error is not None:
+        raise error
+    if pending:
+        raise ValueError(f"stages {pending} have dependencies that never ran")
+
+    return {name: outputs[name] for name in selected}, wall_s
+
+
+def run_summary(stages, wall_s, stats):
+    """
+    Two-line summary of a run: wall time against stage time, the actual
+    concurrency, and the critical path.
+
+    Args:
+        stages (list[dict]): Stage definitions.
+        wall_s (dict[str, float]): Wall time of every stage that ran.
+        stats (dict): Filled by run_stages().
+
+    Returns:
+        str: The summary.
+    """
+    path, path_s = critical_path(stages, wall_s)
+    return (
+        f"Wall time {stats['elapsed_s']:.2f}s for {len(wall_s)} stages "
+        f"({sum(wall_s.values()):.2f}s of stage time, at most {stats['max_concurrent']} at once)\n"
+        f"Critical path ({path_s:.2f}s): " + " -> ".join(path)
+    )
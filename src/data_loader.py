@@ -1,7 +1,26 @@
+import contextvars
+import copy
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 import re
+import numpy as np
 import pandas as pd
 
+from src.schema import compact_frame
+from src.dates import DAYFIRST_FORMATS, parse_dates
+from src.dataset_store import (
+    STORE_DIR,
+    append_dataset,
+    finish_dataset,
+    load_dataset,
+    merge_manifests,
+    read_manifest,
+    start_dataset,
+)
+from src.feature_spec import FEATURE_SPEC, compile_plan, execute_plan, team_rows
+from src.feature_store import SORT_KEYS
 
 # ======================================================
 # build_matchdata_base.py
@@ -69,7 +88,67 @@ team_name_normalization = {
     "wolverhampton wanderers": "wolverhampton wanderers",
 }
 
-def normalize_team(x):
+# League-specific aliases, checked before the shared (EPL) table above.
+# Keys are football-data.co.uk division codes.
+team_name_normalization_by_league = {
+    "E0": {},
+    "E1": {
+        "birmingham": "birmingham city",
+        "blackburn": "blackburn rovers",
+        "bristol city": "bristol city",
+        "cardiff": "cardiff city",
+        "coventry": "coventry city",
+        "derby": "derby county",
+        "huddersfield": "huddersfield town",
+        "hull": "hull city",
+        "middlesbrough": "middlesbrough",
+        "millwall": "millwall",
+        "oxford": "oxford united",
+        "plymouth": "plymouth argyle",
+        "portsmouth": "portsmouth",
+        "preston": "preston north end",
+        "qpr": "queens park rangers",
+        "queens park rangers": "queens park rangers",
+        "rotherham": "rotherham united",
+        "sheffield weds": "sheffield wednesday",
+        "sheffield wednesday": "sheffield wednesday",
+        "stoke": "stoke city",
+        "sunderland": "sunderland",
+        "swansea": "swansea city",
+        "watford": "watford",
+        "west brom": "west bromwich albion",
+        "west bromwich albion": "west bromwich albion",
+        "wigan": "wigan athletic",
+    },
+}
+
+# FBref competition name -> football-data.co.uk division code
+LEAGUE_DIVISIONS = {
+    "Premier League": "E0",
+    "Championship": "E1",
+    "League One": "E2",
+    "League Two": "E3",
+    "National League": "EC",
+    "Scottish Premiership": "SC0",
+    "Scottish Championship": "SC1",
+    "Bundesliga": "D1",
+    "2. Bundesliga": "D2",
+    "Serie A": "I1",
+    "Serie B": "I2",
+    "La Liga": "SP1",
+    "Segunda División": "SP2",
+    "Ligue 1": "F1",
+    "Ligue 2": "F2",
+    "Eredivisie": "N1",
+    "Belgian Pro League": "B1",
+    "Primeira Liga": "P1",
+    "Süper Lig": "T1",
+    "Super League Greece": "G1",
+}
+
+DEFAULT_LEAGUE = "E0"
+
+def normalize_team(x, league=None):
     """
     Normalize a team name to a canonical format.
 
@@ -78,13 +157,35 @@ def normalize_team(x):
 
     Args:
         x: Raw team name (any type; will be cast to string).
+        league: Optional division code; its aliases take precedence over
+            the shared table.
 
     Returns:
         str: Normalized, canonical team name in lowercase.
     """
     x = str(x).lower().strip()
+    league_aliases = team_name_normalization_by_league.get(league, {})
+    if x in league_aliases:
+        return league_aliases[x]
     return team_name_normalization.get(x, x)
 
+
+def normalize_teams(teams, leagues=None):
+    """
+    Vectorized normalize_team over a column, resolving each distinct
+    (name, league) pair only once.
+    """
+    if leagues is None:
+        leagues = pd.Series(DEFAULT_LEAGUE, index=teams.index)
+
+    pairs = pd.MultiIndex.from_arrays([teams.astype(str), leagues.astype(str)])
+    uniques = pairs.unique()
+    lookup = pd.Series(
+        [normalize_team(t, l) for t, l in uniques],
+        index=uniques,
+    )
+    return pd.Series(lookup.reindex(pairs).to_numpy(), index=teams.index)
+
 def normalize_formation(f):
     """
     Normalize a football formation string into a consistent dashed format.
@@ -158,9 +259,129 @@ def norm_referee(x):
 
     return x
 
+# ======================================================
+# MATCH KEYS
+# ======================================================
+
+# Bits reserved for each team id in a match key (up to 65,536 teams per join)
+TEAM_BITS = 16
+
+JOIN_REPORTS = []
+_JOIN_LOCK = threading.Lock()
+_JOIN_COLLECTOR = contextvars.ContextVar("join_collector", default=None)
+
+
+@contextmanager
+def collect_joins():
+    """
+    Record the joins of the enclosed block in a list of their own.
+
+    Partition builds run next to other stages (and in-process with one
+    worker), so they collect their join diagnostics here and hand them back
+    instead of reading and resetting the shared JOIN_REPORTS.
+
+    Yields:
+        list[dict]: Join records of the block (see record_join()).
+    """
+    records = []
+    token = _JOIN_COLLECTOR.set(records)
+    try:
+        yield records
+    finally:
+        _JOIN_COLLECTOR.reset(token)
+
+
+def match_keys(*sides):
+    """
+    Compact integer match keys for the sides of a join.
+
+    A key packs the day ordinal of the match date with the ids of the home and
+    away teams: (day << 2 * TEAM_BITS) | (home << TEAM_BITS) | away. Team names
+    are interned once over every side together, so equal (date, home, away)
+    triples get equal keys on both sides and joins compare int64 values
+    instead of match_id strings.
+
+    Args:
+        *sides: One (dates, home_teams, away_teams) triple per side.
+
+    Returns:
+        list[np.ndarray]: int64 keys, one array per side.
+    """
+    # factorize each column (cheap for categoricals), then intern the uniques
+    factorized = [
+        pd.factorize(pd.Series(t), use_na_sentinel=False)
+        for _, home, away in sides for t in (home, away)
+    ]
+    names = pd.Index(np.concatenate([np.asarray(u, dtype=object) for _, u in factorized])).unique()
+    ids = [names.get_indexer(np.asarray(u, dtype=object))[codes].astype(np.int64) for codes, u in factorized]
+
+    keys = []
+    for i, (dates, _, _) in enumerate(sides):
+        day = parse_dates(dates).to_numpy().astype("datetime64[D]").astype(np.int64)
+        keys.append((day << 2 * TEAM_BITS) | (ids[2 * i] << TEAM_BITS) | ids[2 * i + 1])
+
+    return keys
+
+
+def record_join(stage, left_keys, right_keys, left_ids, right_ids):
+    """
+    Record unmatched and duplicated keys of both sides of a join in
+    JOIN_REPORTS (see join_report()).
+
+    Args:
+        stage (str): Name of the joining function.
+        left_keys, right_keys (np.ndarray): Keys from match_keys().
+        left_ids, right_ids: match_id of each row, used as examples.
+    """
+    sides = [
+        ("left", pd.Series(left_keys), right_keys, np.asarray(left_ids, dtype=object)),
+        ("right", pd.Series(right_keys), left_keys, np.asarray(right_ids, dtype=object)),
+    ]
+    records = []
+    for side, keys, other, ids in sides:
+        unmatched = ~keys.isin(other).to_numpy()
+        duplicated = keys.duplicated(keep=False).to_numpy()
+        records.append({
+            "stage": stage,
+            "side": side,
+            "rows": len(keys),
+            "unmatched": int(unmatched.sum()),
+            "duplicated": int(duplicated.sum()),
+            "examples": ", ".join(map(str, ids[unmatched | duplicated][:3])),
+        })
+
+    collector = _JOIN_COLLECTOR.get()
+    if collector is not None:
+        collector.extend(records)
+        return
+    with _JOIN_LOCK:
+        JOIN_REPORTS.extend(records)
+
+
+def join_report(reset=False):
+    """
+    Unmatched and duplicated keys for every join recorded so far.
+
+    Args:
+        reset (bool): Clear the collected reports after returning them.
+
+    Returns:
+        pd.DataFrame: Columns stage, side, rows, unmatched, duplicated and up
+        to three example match_ids of the affected rows.
+    """
+    with _JOIN_LOCK:
+        report = pd.DataFrame(
+            JOIN_REPORTS, columns=["stage", "side", "rows", "unmatched", "duplicated", "examples"]
+        )
+        if reset:
+            JOIN_REPORTS.clear()
+    return report
+
+
 column_rename = {
     "date": "match_date",
     "round": "matchweek",
+    "comp": "competition",
 
     "gf": "goals_for",
     "ga": "goals_against",
@@ -217,7 +438,7 @@ column_rename = {
 }
 
 useful_cols = [
-    "team", "season", "match_date", "matchweek", "competition", "venue",
+    "team", "season", "match_date", "matchweek", "competition", "league", "venue",
     "opponent", "referee",
 
     "goals_for", "goals_against",
@@ -248,7 +469,7 @@ useful_cols = [
     "team_formation", "opponent_formation",
 ]
 
-def load_raw():
+def load_raw(path=RAW_FILE_MATCHDATA):
     """
     Load and clean the raw match-level team statistics dataset.
 
@@ -257,11 +478,34 @@ def load_raw():
     a curated set of useful columns. It also extracts a numeric matchweek to
     ensure correct chronological sorting.
 
+    Args:
+        path: Raw team-level statistics CSV (defaults to RAW_FILE_MATCHDATA).
+
     Returns:
         pd.DataFrame: Cleaned dataset sorted by season, matchweek, team, and date.
     """
-    df = pd.read_csv(RAW_FILE_MATCHDATA)
+    df = clean_raw_chunk(pd.read_csv(path), source=str(path))
+
+    df = df.sort_values(["season", "matchweek_num", "team", "match_date"])
+
+    return compact_frame(df, "load_raw")
+
+
+def clean_raw_chunk(df, source=None):
+    """
+    Clean a block of rows of the raw team-level statistics file.
 
+    Every step of load_raw() works row by row, so the same cleaning applies
+    to the whole file or to one chunk of it (see stream_raw()).
+
+    Args:
+        df (pd.DataFrame): Rows as read from the raw CSV.
+        source (str | None): File the rows come from; its date format is
+            detected once and reused for later chunks.
+
+    Returns:
+        pd.DataFrame: Cleaned rows (useful_cols and matchweek_num), unsorted.
+    """
     df.columns = (
         df.columns.str.lower()
                   .str.strip()
@@ -270,13 +514,17 @@ def load_raw():
                   .str.replace(".", "_")
     )
 
-    df["date"] = pd.to_datetime(df["date"], errors="coerce", dayfirst=False)
-    bad = df["date"].isna()
-    if bad.any():
-        df.loc[bad, "date"] = pd.to_datetime(df.loc[bad, "date"], errors="coerce", dayfirst=True)
+    # format detected once per file; day-first values are picked up as a fallback
+    df["date"] = parse_dates(df["date"], source=source)
+
+    if "comp" in df.columns:
+        league = df["comp"].map(LEAGUE_DIVISIONS).fillna(DEFAULT_LEAGUE)
+    else:
+        league = pd.Series(DEFAULT_LEAGUE, index=df.index)
+    df = pd.concat([df, league.rename("league")], axis=1)
 
-    df["team"] = df["team"].apply(normalize_team)
-    df["opponent"] = df["opponent"].apply(normalize_team)
+    df["team"] = normalize_teams(df["team"], df["league"])
+    df["opponent"] = normalize_teams(df["opponent"], df["league"])
 
     df["referee"] = df["referee"].apply(norm_referee)
 
@@ -289,30 +537,29 @@ def load_raw():
     df["matchweek_num"] = df["matchweek"].str.extract(r"(\d+)").astype(int)
 
     keep = [c for c in useful_cols if c in df.columns]
-    df = df[keep + ["matchweek_num"]]
-
-    df = df.sort_values(["season", "matchweek_num", "team", "match_date"])
-
-    return df
+    return df[keep + ["matchweek_num"]]
 #----------------------------------
 #BUILD_MATCHDATA_CLEAN
 #----------------------------------
 BASE_FILE = "data/processed/matchdata_base.csv"
 OUT_FILE = "data/processed/matchdata_clean.csv"
 
-def load_base():
+def load_base(path=BASE_FILE):
     """
     Load the pre-built base dataset and ensure correct date typing.
 
     This function assumes the base dataset has already been cleaned and saved,
     and enforces datetime parsing to prevent downstream sorting/feature issues.
 
+    Args:
+        path: Base dataset CSV (defaults to BASE_FILE).
+
     Returns:
         pd.DataFrame: Base dataset with match_date as datetime.
     """
-    df = pd.read_csv(BASE_FILE)
-    df["match_date"] = pd.to_datetime(df["match_date"])
-    return df
+    df = pd.read_csv(path)
+    df["match_date"] = parse_dates(df["match_date"], source=str(path))
+    return compact_frame(df, "load_base")
 
     
 def prepare_home_away(df):
@@ -378,9 +625,15 @@ def pivot_matches(home, away):
         pd.DataFrame: Match-level dataset (one row per match).
     """
 
-    merged = home.merge(
-        away,
-        on="match_id",
+    home_keys, away_keys = match_keys(
+        (home["match_date"], home["team"], home["opponent"]),
+        (away["match_date"], away["opponent"], away["team"]),
+    )
+    record_join("pivot_matches", home_keys, away_keys, home["match_id"], away["match_id"])
+
+    merged = home.assign(match_key=home_keys).merge(
+        away.drop(columns="match_id").assign(match_key=away_keys),
+        on="match_key",
         suffixes=("_home", "_away"),
         validate="one_to_one"
     )
@@ -390,6 +643,8 @@ def pivot_matches(home, away):
     out["match_id"] = merged["match_id"]
     out["match_date"] = merged["match_date_home"]
     out["season"] = merged["season_home"]
+    if "league_home" in merged.columns:
+        out["league"] = merged["league_home"]
     out["matchweek"] = merged["matchweek_home"]
     out["matchweek_num"] = merged["matchweek_num_home"]
     out["referee"] = merged["referee_home"]
@@ -436,7 +691,7 @@ def pivot_matches(home, away):
         ["season", "matchweek_num", "match_date", "home_team"]
     )
 
-    return out
+    return compact_frame(out, "pivot_matches")
 
 # --------------------------------------------------------
 # BUILD_ALL_MATCHES_CLEAN.PY
@@ -445,7 +700,11 @@ def pivot_matches(home, away):
 RAW_DIR = "data/raw"
 OUT_FILE = "data/processed/all_matches_clean.csv"
 
+SEASON_FILE_PREFIXES = ("21_22", "22_23", "23_24", "24_25")
+CUTOFF_DATE = "2025-01-26"
+
 column_map = {
+    "Div": "league",
     "Date": "match_date",
     "HomeTeam": "home_team",
     "AwayTeam": "away_team",
@@ -507,21 +766,51 @@ def load_file(path):
     Returns:
         pd.DataFrame: Cleaned file-level dataset with standardized column names.
     """
-    df = pd.read_csv(path)
+    return clean_odds_chunk(pd.read_csv(path), path)
+
+
+def clean_odds_chunk(df, path):
+    """
+    Clean a block of rows of one football-data season file (see load_file()).
+
+    Args:
+        df (pd.DataFrame): Rows as read from the file.
+        path: The file, which gives the season and the date format cache key.
 
+    Returns:
+        pd.DataFrame: Rows with standardized column names.
+    """
     df = df[[c for c in keep_cols if c in df.columns]].copy()
 
     df = df.rename(columns=column_map)
+    if "league" not in df.columns:
+        df["league"] = DEFAULT_LEAGUE
+
+    season = season_from_filename(path)
+    if season is not None:
+        df["season"] = season
     
-    df["match_date"] = pd.to_datetime(df["match_date"], format="%d/%m/%Y", errors="coerce")
+    df["match_date"] = parse_dates(df["match_date"], DAYFIRST_FORMATS, source=str(path))
     
-    df["home_team"] = df["home_team"].apply(normalize_team)
-    df["away_team"] = df["away_team"].apply(normalize_team)
+    df["home_team"] = normalize_teams(df["home_team"], df["league"])
+    df["away_team"] = normalize_teams(df["away_team"], df["league"])
     df["referee"] = df["referee"].apply(norm_referee)
 
     return df
 
 
+def season_from_filename(path):
+    """
+    Season (end year, as in the FBref data) encoded in a football-data file
+    name, e.g. "21_22.csv" or "21_22_E1.csv" -> 2022. None if absent.
+    """
+    m = re.match(r"(\d{2})_(\d{2})", Path(path).name)
+    if not m:
+        return None
+    yy = int(m.group(2))
+    return 2000 + yy if yy <= 50 else 1900 + yy
+
+
 def build_match_id(row):
     """
     Build a stable match identifier from date and teams.
@@ -541,25 +830,31 @@ def build_match_id(row):
         f"{row['away_team'].replace(' ', '_').lower()}"
     )
 
-def build_all():
+def build_all(raw_dir=RAW_DIR, season_prefixes=SEASON_FILE_PREFIXES, cutoff=CUTOFF_DATE):
     """
     Build a unified dataset from multiple raw season files (odds/match info).
 
     Loads selected season files, concatenates them into one table, filters to a
     cutoff date to avoid incomplete periods, and creates a match_id for merging.
 
+    Args:
+        raw_dir: Directory containing the season CSV files.
+        season_prefixes: File name prefixes of the seasons to load (e.g. "21_22").
+        cutoff: Last match date to keep; None keeps every match.
+
     Returns:
         pd.DataFrame: Concatenated dataset with a match_id column.
     """
-    raw = Path(RAW_DIR)
-    files = sorted([f for f in raw.glob("*.csv") if f.name.startswith(("21_22", "22_23", "23_24", "24_25"))])
+    raw = Path(raw_dir)
+    files = sorted([f for f in raw.glob("*.csv") if f.name.startswith(tuple(season_prefixes))])
 
     dfs = [load_file(f) for f in files]
     df = pd.concat(dfs, ignore_index=True)
 
-    df = df[df["match_date"] <= pd.to_datetime("2025-01-26")]
+    if cutoff is not None:
+        df = df[df["match_date"] <= pd.to_datetime(cutoff)]
     df["match_id"] = df.apply(build_match_id, axis=1)
-    return df
+    return compact_frame(df, "build_all")
     
 # ======================================================
 # MERGE_DATASET.PY
@@ -571,10 +866,12 @@ MERGED_OUT_FILE = "data/processed/data_merged.csv"
 
 def merge_dataset(matchdata: pd.DataFrame, allm: pd.DataFrame) -> pd.DataFrame:
     """
-    Merge match statistics with bookmaker odds using match_id.
+    Merge match statistics with bookmaker odds on the (date, home, away) match key.
 
     To avoid ambiguous duplicates (same information present in both datasets),
     we drop "duplicate intent" columns from the odds dataset before merging.
+    Matches without odds keep NaN odds; their count (and odds rows matching
+    no match, or keys present twice) is recorded in join_report().
 
     Args:
         matchdata (pd.DataFrame): Match-level statistics dataset (one row per match).
@@ -585,6 +882,8 @@ def merge_dataset(matchdata: pd.DataFrame, allm: pd.DataFrame) -> pd.DataFrame:
     """
 
     duplicate_intent_cols = [
+        "league",
+        "season",
         "match_date",
         "home_team",
         "away_team",
@@ -597,12 +896,18 @@ def merge_dataset(matchdata: pd.DataFrame, allm: pd.DataFrame) -> pd.DataFrame:
         "away_shots_on_target",
     ]
 
-    cols_to_keep_allm = [c for c in allm.columns if c not in duplicate_intent_cols]
-    allm = allm[cols_to_keep_allm]
+    left_keys, right_keys = match_keys(
+        (matchdata["match_date"], matchdata["home_team"], matchdata["away_team"]),
+        (allm["match_date"], allm["home_team"], allm["away_team"]),
+    )
+    record_join("merge_dataset", left_keys, right_keys, matchdata["match_id"], allm["match_id"])
+
+    cols_to_keep_allm = [c for c in allm.columns if c not in duplicate_intent_cols + ["match_id"]]
+    allm = allm[cols_to_keep_allm].assign(match_key=right_keys)
 
-    merged = matchdata.merge(allm, on="match_id", how="left")
+    merged = matchdata.assign(match_key=left_keys).merge(allm, on="match_key", how="left")
 
-    return merged
+    return compact_frame(merged.drop(columns="match_key"), "merge_dataset")
     
 # ======================================================
 # BUILD_DATA_BEFORE_ENG.PY
@@ -624,84 +929,12 @@ def build_data_before_engineering(df: pd.DataFrame) -> pd.DataFrame:
     """
     df = df.copy()
 
-    df["match_date"] = pd.to_datetime(df["match_date"])
+    df["match_date"] = parse_dates(df["match_date"])
     df = df.sort_values("match_date").reset_index(drop=True)
 
-    home = pd.DataFrame({
-        "match_id": df["match_id"],
-        "match_date": df["match_date"],
-        "season": df["season"],
-        "matchweek_num": df["matchweek_num"],
-        "referee": df["referee"],
-
-        "team": df["home_team"],
-        "opponent": df["away_team"],
-        "is_home": 1,
-
-        "goals_for": df["home_goals"],
-        "goals_against": df["away_goals"],
-
-        "xg_for": df["home_xg"],
-        "xg_against": df["home_xg_against"],
-
-        "shots_for": df["home_shots"],
-        "shots_on_target_for": df["home_shots_on_target"],
-        "shots_on_target_against": df["home_shots_on_target_against"],
-
-        "possession": df["home_possession"],
-        "saves": df["home_saves"],
-
-        "clean_sheets": df["home_clean_sheets"],
-        "fouls": df["home_fouls"],
-        "yellow_cards": df["home_yellow_cards"],
-
-        "blocks": df["home_blocks"],
-        "clearances": df["home_clearances"],
-
-        "odds_win": df["odds_avg_home_win"],
-        "odds_draw": df["odds_avg_draw"],
-        "odds_lose": df["odds_avg_away_win"],
-        "odds_over25": df["odds_avg_over25"],
-        "odds_under25": df["odds_avg_under25"],
-    })
-
-    away = pd.DataFrame({
-        "match_id": df["match_id"],
-        "match_date": df["match_date"],
-        "season": df["season"],
-        "matchweek_num": df["matchweek_num"],
-        "referee": df["referee"],
-
-        "team": df["away_team"],
-        "opponent": df["home_team"],
-        "is_home": 0,
-
-        "goals_for": df["away_goals"],
-        "goals_against": df["home_goals"],
-
-        "xg_for": df["away_xg"],
-        "xg_against": df["away_xg_against"],
-
-        "shots_for": df["away_shots"],
-        "shots_on_target_for": df["away_shots_on_target"],
-        "shots_on_target_against": df["away_shots_on_target_against"],
-
-        "possession": df["away_possession"],
-        "saves": df["away_saves"],
-
-        "clean_sheets": df["away_clean_sheets"],
-        "fouls": df["away_fouls"],
-        "yellow_cards": df["away_yellow_cards"],
-
-        "blocks": df["away_blocks"],
-        "clearances": df["away_clearances"],
-
-        "odds_win": df["odds_avg_away_win"],
-        "odds_draw": df["odds_avg_draw"],
-        "odds_lose": df["odds_avg_home_win"],
-        "odds_over25": df["odds_avg_over25"],
-        "odds_under25": df["odds_avg_under25"],
-    })
+    # column mapping lives in feature_spec.TEAM_COLUMNS
+    home = team_rows(df, "home")
+    away = team_rows(df, "away")
 
     out = pd.concat([home, away], ignore_index=True)
 
@@ -713,19 +946,23 @@ def build_data_before_engineering(df: pd.DataFrame) -> pd.DataFrame:
         ["match_id", "match_date", "team"]
     ).reset_index(drop=True)
 
-    return out
+    return compact_frame(out, "build_data_before_engineering")
 
 
 # ======================================================
 # BUILD_DATA_AFTER_ENG.PY
 # ======================================================
 
+FEATURE_PLAN = compile_plan(FEATURE_SPEC)
+
+
 def build_team_rolling_features(df: pd.DataFrame) -> pd.DataFrame:
     """
     Compute rolling performance features per team within each season.
 
-    All rolling metrics are shifted by 1 match to avoid target leakage: the features
-    for a given match only depend on matches that occurred before it.
+    The features are the ones declared in feature_spec.FEATURE_SPEC. All rolling
+    metrics are shifted by 1 match to avoid target leakage: the features for a
+    given match only depend on matches that occurred before it.
 
     Args:
         df (pd.DataFrame): Team-level dataset (two rows per match) with points and stats.
@@ -733,77 +970,13 @@ def build_team_rolling_features(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         pd.DataFrame: Same dataset with added rolling feature columns.
     """
-    df = df.copy()
-
-    df = df.sort_values(
-        ["season", "team", "match_date", "match_id"]
-    ).reset_index(drop=True)
-
-    g = df.groupby(["season", "team"])
-
-    df["avg_points_L5"] = g["points"].shift(1).rolling(5, min_periods=1).mean()
-    df["avg_points_L10"] = g["points"].shift(1).rolling(10, min_periods=1).mean()
-
-    df["avg_goals_for_L5"] = g["goals_for"].shift(1).rolling(5, min_periods=1).mean()
-    df["avg_goals_against_L5"] = g["goals_against"].shift(1).rolling(5, min_periods=1).mean()
-
-    df["clean_sheet_rate_L5"] = g["clean_sheets"].shift(1).rolling(5, min_periods=1).mean()
-
-    df["avg_goal_diff_L5"] = (
-        df["avg_goals_for_L5"] - df["avg_goals_against_L5"]
-    )
-
-    df["avg_xg_for_L5"] = g["xg_for"].shift(1).rolling(5, min_periods=1).mean()
-    df["avg_xg_against_L5"] = g["xg_against"].shift(1).rolling(5, min_periods=1).mean()
-
-    df["avg_xg_diff_L5"] = (
-        df["avg_xg_for_L5"] - df["avg_xg_against_L5"]
-    )
-
-    df["avg_shots_on_target_for_L5"] = (
-        g["shots_on_target_for"].shift(1).rolling(5, min_periods=1).mean()
-    )
-
-    df["avg_shots_on_target_against_L5"] = (
-        g["shots_on_target_against"].shift(1).rolling(5, min_periods=1).mean()
-    )
-
-    df["avg_possession_L5"] = g["possession"].shift(1).rolling(5, min_periods=1).mean()
-    df["avg_saves_L5"] = g["saves"].shift(1).rolling(5, min_periods=1).mean()
-
-    df["avg_fouls_L5"] = g["fouls"].shift(1).rolling(5, min_periods=1).mean()
-    df["avg_yellow_cards_L5"] = g["yellow_cards"].shift(1).rolling(5, min_periods=1).mean()
-
-    df["avg_discipline_L5"] = (
-        df["avg_fouls_L5"] + df["avg_yellow_cards_L5"]
-    )
-
-    df["avg_blocks_L5"] = g["blocks"].shift(1).rolling(5, min_periods=1).mean()
-    df["avg_clearances_L5"] = g["clearances"].shift(1).rolling(5, min_periods=1).mean()
+    df = df.sort_values(SORT_KEYS).reset_index(drop=True)
 
-    df["avg_points_home_L5"] = (
-        g.apply(
-            lambda x: x["points"]
-            .where(x["is_home"] == 1)
-            .shift(1)
-            .rolling(5, min_periods=1)
-            .mean()
-        )
-        .reset_index(level=[0, 1], drop=True)
-    )
-
-    df["avg_points_away_L5"] = (
-        g.apply(
-            lambda x: x["points"]
-            .where(x["is_home"] == 0)
-            .shift(1)
-            .rolling(5, min_periods=1)
-            .mean()
-        )
-        .reset_index(level=[0, 1], drop=True)
-    )
+    # every feature of the spec comes from one cumulative-sum pass
+    features = execute_plan(FEATURE_PLAN, df)
+    df = pd.concat([df, pd.DataFrame(features, index=df.index)], axis=1)
 
-    return df
+    return compact_frame(df, "build_team_rolling_features")
 
 
 # ======================================================
@@ -834,6 +1007,7 @@ def build_match_level_features(df: pd.DataFrame) -> pd.DataFrame:
         "match_id",
         "match_date",
         "season",
+        "league",
         "matchweek_num",
         "referee",
         "odds_win",
@@ -843,32 +1017,17 @@ def build_match_level_features(df: pd.DataFrame) -> pd.DataFrame:
         "odds_under25",
     ]
 
-    feature_cols = [
-        "avg_points_L5",
-        "avg_points_L10",
-        "avg_goals_for_L5",
-        "avg_goals_against_L5",
-        "clean_sheet_rate_L5",
-        "avg_xg_for_L5",
-        "avg_xg_against_L5",
-        "avg_shots_on_target_for_L5",
-        "avg_shots_on_target_against_L5",
-        "avg_possession_L5",
-        "avg_saves_L5",
-        "avg_fouls_L5",
-        "avg_yellow_cards_L5",
-        "avg_blocks_L5",
-        "avg_clearances_L5",
-        "avg_points_home_L5",
-        "avg_points_away_L5",
-        "avg_goal_diff_L5",
-        "avg_xg_diff_L5",
-        "avg_discipline_L5",
-    ]
+    feature_cols = FEATURE_PLAN["outputs"]
+
+    home_keys, away_keys = match_keys(
+        (home["match_date"], home["team"], home["opponent"]),
+        (away["match_date"], away["opponent"], away["team"]),
+    )
+    record_join("build_match_level_features", home_keys, away_keys, home["match_id"], away["match_id"])
 
-    merged = home.merge(
-        away,
-        on="match_id",
+    merged = home.assign(match_key=home_keys).merge(
+        away.drop(columns="match_id").assign(match_key=away_keys),
+        on="match_key",
         suffixes=("_home", "_away"),
         how="inner"
     )
@@ -891,6 +1050,343 @@ def build_match_level_features(df: pd.DataFrame) -> pd.DataFrame:
     out.loc[merged["points_home"] > merged["points_away"], "target"] = 1
     out.loc[merged["points_home"] < merged["points_away"], "target"] = -1
 
-    out = out.sort_values("match_date").reset_index(drop=True)
+    out = out.sort_values(["match_date", "match_id"], kind="stable").reset_index(drop=True)
+
+    return compact_frame(out, "build_match_level_features")
+
+
+# ======================================================
+# PARTITIONED BUILD (LEAGUE x SEASON)
+# ======================================================
+
+PARTITION_KEYS = ["league", "season"]
+
+PARTITION_OUTPUTS = [
+    "matchdata_clean",
+    "all_matches_clean",
+    "data_merged",
+    "data_before_engineering",
+    "data_after_engineering",
+    "model_data",
+]
+
+
+def discover_season_files(raw_dir=RAW_DIR, season_prefixes=SEASON_FILE_PREFIXES):
+    """
+    List football-data season files with the (league, season) they hold.
+
+    The league comes from the Div column (only the first row is read), the
+    season from the file name. Files without a Div column are attributed to
+    DEFAULT_LEAGUE.
+
+    Args:
+        raw_dir: Directory with the season files.
+        season_prefixes: Season file prefixes to include; None includes
+            every file whose name encodes a season (e.g. "25_26.csv").
+
+    Returns:
+        pd.DataFrame: Columns path, league, season.
+    """
+    rows = []
+    for f in sorted(Path(raw_dir).glob("*.csv")):
+        if season_prefixes is None:
+            if season_from_filename(f) is None:
+                continue
+        elif not f.name.startswith(tuple(season_prefixes)):
+            continue
+        head = pd.read_csv(f, nrows=1)
+        league = head["Div"].iloc[0] if "Div" in head.columns and len(head) else DEFAULT_LEAGUE
+        rows.append({"path": str(f), "league": str(league), "season": season_from_filename(f)})
+
+    return pd.DataFrame(rows, columns=["path", "league", "season"])
+
+
+def build_partition(league, season, base, odds, cutoff=CUTOFF_DATE):
+    """
+    Run merging and feature building for one (league, season).
+
+    Rolling features are computed within (season, team), so partitions are
+    independent and their outputs can simply be concatenated.
+
+    Args:
+        league (str): Division code, e.g. "E0".
+        season (int): Season end year.
+        base (pd.DataFrame): Team-level rows of this partition (load_raw output).
+        odds (pd.DataFrame): Football-data rows (load_file output); rows of
+            other partitions are dropped.
+        cutoff: Last match date to keep; None keeps every match.
+
+    Returns:
+        dict[str, pd.DataFrame]: One frame per name in PARTITION_OUTPUTS.
+    """
+    odds = odds[(odds["league"] == league) & (odds["season"] == season)]
+    if cutoff is not None:
+        odds = odds[odds["match_date"] <= pd.to_datetime(cutoff)]
+    odds = odds.assign(match_id=odds.apply(build_match_id, axis=1) if len(odds) else [])
+
+    home, away = prepare_home_away(base.copy())
+    clean = pivot_matches(home, away)
+    merged = merge_dataset(clean, odds)
+    before = build_data_before_engineering(merged)
+    after = build_team_rolling_features(before)
+    model = build_match_level_features(after)
+
+    return dict(zip(PARTITION_OUTPUTS, [clean, compact_frame(odds), merged, before, after, model]))
+
+
+def _build_partition_task(args):
+    league, season, base, files, cutoff = args
+    odds = pd.concat([load_file(f) for f in files], ignore_index=True)
+    with collect_joins() as joins:
+        outputs = build_partition(league, season, base, odds, cutoff)
+    return (league, season), (outputs, joins)
+
+
+def combine_partitions(results):
+    """
+    Concatenate per-partition outputs into one frame per output name.
+
+    Partitions are stacked in (league, season) order, which keeps each
+    season's rows in the order the serial build produces them; the match-level
+    model dataset is then re-sorted by date and match_id (as in
+    build_match_level_features) so leagues interleave in time.
+    Categoricals are re-derived on the combined frame, since the category sets
+    differ between partitions.
+    """
+    combined = {}
+    for name in PARTITION_OUTPUTS:
+        frames = [r[name] for _, r in sorted(results.items()) if len(r[name])]
+        if not frames:
+            combined[name] = pd.DataFrame()
+            continue
+
+        df = pd.concat(frames, ignore_index=True)
+        df = df.astype({c: "object" for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+        if name == "model_data":
+            df = df.sort_values(["match_date", "match_id"], kind="stable").reset_index(drop=True)
+        combined[name] = compact_frame(df)
+
+    return combined
+
+
+def build_partitioned(df_base, raw_dir=RAW_DIR, season_prefixes=SEASON_FILE_PREFIXES,
+                      cutoff=CUTOFF_DATE, max_workers=None):
+    """
+    Build every processed dataset partitioned by (league, season).
+
+    The team-level table from load_raw() is split by the league (FBref
+    competition -> Div code) and season columns; each partition is matched
+    with the football-data files of the same Div and season and processed
+    independently in a process pool. The per-partition outputs are then
+    concatenated, so adding leagues scales out across cores instead of
+    growing one serial frame.
+
+    Args:
+        df_base (pd.DataFrame): Output of load_raw().
+        raw_dir: Directory with the football-data season files.
+        season_prefixes: Season file prefixes to include.
+        cutoff: Last match date to keep; None keeps every match.
+        max_workers (int | None): Worker processes; 1 runs in-process.
+
+    Returns:
+        dict[str, pd.DataFrame]: Combined frames keyed by PARTITION_OUTPUTS
+        name (e.g. "model_data").
+    """
+    files = discover_season_files(raw_dir, season_prefixes)
+    return combine_partitions(build_partitions(df_base, files, cutoff, max_workers=max_workers))
+
+
+def build_partitions(df_base, files, cutoff=CUTOFF_DATE, keys=None, max_workers=None):
+    """
+    Build the outputs of each (league, season) partition, without combining them.
+
+    Args:
+        df_base (pd.DataFrame): Output of load_raw().
+        files (pd.DataFrame): Season files (discover_season_files()).
+        cutoff: Last match date to keep; None keeps every match.
+        keys (set[tuple] | None): Only build these (league, season) partitions.
+        max_workers (int | None): Worker processes; 1 runs in-process.
+
+    Returns:
+        dict[tuple, dict[str, pd.DataFrame]]: Outputs per (league, season),
+        for every partition with both team statistics and season files.
+    """
+    tasks = []
+    for (league, season), base in df_base.groupby(PARTITION_KEYS, observed=True, sort=True):
+        if keys is not None and (league, season) not in keys:
+            continue
+        part_files = files.loc[
+            (files["league"] == league) & (files["season"] == season), "path"
+        ].tolist()
+        if not part_files:
+            continue
+        tasks.append((league, season, base, part_files, cutoff))
+
+    if max_workers == 1 or len(tasks) <= 1:
+        done = list(map(_build_partition_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            done = list(pool.map(_build_partition_task, tasks))
+
+    return _collect_partitions(done)
+
+
+def _collect_partitions(done):
+    # join diagnostics of the workers go to this process's report
+    results = {}
+    for key, (outputs, joins) in done:
+        results[key] = outputs
+        with _JOIN_LOCK:
+            JOIN_REPORTS.extend({**r, "stage": f"{r['stage']} {key[0]}/{key[1]}"} for r in joins)
 
-    return out
+    return results
+
+
+# ======================================================
+# STREAMING INGESTION
+# ======================================================
+
+STREAM_CHUNK_ROWS = 50_000
+
+# Schema of the streamed odds dataset (season files differ in which columns they carry)
+ODDS_COLUMNS = list(dict.fromkeys(column_map.values())) + ["season", "match_id"]
+
+
+def stream_raw(path=RAW_FILE_MATCHDATA, chunksize=STREAM_CHUNK_ROWS):
+    """
+    Read the raw team-level statistics file in chunks, cleaned as in load_raw().
+
+    Yields:
+        pd.DataFrame: Cleaned chunk of at most chunksize rows (unsorted).
+    """
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        # chunked reads come back as one block per column; consolidate first
+        yield clean_raw_chunk(chunk.copy(), source=str(path))
+
+
+def stream_file(path, chunksize=STREAM_CHUNK_ROWS):
+    """
+    Read one football-data season file in chunks, cleaned as in load_file().
+
+    Yields:
+        pd.DataFrame: Cleaned chunk of at most chunksize rows.
+    """
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        yield clean_odds_chunk(chunk, path)
+
+
+def ingest_streaming(raw_file=RAW_FILE_MATCHDATA, raw_dir=RAW_DIR,
+                     season_prefixes=SEASON_FILE_PREFIXES, cutoff=CUTOFF_DATE,
+                     chunksize=STREAM_CHUNK_ROWS, root=STORE_DIR):
+    """
+    Stream the raw files into the partitioned store, chunk by chunk.
+
+    Each chunk is cleaned, split by (league, season) and appended to the
+    partition files of matchdata_base (team-level statistics) and
+    all_matches_clean (odds), so peak memory depends on chunksize and not on
+    the size of the raw files. build_partitioned_from_store() then processes
+    one partition at a time.
+
+    Args:
+        raw_file: Raw team-level statistics CSV.
+        raw_dir: Directory with the football-data season files.
+        season_prefixes: Season file prefixes to include.
+        cutoff: Last match date to keep; None keeps every match.
+        chunksize (int): Rows read per chunk.
+        root: Store root directory.
+
+    Returns:
+        dict[str, dict]: Manifest of each written dataset.
+    """
+    base = start_dataset("matchdata_base", root)
+    for chunk in stream_raw(raw_file, chunksize):
+        append_dataset(base, chunk, root)
+
+    odds = start_dataset("all_matches_clean", root, ODDS_COLUMNS)
+    for path in discover_season_files(raw_dir, season_prefixes)["path"]:
+        for chunk in stream_file(path, chunksize):
+            if cutoff is not None:
+                chunk = chunk[chunk["match_date"] <= pd.to_datetime(cutoff)]
+            if len(chunk):
+                append_dataset(odds, chunk.assign(match_id=chunk.apply(build_match_id, axis=1)), root)
+
+    return {
+        "matchdata_base": finish_dataset(base, root),
+        "all_matches_clean": finish_dataset(odds, root),
+    }
+
+
+def _build_stored_partition_task(args):
+    league, season, root, cutoff, manifests = args
+    base = load_dataset("matchdata_base", seasons=[season], leagues=[league], root=root)
+    odds = load_dataset("all_matches_clean", seasons=[season], leagues=[league], root=root)
+    with collect_joins() as joins:
+        outputs = build_partition(league, season, base, odds, cutoff)
+
+    # in-process runs share the task's manifests; each task appends to its own copy
+    manifests = copy.deepcopy(manifests)
+    for name, manifest in manifests.items():
+        append_dataset(manifest, outputs[name], root)
+    return (league, season), (manifests, joins)
+
+
+def build_partitioned_from_store(root=STORE_DIR, cutoff=CUTOFF_DATE, max_workers=None):
+    """
+    Build every processed dataset from streamed partitions (ingest_streaming()).
+
+    Like build_partitioned(), but each worker reads only its own
+    (league, season) partition of matchdata_base and all_matches_clean from
+    the store and appends its outputs to the store's PARTITION_OUTPUTS
+    datasets, returning only their manifests. No process ever holds more
+    than one partition, so peak memory does not grow with the history; read
+    the outputs back with load_dataset() (or load_model_data_from_store()),
+    pruned to the seasons, leagues and columns needed.
+
+    Args:
+        root: Store root directory.
+        cutoff: Last match date to keep; None keeps every match.
+        max_workers (int | None): Worker processes; 1 runs in-process.
+
+    Returns:
+        dict[str, dict]: Manifest of each written dataset, keyed by
+        PARTITION_OUTPUTS name.
+    """
+    def keys(name):
+        return {
+            tuple(p["values"][k] for k in PARTITION_KEYS)
+            for p in read_manifest(name, root)["partitions"]
+        }
+
+    partitions = sorted(keys("matchdata_base") & keys("all_matches_clean"))
+    # all_matches_clean is both an input and an output: the streamed copy is kept
+    manifests = {name: start_dataset(name, root) for name in PARTITION_OUTPUTS if name != "all_matches_clean"}
+    tasks = [(league, season, root, cutoff, manifests) for league, season in partitions]
+
+    if max_workers == 1 or len(tasks) <= 1:
+        done = list(map(_build_stored_partition_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            done = list(pool.map(_build_stored_partition_task, tasks))
+
+    written = _collect_partitions(done)
+    out = {
+        name: finish_dataset(merge_manifests([m[name] for m in written.values()] or [manifest]), root)
+        for name, manifest in manifests.items()
+    }
+    out["all_matches_clean"] = read_manifest("all_matches_clean", root)
+    return {name: out[name] for name in PARTITION_OUTPUTS}
+
+
+def load_model_data_from_store(root=STORE_DIR, **filters):
+    """
+    Read the stored model dataset in the order combine_partitions() gives it.
+
+    Args:
+        root: Store root directory.
+        **filters: Partition and column filters passed to load_dataset().
+
+    Returns:
+        pd.DataFrame: model_data sorted by match_date and match_id.
+    """
+    df = load_dataset("model_data", root=root, **filters)
+    return df.sort_values(["match_date", "match_id"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,409 @@
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from src.dates import parse_dates
+from src.schema import compact_frame
+
+
+# ======================================================
+# PARTITIONED DATASET STORE
+# ======================================================
+
+# data/processed/store/<dataset>/league=<Div>/season=<year>/part.csv
+STORE_DIR = Path("data/processed/store")
+MANIFEST_NAME = "manifest.json"
+PARTITION_COLS = ["league", "season"]
+DATE_COL = "match_date"
+
+
+def _scalar(value):
+    return value.item() if hasattr(value, "item") else value
+
+
+def write_dataset(df, name, root=STORE_DIR, partition_cols=PARTITION_COLS):
+    """
+    Write a processed dataset as one CSV per (league, season) partition.
+
+    Partition columns are encoded in the directory names and not repeated in
+    the files. A manifest next to the partitions records the column order,
+    dtypes, row count and match_date range of every partition, so readers can
+    prune partitions without opening them. An existing dataset of the same
+    name is replaced.
+
+    Args:
+        df (pd.DataFrame): Dataset to store (e.g. model_data).
+        name (str): Dataset name, used as directory name.
+        root: Store root directory.
+        partition_cols (list[str]): Columns to partition by; the ones missing
+            from df are ignored.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    manifest = start_dataset(name, root, df.columns, partition_cols)
+    append_dataset(manifest, df, root)
+    return finish_dataset(manifest, root)
+
+
+def write_partitions(df, name, keys, root=STORE_DIR, partition_cols=PARTITION_COLS):
+    """
+    Rewrite only some partitions of a stored dataset.
+
+    The files of the given partitions are replaced by the rows of df that
+    fall in them (a partition with no rows left is removed); every other
+    partition is left untouched. A dataset that is not stored yet, or whose
+    columns differ from df's, is written in full with write_dataset().
+
+    Args:
+        df (pd.DataFrame): Dataset holding at least the rows of the given
+            partitions (other rows are ignored).
+        name (str): Dataset name.
+        keys: Partition values to rewrite, e.g. [("E0", 2024)], in the
+            order of the manifest's partition_cols.
+        root: Store root directory.
+        partition_cols (list[str]): Used when the dataset is written in full.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    dataset_dir = Path(root) / name
+    if not (dataset_dir / MANIFEST_NAME).exists():
+        return write_dataset(df, name, root, partition_cols)
+    manifest = read_manifest(name, root)
+    if manifest["columns"] != df.columns.tolist():
+        return write_dataset(df, name, root, partition_cols)
+
+    partition_cols = manifest["partition_cols"]
+    keys = {tuple(_scalar(v) for v in key) for key in keys}
+
+    def key_of(entry):
+        return tuple(entry["values"][c] for c in partition_cols)
+
+    kept = []
+    for entry in manifest["partitions"]:
+        if key_of(entry) in keys:
+            shutil.rmtree((dataset_dir / entry["path"]).parent)
+        else:
+            kept.append(entry)
+    manifest["partitions"] = kept
+
+    rows = pd.MultiIndex.from_frame(df[partition_cols]).isin(list(keys))
+    append_dataset(manifest, df[rows], root)
+    manifest["partitions"].sort(key=key_of)
+    return finish_dataset(manifest, root)
+
+
+def start_dataset(name, root=STORE_DIR, columns=None, partition_cols=PARTITION_COLS):
+    """
+    Start writing a dataset incrementally (see append_dataset()).
+
+    An existing dataset of the same name is removed.
+
+    Args:
+        name (str): Dataset name, used as directory name.
+        root: Store root directory.
+        columns (list[str] | None): Column schema; None takes the columns of
+            the first appended chunk. Later chunks are aligned to it.
+        partition_cols (list[str]): Columns to partition by; the ones missing
+            from the schema are ignored.
+
+    Returns:
+        dict: Open manifest, to pass to append_dataset() and finish_dataset().
+    """
+    dataset_dir = Path(root) / name
+    if dataset_dir.exists():
+        shutil.rmtree(dataset_dir)
+    dataset_dir.mkdir(parents=True)
+
+    return {
+        "dataset": name,
+        "partition_cols": list(partition_cols),
+        "columns": list(columns) if columns is not None else None,
+        "dtypes": {},
+        "partitions": [],
+    }
+
+
+def _merge_dtype(old, new):
+    if old is None or old == new:
+        return new
+    numeric = ("int", "uint", "float")
+    if old.startswith(numeric) and new.startswith(numeric):
+        return "float64"
+    return "object"
+
+
+def append_dataset(manifest, df, root=STORE_DIR):
+    """
+    Append a chunk of rows to an open dataset.
+
+    Each partition file is created with a header on first use and appended
+    to afterwards, and its manifest entry (rows, date range) is updated, so
+    only the current chunk is ever held in memory.
+
+    Args:
+        manifest (dict): Output of start_dataset().
+        df (pd.DataFrame): Chunk with the dataset's columns (missing ones are
+            written empty).
+        root: Store root directory.
+    """
+    dataset_dir = Path(root) / manifest["dataset"]
+    if manifest["columns"] is None:
+        manifest["columns"] = df.columns.tolist()
+    columns = manifest["columns"]
+    partition_cols = [c for c in manifest["partition_cols"] if c in columns]
+    manifest["partition_cols"] = partition_cols
+    if not len(df):
+        return
+
+    df = df.reindex(columns=columns)
+    # all-empty chunks of a column do not decide its dtype (CSV chunks read them as float)
+    empty = manifest.setdefault("_empty_dtypes", {})
+    for col, dtype in df.dtypes.items():
+        if df[col].notna().any():
+            manifest["dtypes"][col] = _merge_dtype(manifest["dtypes"].get(col), str(dtype))
+        else:
+            empty.setdefault(col, str(dtype))
+    has_dates = DATE_COL in columns
+
+    entries = {entry["path"]: entry for entry in manifest["partitions"]}
+    groups = df.groupby(partition_cols, observed=True, sort=True) if partition_cols else [((), df)]
+    for key, part in groups:
+        key = key if isinstance(key, tuple) else (key,)
+        values = {c: _scalar(v) for c, v in zip(partition_cols, key)}
+
+        rel_dir = Path(*[f"{c}={v}" for c, v in values.items()])
+        rel_path = (rel_dir / "part.csv").as_posix()
+        entry = entries.get(rel_path)
+        if entry is None:
+            (dataset_dir / rel_dir).mkdir(parents=True, exist_ok=True)
+            entry = {"path": rel_path, "values": values, "rows": 0}
+            entries[rel_path] = entry
+            manifest["partitions"].append(entry)
+
+        part.drop(columns=partition_cols).to_csv(
+            dataset_dir / rel_path, mode="a", header=entry["rows"] == 0, index=False
+        )
+        entry["rows"] += len(part)
+
+        if has_dates:
+            dates = parse_dates(part[DATE_COL]).dropna()
+            if len(dates):
+                lo, hi = dates.min().strftime("%Y-%m-%d"), dates.max().strftime("%Y-%m-%d")
+                entry["min_date"] = min(entry.get("min_date", lo), lo)
+                entry["max_date"] = max(entry.get("max_date", hi), hi)
+
+
+def merge_manifests(manifests):
+    """
+    Combine open manifests of one dataset appended to by separate workers.
+
+    Each worker appends its own partitions (start_dataset() ran once, before
+    the workers); the merged manifest is then closed with finish_dataset().
+
+    Args:
+        manifests (list[dict]): Open manifests of the same dataset.
+
+    Returns:
+        dict: One open manifest holding every partition.
+
+    Raises:
+        ValueError: If the workers wrote different column sets or the same
+            partition.
+    """
+    merged = {**manifests[0], "columns": None, "dtypes": {}, "partitions": [], "_empty_dtypes": {}}
+    seen = set()
+    for manifest in manifests:
+        if manifest["columns"] is None:
+            continue
+        if merged["columns"] is None:
+            merged["columns"] = manifest["columns"]
+            merged["partition_cols"] = manifest["partition_cols"]
+        elif set(manifest["columns"]) != set(merged["columns"]):
+            raise ValueError(f"{merged['dataset']}: workers wrote different columns")
+
+        for col, dtype in manifest["dtypes"].items():
+            merged["dtypes"][col] = _merge_dtype(merged["dtypes"].get(col), dtype)
+        for col, dtype in manifest.get("_empty_dtypes", {}).items():
+            merged["_empty_dtypes"].setdefault(col, dtype)
+
+        for entry in manifest["partitions"]:
+            if entry["path"] in seen:
+                raise ValueError(f"{merged['dataset']}: partition {entry['path']} written twice")
+            seen.add(entry["path"])
+            merged["partitions"].append(entry)
+
+    return merged
+
+
+def finish_dataset(manifest, root=STORE_DIR):
+    """
+    Write the manifest of a dataset built with append_dataset().
+
+    Columns that never held a value keep the dtype they were first given.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    empty = manifest.pop("_empty_dtypes", {})
+    manifest["columns"] = manifest["columns"] or []
+    manifest["dtypes"] = {
+        c: manifest["dtypes"].get(c, empty.get(c, "object")) for c in manifest["columns"]
+    }
+
+    with open(Path(root) / manifest["dataset"] / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def read_manifest(name, root=STORE_DIR):
+    """
+    Load the manifest of a stored dataset.
+    """
+    with open(Path(root) / name / MANIFEST_NAME, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def select_partitions(manifest, seasons=None, leagues=None, start=None, end=None):
+    """
+    Partitions of a manifest that can hold rows matching the filters.
+
+    Season and league filters match the partition values; the date range is
+    checked against each partition's stored min/max match_date.
+
+    Args:
+        manifest (dict): Output of read_manifest().
+        seasons: Season end years to keep (None keeps all).
+        leagues: Division codes to keep (None keeps all).
+        start, end: Inclusive match_date bounds (anything pd.Timestamp accepts).
+
+    Returns:
+        list[dict]: Selected manifest partition entries.
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    selected = []
+    for entry in manifest["partitions"]:
+        values = entry["values"]
+        if seasons is not None and "season" in values and values["season"] not in set(seasons):
+            continue
+        if leagues is not None and "league" in values and values["league"] not in set(leagues):
+            continue
+        if start is not None and "max_date" in entry and pd.Timestamp(entry["max_date"]) < start:
+            continue
+        if end is not None and "min_date" in entry and pd.Timestamp(entry["min_date"]) > end:
+            continue
+        selected.append(entry)
+
+    return selected
+
+
+def load_dataset(name, seasons=None, leagues=None, start=None, end=None, columns=None,
+                 root=STORE_DIR):
+    """
+    Read a stored dataset, opening only the partitions and columns needed.
+
+    Partitions are pruned with select_partitions(); only the requested
+    columns (plus match_date when a date range is given) are parsed from each
+    file, and rows outside the date range are dropped afterwards. Dtypes are
+    restored from the manifest and the compact schema is applied.
+
+    Args:
+        name (str): Dataset name (e.g. "model_data").
+        seasons: Season end years to load, e.g. [2024, 2025].
+        leagues: Division codes to load, e.g. ["E0"].
+        start, end: Inclusive match_date bounds.
+        columns (list[str] | None): Columns to return (None returns all).
+        root: Store root directory.
+
+    Returns:
+        pd.DataFrame: Matching rows in stored order (partition by partition).
+    """
+    manifest = read_manifest(name, root)
+    partition_cols = manifest["partition_cols"]
+    dtypes = manifest["dtypes"]
+    columns = list(columns) if columns is not None else manifest["columns"]
+
+    unknown = set(columns) - set(manifest["columns"])
+    if unknown:
+        raise KeyError(f"{name} has no columns {sorted(unknown)}")
+
+    filter_dates = start is not None or end is not None
+    file_cols = [c for c in columns if c not in partition_cols]
+    if filter_dates and DATE_COL not in file_cols:
+        file_cols.append(DATE_COL)
+
+    read_dtypes = {
+        c: dtypes[c] for c in file_cols
+        if not dtypes[c].startswith("datetime") and dtypes[c] != "object"
+    }
+    date_cols = [c for c in file_cols if dtypes[c].startswith("datetime")]
+
+    frames = []
+    for entry in select_partitions(manifest, seasons, leagues, start, end):
+        part = pd.read_csv(
+            Path(root) / name / entry["path"],
+            usecols=file_cols,
+            dtype=read_dtypes,
+        )
+        # the format of a date column is detected on the first partition only
+        for col in date_cols:
+            part[col] = parse_dates(part[col], source=f"{root}/{name}/{col}")
+        if filter_dates:
+            dates = parse_dates(part[DATE_COL])
+            keep = pd.Series(True, index=part.index)
+            if start is not None:
+                keep &= dates >= pd.Timestamp(start)
+            if end is not None:
+                keep &= dates <= pd.Timestamp(end)
+            part = part[keep]
+        for col, value in entry["values"].items():
+            if col in columns:
+                part[col] = value
+        frames.append(part)
+
+    if not frames:
+        return pd.DataFrame({c: pd.Series(dtype="object") for c in columns})
+
+    df = pd.concat(frames, ignore_index=True)
+    return compact_frame(df[columns])
+
+
+def export_csv(name, path, root=STORE_DIR):
+    """
+    Write a stored dataset as a single CSV, one partition at a time.
+
+    Partition values are put back as columns in the manifest's column
+    order, so the file has the layout of the in-memory dataset while only
+    one partition is ever held in memory.
+
+    Args:
+        name (str): Dataset name.
+        path: Output CSV.
+        root: Store root directory.
+
+    Returns:
+        int: Number of rows written.
+    """
+    manifest = read_manifest(name, root)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    rows = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if not manifest["partitions"]:
+            f.write(",".join(manifest["columns"]) + "\n")
+        for i, entry in enumerate(manifest["partitions"]):
+            # read as text, so values are copied exactly as stored
+            part = pd.read_csv(Path(root) / name / entry["path"], dtype=str, keep_default_na=False)
+            for col, value in entry["values"].items():
+                part[col] = str(value)
+            part[manifest["columns"]].to_csv(f, header=i == 0, index=False)
+            rows += len(part)
+
+    return rows
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+
+# ======================================================
+# DATE PARSING
+# ======================================================
+
+# Candidate formats, in order of preference when a column's format is detected
+DATE_FORMATS = (
+    "%Y-%m-%d",             # processed CSVs and the dataset store
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y",             # FBref match logs, e.g. 8/13/2021
+    "%d/%m/%Y",             # football-data.co.uk, e.g. 13/08/2021
+    "%d/%m/%y",             # older football-data.co.uk files, e.g. 13/08/21
+)
+
+# football-data.co.uk files are always day first
+DAYFIRST_FORMATS = ("%d/%m/%Y", "%d/%m/%y")
+
+# Detected format per source (e.g. file path), reused by later calls
+FORMAT_CACHE = {}
+
+
+def detect_date_format(values, formats=DATE_FORMATS):
+    """
+    Detect the format of a column of date strings.
+
+    Every candidate is tried on the distinct values with an explicit format
+    (no per-element inference).
+
+    Args:
+        values: Date strings (duplicates and NaN are fine).
+        formats (tuple[str]): Candidate strptime formats in order of preference.
+
+    Returns:
+        str | None: The first format parsing every value, else the one parsing
+        the most values; None if no format parses any.
+    """
+    uniques = pd.Index(pd.unique(pd.Series(values).dropna().astype(str)))
+
+    best, best_count = None, 0
+    for fmt in formats:
+        count = pd.to_datetime(uniques, format=fmt, errors="coerce").notna().sum()
+        if count == len(uniques):
+            return fmt
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+def parse_dates(values, formats=DATE_FORMATS, source=None):
+    """
+    Parse a date column once, with an explicit format.
+
+    Datetime columns are returned unchanged, so stages can call this on
+    frames that are already typed at no cost. Otherwise each distinct string
+    is parsed once (a date repeats for every match of a matchday and both
+    team rows of a match) with the format cached for source, or detected on
+    the distinct values. Values that format does not fit are retried with the
+    other candidates; values no candidate fits become NaT.
+
+    Args:
+        values (pd.Series): Date column.
+        formats (tuple[str]): Candidate strptime formats in order of preference.
+        source (str | None): Cache key for the detected format, e.g. the path
+            of the file the column was read from.
+
+    Returns:
+        pd.Series: datetime64 column with the index of values.
+    """
+    values = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Index(uniques).astype(str)
+
+    fmt = FORMAT_CACHE.get(source) if source is not None else None
+    if fmt is None:
+        fmt = detect_date_format(uniques, formats)
+        if source is not None and fmt is not None:
+            FORMAT_CACHE[source] = fmt
+
+    if fmt is not None:
+        parsed = pd.Series(pd.to_datetime(uniques, format=fmt, errors="coerce"))
+    else:
+        parsed = pd.Series(pd.NaT, index=range(len(uniques)), dtype="datetime64[us]")
+    for other in formats:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        if other != fmt:
+            fallback = pd.to_datetime(uniques[missing.to_numpy()], format=other, errors="coerce")
+            parsed[missing] = fallback
+
+    # code -1 (NaN) picks the NaT appended at the end
+    dates = np.append(parsed.to_numpy(), np.array(["NaT"], dtype=parsed.dtype))[codes]
+    return pd.Series(dates, index=values.index, name=values.name)
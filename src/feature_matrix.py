@@ -0,0 +1,211 @@
+import json
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sklearn.metrics import accuracy_score, log_loss
+
+from src.models import chronological_split, log_reg_pipeline
+
+
+# ======================================================
+# MEMORY-MAPPED FEATURE MATRIX
+# ======================================================
+
+FEATURE_MATRIX_DIR = Path("data/processed/feature_matrix")
+MANIFEST_NAME = "manifest.json"
+X_FILE = "x.npy"
+Y_FILE = "y.npy"
+
+BACKTEST_FOLDS = 5
+BACKTEST_REPORT_PATH = Path("results/backtest_report.txt")
+
+
+def _save_atomic(path, write):
+    tmp = path.with_name(f".{path.name}")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def write_feature_matrix(df: pd.DataFrame, out_dir=FEATURE_MATRIX_DIR) -> dict:
+    """
+    Materialize the diff_* features and the target as .npy arrays once.
+
+    Rows are those of chronological_split() (sorted by date, rows missing a
+    feature or the target dropped), so row i of the matrix is row i of the
+    x that train_models() fits on. x is a C-contiguous float64 array and y an
+    int8 array. The manifest is written last, so a reader never opens a
+    half-written matrix; its version changes on every write.
+
+    Args:
+        df (pd.DataFrame): Model dataset with diff_* features and target.
+        out_dir: Directory for x.npy, y.npy and manifest.json.
+
+    Returns:
+        dict: The manifest (columns, rows, file, dtype and shape of x and y).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    x, _, _, y_train, y_test = chronological_split(df)
+    arrays = {
+        "x": (X_FILE, np.ascontiguousarray(x.to_numpy(dtype=np.float64))),
+        "y": (Y_FILE, pd.concat([y_train, y_test]).to_numpy().astype(np.int8)),
+    }
+
+    manifest = {"columns": x.columns.tolist(), "rows": len(x), "version": uuid.uuid4().hex[:12]}
+    for key, (name, arr) in arrays.items():
+        _save_atomic(out_dir / name, lambda f: np.save(f, arr))
+        manifest[key] = {"file": name, "dtype": str(arr.dtype), "shape": list(arr.shape)}
+
+    _save_atomic(out_dir / MANIFEST_NAME, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+    return manifest
+
+
+def read_feature_manifest(matrix_dir=FEATURE_MATRIX_DIR) -> dict:
+    with open(Path(matrix_dir) / MANIFEST_NAME, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def open_feature_matrix(matrix_dir=FEATURE_MATRIX_DIR):
+    """
+    Open the feature matrix read-only and memory-mapped.
+
+    Nothing is read until rows are touched, and every process that opens the
+    same files shares their pages through the OS page cache, so workers add
+    no copy of the matrix. Row slices (x[a:b]) are views of the map.
+
+    Args:
+        matrix_dir: Directory written by write_feature_matrix().
+
+    Returns:
+        tuple: (x, y, manifest) with x and y as np.memmap arrays.
+
+    Raises:
+        ValueError: If an array does not match the manifest.
+    """
+    matrix_dir = Path(matrix_dir)
+    manifest = read_feature_manifest(matrix_dir)
+
+    arrays = []
+    for key in ("x", "y"):
+        arr = np.load(matrix_dir / manifest[key]["file"], mmap_mode="r")
+        if list(arr.shape) != manifest[key]["shape"] or str(arr.dtype) != manifest[key]["dtype"]:
+            raise ValueError(
+                f"{manifest[key]['file']} has shape {arr.shape} and dtype {arr.dtype}, "
+                f"manifest says {manifest[key]['shape']} and {manifest[key]['dtype']}"
+            )
+        arrays.append(arr)
+
+    return arrays[0], arrays[1], manifest
+
+
+@lru_cache(maxsize=4)
+def _open_cached(matrix_dir, version):
+    # one map per worker process and matrix version, reused across its tasks
+    return open_feature_matrix(matrix_dir)
+
+
+def backtest_folds(n_rows, n_folds=BACKTEST_FOLDS):
+    """
+    Expanding-window folds: fold k trains on the first k + 1 of n_folds + 1
+    equal blocks of rows and tests on the next block.
+
+    Returns:
+        list[tuple[int, int]]: (train_end, test_end) row bounds per fold.
+    """
+    bounds = np.linspace(0, n_rows, n_folds + 2).astype(int)
+    return [(int(bounds[k + 1]), int(bounds[k + 2])) for k in range(n_folds)]
+
+
+def backtest_tasks(matrix_dir=FEATURE_MATRIX_DIR, n_folds=BACKTEST_FOLDS):
+    """
+    Arguments of every backtest fold: the matrix location, its version and
+    row bounds only, so submitting a task pickles a few bytes whatever the
+    size of the matrix.
+    """
+    manifest = read_feature_manifest(matrix_dir)
+    return [
+        (str(matrix_dir), manifest["version"], train_end, test_end)
+        for train_end, test_end in backtest_folds(manifest["rows"], n_folds)
+    ]
+
+
+def _backtest_fold(args):
+    """
+    Fit the logistic regression of train_models() on one fold's training rows
+    and score its test rows.
+    """
+    matrix_dir, version, train_end, test_end = args
+    x, y, _ = _open_cached(matrix_dir, version)
+
+    model = log_reg_pipeline().fit(x[:train_end], y[:train_end])
+
+    proba = model.predict_proba(x[train_end:test_end])
+    y_test = y[train_end:test_end]
+    return {
+        "train_rows": train_end,
+        "test_rows": test_end - train_end,
+        "accuracy": accuracy_score(y_test, model.classes_[proba.argmax(axis=1)]),
+        "log_loss": log_loss(y_test, proba, labels=model.classes_),
+    }
+
+
+def backtest(matrix_dir=FEATURE_MATRIX_DIR, n_folds=BACKTEST_FOLDS, max_workers=None):
+    """
+    Walk-forward backtest of the logistic regression, one fold per worker.
+
+    Workers open the memory-mapped matrix themselves (see backtest_tasks()),
+    so memory stays flat as workers are added: each one only holds its
+    scaled training copy and the model.
+
+    Args:
+        matrix_dir: Directory written by write_feature_matrix().
+        n_folds (int): Number of expanding-window folds.
+        max_workers (int | None): Worker processes; 1 runs in-process.
+
+    Returns:
+        pd.DataFrame: train_rows, test_rows, accuracy and log_loss per fold.
+    """
+    tasks = backtest_tasks(matrix_dir, n_folds)
+
+    if max_workers == 1 or len(tasks) <= 1:
+        results = list(map(_backtest_fold, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_backtest_fold, tasks))
+
+    return pd.DataFrame(results).rename_axis("fold").reset_index()
+
+
+def run_backtest(df: pd.DataFrame, matrix_dir=FEATURE_MATRIX_DIR, n_folds=BACKTEST_FOLDS,
+                 max_workers=None, out_path=BACKTEST_REPORT_PATH) -> pd.DataFrame:
+    """
+    Write the feature matrix of df, backtest on it and save a report.
+
+    Returns:
+        pd.DataFrame: Per-fold results (see backtest()).
+    """
+    manifest = write_feature_matrix(df, matrix_dir)
+    print(f"Feature matrix {manifest['x']['shape']} saved to {matrix_dir}/")
+
+    folds = backtest(matrix_dir, n_folds, max_workers)
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w") as f:
+        f.write("WALK-FORWARD BACKTEST (LOGISTIC REGRESSION)\n")
+        f.write("===========================================\n\n")
+        f.write(folds.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        f.write(f"\n\nMean log-loss: {folds['log_loss'].mean():.4f}\n")
+        f.write(f"Mean accuracy: {folds['accuracy'].mean():.4f}\n")
+
+    print(f"Mean log-loss over {len(folds)} folds: {folds['log_loss'].mean():.4f}")
+    print(f"Backtest report saved to {out_path}")
+    return folds
@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+
+from src.feature_store import (
+    AGGREGATIONS,
+    GROUP_KEYS,
+    ewm_features,
+    ewm_name,
+    group_starts,
+    past_window_stats,
+)
+
+
+# ======================================================
+# TEAM-LEVEL COLUMNS
+# ======================================================
+
+# Match context copied to both team rows
+MATCH_COLUMNS = ["match_id", "match_date", "season", "league", "matchweek_num", "referee"]
+
+# Team-level column -> (source for the home team row, source for the away team row)
+TEAM_COLUMNS = {
+    "goals_for": ("home_goals", "away_goals"),
+    "goals_against": ("away_goals", "home_goals"),
+
+    "xg_for": ("home_xg", "away_xg"),
+    "xg_against": ("home_xg_against", "away_xg_against"),
+
+    "shots_for": ("home_shots", "away_shots"),
+    "shots_on_target_for": ("home_shots_on_target", "away_shots_on_target"),
+    "shots_on_target_against": ("home_shots_on_target_against", "away_shots_on_target_against"),
+
+    "possession": ("home_possession", "away_possession"),
+    "saves": ("home_saves", "away_saves"),
+
+    "clean_sheets": ("home_clean_sheets", "away_clean_sheets"),
+    "fouls": ("home_fouls", "away_fouls"),
+    "yellow_cards": ("home_yellow_cards", "away_yellow_cards"),
+
+    "blocks": ("home_blocks", "away_blocks"),
+    "clearances": ("home_clearances", "away_clearances"),
+
+    "odds_win": ("odds_avg_home_win", "odds_avg_away_win"),
+    "odds_draw": ("odds_avg_draw", "odds_avg_draw"),
+    "odds_lose": ("odds_avg_away_win", "odds_avg_home_win"),
+    "odds_over25": ("odds_avg_over25", "odds_avg_over25"),
+    "odds_under25": ("odds_avg_under25", "odds_avg_under25"),
+}
+
+
+# ======================================================
+# FEATURE SPEC
+# ======================================================
+
+# One entry per team-level feature, in model column order. Each entry is either
+#   - a window aggregate: metric (team-level column), window (matches, None =
+#     season to date), agg ("mean" | "sum", default "mean") and optional venue
+#     ("home" | "away": only matches at that venue count),
+#   - an exponentially weighted average: metric, agg "ewm", halflife (matches)
+#     and optional venue, or
+#   - a derived combination: combine = (left feature, op, right feature).
+# The model uses diff_<name> = home team value - away team value.
+FEATURE_SPEC = [
+    {"name": "avg_points_L5", "metric": "points", "window": 5},
+    {"name": "avg_points_L10", "metric": "points", "window": 10},
+    {"name": "avg_goals_for_L5", "metric": "goals_for", "window": 5},
+    {"name": "avg_goals_against_L5", "metric": "goals_against", "window": 5},
+    {"name": "clean_sheet_rate_L5", "metric": "clean_sheets", "window": 5},
+    {"name": "avg_xg_for_L5", "metric": "xg_for", "window": 5},
+    {"name": "avg_xg_against_L5", "metric": "xg_against", "window": 5},
+    {"name": "avg_shots_on_target_for_L5", "metric": "shots_on_target_for", "window": 5},
+    {"name": "avg_shots_on_target_against_L5", "metric": "shots_on_target_against", "window": 5},
+    {"name": "avg_possession_L5", "metric": "possession", "window": 5},
+    {"name": "avg_saves_L5", "metric": "saves", "window": 5},
+    {"name": "avg_fouls_L5", "metric": "fouls", "window": 5},
+    {"name": "avg_yellow_cards_L5", "metric": "yellow_cards", "window": 5},
+    {"name": "avg_blocks_L5", "metric": "blocks", "window": 5},
+    {"name": "avg_clearances_L5", "metric": "clearances", "window": 5},
+    {"name": "avg_points_home_L5", "metric": "points", "window": 5, "venue": "home"},
+    {"name": "avg_points_away_L5", "metric": "points", "window": 5, "venue": "away"},
+    {"name": "avg_goal_diff_L5", "combine": ("avg_goals_for_L5", "-", "avg_goals_against_L5")},
+    {"name": "avg_xg_diff_L5", "combine": ("avg_xg_for_L5", "-", "avg_xg_against_L5")},
+    {"name": "avg_discipline_L5", "combine": ("avg_fouls_L5", "+", "avg_yellow_cards_L5")},
+]
+
+VENUES = {"home": 1, "away": 0}
+
+OPERATORS = {
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": np.divide,
+}
+
+
+def compile_plan(spec=FEATURE_SPEC):
+    """
+    Validate a feature spec and turn it into an execution plan.
+
+    Shared intermediates are deduplicated: every distinct (metric, venue)
+    pair becomes one input column and every distinct window one prefix-sum
+    lookup, whatever the number of features using them. The whole plan then
+    runs as a single cumulative-sum pass (see execute_plan).
+
+    Args:
+        spec (list[dict]): Feature definitions (see FEATURE_SPEC).
+
+    Returns:
+        dict: Plan with keys
+            - "inputs": unique (metric, venue) pairs
+            - "windows": unique windows
+            - "aggs": unique aggregations
+            - "aggregates": (name, input index, window, agg) per window feature
+            - "halflives": unique EWM half-lives
+            - "ewm": (name, input index, halflife) per EWM feature
+            - "derived": (name, left, op, right) per combination, in dependency order
+            - "outputs": feature names in spec order
+
+    Raises:
+        ValueError: On duplicate names, unknown venue/agg/operator, or a
+            combination referring to a feature not defined before it.
+    """
+    inputs, windows, aggs, halflives = [], [], [], []
+    aggregates, ewms, derived, outputs = [], [], [], []
+
+    for entry in spec:
+        name = entry["name"]
+        if name in outputs:
+            raise ValueError(f"Duplicate feature name: {name}")
+
+        if "combine" in entry:
+            left, op, right = entry["combine"]
+            if op not in OPERATORS:
+                raise ValueError(f"{name}: unknown operator {op!r}")
+            for ref in (left, right):
+                if ref not in outputs:
+                    raise ValueError(f"{name}: {ref} must be defined before it is combined")
+            derived.append((name, left, op, right))
+        else:
+            venue = entry.get("venue")
+            agg = entry.get("agg", "mean")
+            if venue is not None and venue not in VENUES:
+                raise ValueError(f"{name}: unknown venue {venue!r}")
+            if agg not in AGGREGATIONS + ("ewm",):
+                raise ValueError(f"{name}: unknown aggregation {agg!r}")
+
+            key = (entry["metric"], venue)
+            if key not in inputs:
+                inputs.append(key)
+
+            if agg == "ewm":
+                if entry["halflife"] not in halflives:
+                    halflives.append(entry["halflife"])
+                ewms.append((name, inputs.index(key), entry["halflife"]))
+            else:
+                if entry["window"] not in windows:
+                    windows.append(entry["window"])
+                if agg not in aggs:
+                    aggs.append(agg)
+                aggregates.append((name, inputs.index(key), entry["window"], agg))
+
+        outputs.append(name)
+
+    return {
+        "inputs": inputs,
+        "windows": windows,
+        "aggs": aggs,
+        "aggregates": aggregates,
+        "halflives": halflives,
+        "ewm": ewms,
+        "derived": derived,
+        "outputs": outputs,
+    }
+
+
+def execute_plan(plan, df):
+    """
+    Compute every feature of a compiled plan for a team-level table.
+
+    Args:
+        plan (dict): Output of compile_plan().
+        df (pd.DataFrame): Team-level table sorted by (season, team, date).
+
+    Returns:
+        dict[str, np.ndarray]: Feature name -> float64 values aligned with
+        the rows of df, in plan["outputs"] order.
+    """
+    columns = []
+    for metric, venue in plan["inputs"]:
+        values = df[metric].to_numpy(dtype=np.float64)
+        if venue is not None:
+            values = np.where(df["is_home"].to_numpy() == VENUES[venue], values, np.nan)
+        columns.append(values)
+
+    values = np.column_stack(columns) if columns else np.empty((len(df), 0))
+    stats = past_window_stats(values, group_starts(df), plan["windows"], plan["aggs"])
+
+    features = {}
+    for name, j, window, agg in plan["aggregates"]:
+        features[name] = stats[window, agg][:, j]
+
+    if plan["ewm"]:
+        used = sorted({j for _, j, _ in plan["ewm"]})
+        inputs = pd.DataFrame(
+            {f"input_{j}": values[:, j] for j in used}, index=df.index
+        ).assign(**{k: df[k] for k in GROUP_KEYS})
+        smoothed = ewm_features(inputs, [f"input_{j}" for j in used], plan["halflives"])
+        for name, j, halflife in plan["ewm"]:
+            features[name] = smoothed[ewm_name(f"input_{j}", halflife)]
+    for name, left, op, right in plan["derived"]:
+        features[name] = OPERATORS[op](features[left], features[right])
+
+    return {name: features[name] for name in plan["outputs"]}
+
+
+def team_rows(df, side):
+    """
+    Team-level rows for one side of a match-level table.
+
+    Args:
+        df (pd.DataFrame): Match-level table (data_merged).
+        side (str): "home" or "away".
+
+    Returns:
+        pd.DataFrame: Match context, team/opponent, is_home and every
+        TEAM_COLUMNS column for that side.
+    """
+    home = side == "home"
+    source = 0 if home else 1
+
+    cols = {c: df[c] for c in MATCH_COLUMNS}
+    cols["team"] = df["home_team" if home else "away_team"]
+    cols["opponent"] = df["away_team" if home else "home_team"]
+    cols["is_home"] = VENUES[side]
+    cols.update({c: df[pair[source]] for c, pair in TEAM_COLUMNS.items()})
+
+    return pd.DataFrame(cols)
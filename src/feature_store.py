@@ -0,0 +1,304 @@
+import numpy as np
+import pandas as pd
+
+from src.schema import compact_frame
+
+
+# ======================================================
+# MULTI-WINDOW TEAM FEATURE STORE
+# ======================================================
+
+# Per-match team metrics averaged over past matches
+FEATURE_METRICS = [
+    "points",
+    "goals_for",
+    "goals_against",
+    "clean_sheets",
+    "xg_for",
+    "xg_against",
+    "shots_on_target_for",
+    "shots_on_target_against",
+    "possession",
+    "saves",
+    "fouls",
+    "yellow_cards",
+    "blocks",
+    "clearances",
+]
+
+# Window lengths in matches; None = season to date
+FEATURE_WINDOWS = (3, 5, 10, 20, None)
+
+# Half-lives in matches of the exponentially weighted averages
+EWM_HALFLIVES = (3, 10)
+
+GROUP_KEYS = ["season", "team"]
+SORT_KEYS = ["season", "team", "match_date", "match_id"]
+KEY_COLS = ["match_id", "match_date", "season", "league", "team", "is_home"]
+
+
+def feature_name(metric, window):
+    """
+    Column name of a windowed average, e.g. avg_points_L5 or avg_points_STD.
+    """
+    return f"avg_{metric}_STD" if window is None else f"avg_{metric}_L{window}"
+
+
+AGGREGATIONS = ("mean", "sum")
+
+
+def past_window_stats(values, group_start, windows=FEATURE_WINDOWS, aggs=("mean",)):
+    """
+    Sums and/or means of the previous `w` rows (excluding the current one)
+    for every window.
+
+    A single cumulative sum of the values (and of their non-NaN counts) is
+    taken over all rows; the aggregate over any window is then the difference
+    of two prefix rows, so each extra window is O(rows) index arithmetic rather
+    than another rolling pass. Windows are clipped at group_start, and NaN
+    values are skipped, matching shift(1).rolling(w, min_periods=1) within
+    each group.
+
+    Args:
+        values (np.ndarray): (n_rows, n_metrics) array, rows ordered by group
+            then time.
+        group_start (np.ndarray): For each row, the position of the first row
+            of its group.
+        windows: Window lengths; None means all previous rows of the group.
+        aggs: Aggregations to return, from AGGREGATIONS.
+
+    Returns:
+        dict: (window, agg) -> (n_rows, n_metrics) float64 array (NaN where
+        no previous value exists).
+    """
+    values = np.array(values, dtype=np.float64)
+    n, m = values.shape
+
+    present = ~np.isnan(values)
+    values[~present] = 0.0
+    sums = np.zeros((n + 1, m))
+    counts = np.zeros((n + 1, m), dtype=np.int32)
+    np.cumsum(values, axis=0, out=sums[1:])
+    np.cumsum(present, axis=0, out=counts[1:])
+    del values, present
+
+    # prefix rows up to (excluding) each row; row i's prefix is row i of sums
+    hi = np.arange(n)
+    out = {}
+    for window in windows:
+        lo = group_start if window is None else np.maximum(group_start, hi - window)
+        total = sums[:-1] - sums[lo]
+        count = counts[:-1] - counts[lo]
+        if "sum" in aggs:
+            out[window, "sum"] = np.where(count > 0, total, np.nan)
+        if "mean" in aggs:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                total /= count  # 0 / 0 -> NaN when no previous value
+            out[window, "mean"] = total
+
+    return out
+
+
+def past_window_means(values, group_start, windows=FEATURE_WINDOWS):
+    """
+    Means of the previous `w` rows for every window (see past_window_stats).
+
+    Returns:
+        dict: window -> (n_rows, n_metrics) float64 array of means.
+    """
+    stats = past_window_stats(values, group_start, windows, aggs=("mean",))
+    return {window: stats[window, "mean"] for window in windows}
+
+
+def group_starts(df, keys=GROUP_KEYS):
+    """
+    Position of the first row of each row's group in a frame sorted by keys.
+    """
+    group_id = df.groupby(keys, observed=True, sort=False).ngroup().to_numpy()
+    is_start = np.r_[True, group_id[1:] != group_id[:-1]]
+    return np.maximum.accumulate(np.where(is_start, np.arange(len(df)), 0))
+
+
+def window_features(df, metrics, windows=FEATURE_WINDOWS):
+    """
+    Past averages of several metrics over several windows in one pass.
+
+    Args:
+        df (pd.DataFrame): Team-level table sorted by SORT_KEYS.
+        metrics (list[str]): Metric columns to average.
+        windows: Window lengths; None means season to date.
+
+    Returns:
+        dict[str, np.ndarray]: feature_name(metric, window) -> float64 values
+        aligned with the rows of df.
+    """
+    means = past_window_means(df[metrics].to_numpy(dtype=np.float64), group_starts(df), windows)
+    return {
+        feature_name(metric, window): means[window][:, j]
+        for window in windows
+        for j, metric in enumerate(metrics)
+    }
+
+
+# ======================================================
+# EXPONENTIALLY WEIGHTED FORM
+# ======================================================
+
+def ewm_name(metric, halflife):
+    """
+    Column name of an exponentially weighted average, e.g. ewm_points_H3.
+    """
+    return f"ewm_{metric}_H{halflife:g}"
+
+
+def ewm_alpha(halflife):
+    """
+    Smoothing factor for a half-life in matches: a match's weight halves
+    after `halflife` further matches.
+    """
+    return 1 - 0.5 ** (1 / halflife)
+
+
+def ewm_features(df, metrics=FEATURE_METRICS, halflives=EWM_HALFLIVES):
+    """
+    Pre-match exponentially weighted averages of each metric per (season, team).
+
+    Uses the recursive form s = (1 - alpha) * s + alpha * x (pandas
+    adjust=False), started at the team's first value of the season and
+    skipping missing values, so the state after any match is a single
+    number per team and metric (see update_ewm_state). The value for a
+    match is the state before it: NaN for a team's first match.
+
+    Args:
+        df (pd.DataFrame): Team-level table sorted by SORT_KEYS.
+        metrics (list[str]): Metric columns to average.
+        halflives: Half-lives in matches.
+
+    Returns:
+        dict[str, np.ndarray]: ewm_name(metric, halflife) -> float64 values
+        aligned with the rows of df.
+    """
+    starts = group_starts(df)
+    is_start = starts == np.arange(len(df))
+    grouped = df.groupby(GROUP_KEYS, observed=True, sort=False)[metrics]
+
+    out = {}
+    for halflife in halflives:
+        post = (
+            grouped.ewm(alpha=ewm_alpha(halflife), adjust=False, ignore_na=True)
+            .mean()
+            .reset_index(level=list(range(len(GROUP_KEYS))), drop=True)
+            .reindex(df.index)
+            .to_numpy(dtype=np.float64)
+        )
+        pre = np.empty_like(post)
+        pre[0] = np.nan
+        pre[1:] = post[:-1]
+        pre[is_start] = np.nan
+        for j, metric in enumerate(metrics):
+            out[ewm_name(metric, halflife)] = pre[:, j]
+
+    return out
+
+
+def ewm_state(df, metrics=FEATURE_METRICS, halflife=EWM_HALFLIVES[0]):
+    """
+    Exponentially weighted averages after each team's last match.
+
+    Args:
+        df (pd.DataFrame): Team-level table (any order).
+        metrics (list[str]): Metric columns.
+        halflife: Half-life in matches.
+
+    Returns:
+        pd.DataFrame: One row per (season, team) with one column per metric.
+    """
+    df = df.sort_values(SORT_KEYS)
+    return (
+        df.groupby(GROUP_KEYS, observed=True, sort=True)[metrics]
+        .ewm(alpha=ewm_alpha(halflife), adjust=False, ignore_na=True)
+        .mean()
+        .groupby(level=list(range(len(GROUP_KEYS))), observed=True)
+        .last()
+    )
+
+
+def update_ewm_state(state, season, team, values, halflife=EWM_HALFLIVES[0]):
+    """
+    Fold one new match into the state in O(1) time and memory.
+
+    The updated row is what ewm_features() would give the team's next
+    match. A (season, team) not yet in the state starts from `values`;
+    missing values leave the corresponding metric unchanged.
+
+    Args:
+        state (pd.DataFrame): Output of ewm_state(), updated in place.
+        season, team: Key of the team that just played.
+        values (dict | pd.Series): Metric -> value of the new match.
+        halflife: Half-life the state was built with.
+
+    Returns:
+        pd.Series: The team's new state.
+    """
+    alpha = ewm_alpha(halflife)
+    new = pd.Series(values, dtype="float64").reindex(state.columns)
+
+    key = (season, team)
+    if key in state.index:
+        old = state.loc[key].astype("float64")
+        blended = (1 - alpha) * old + alpha * new
+        new = blended.where(new.notna() & old.notna(), old.where(new.isna(), new))
+
+    state.loc[key, :] = new.to_numpy()
+    return state.loc[key]
+
+
+def build_feature_store(df, metrics=FEATURE_METRICS, windows=FEATURE_WINDOWS,
+                        halflives=EWM_HALFLIVES):
+    """
+    Materialize every (metric, window) past average, and every (metric,
+    half-life) exponentially weighted average, as one wide table.
+
+    Rows are team-matches ordered by season, team and date; the values of a
+    row only use that team's earlier matches in the same season. Feature
+    columns are float32, key columns use the compact schema.
+
+    Args:
+        df (pd.DataFrame): Team-level table (build_data_before_engineering output).
+        metrics (list[str]): Metric columns to average.
+        windows: Window lengths; None adds the season-to-date average.
+        halflives: Half-lives of the ewm_<metric>_H<h> columns.
+
+    Returns:
+        pd.DataFrame: Key columns plus one avg_<metric>_<window> column per
+        (metric, window) pair and one ewm_<metric>_H<h> column per
+        (metric, half-life) pair.
+    """
+    df = df.sort_values(SORT_KEYS).reset_index(drop=True)
+    metrics = [m for m in metrics if m in df.columns]
+
+    features = window_features(df, metrics, windows)
+    features.update(ewm_features(df, metrics, halflives))
+    features = {name: values.astype(np.float32) for name, values in features.items()}
+
+    keys = df[[c for c in KEY_COLS if c in df.columns]]
+    return compact_frame(pd.concat([keys, pd.DataFrame(features, index=df.index)], axis=1))
+
+
+def select_features(store, metrics=None, windows=None):
+    """
+    Sub-table of the feature store for the given metrics and windows.
+
+    Args:
+        store (pd.DataFrame): Output of build_feature_store().
+        metrics (list[str] | None): Metrics to keep (None keeps all present).
+        windows: Windows to keep (None keeps FEATURE_WINDOWS).
+
+    Returns:
+        pd.DataFrame: Key columns plus the selected feature columns.
+    """
+    metrics = metrics or FEATURE_METRICS
+    windows = FEATURE_WINDOWS if windows is None else windows
+    cols = [feature_name(m, w) for w in windows for m in metrics]
+    cols = [c for c in cols if c in store.columns]
+    return store[[c for c in KEY_COLS if c in store.columns] + cols]
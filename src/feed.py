@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from src.data_loader import RAW_DIR, SEASON_FILE_PREFIXES, load_file
+
+
+# ======================================================
+# FEED INGESTION (CONDITIONAL HTTP FETCHES)
+# ======================================================
+
+FEED_FILES = [f"{prefix}.csv" for prefix in SEASON_FILE_PREFIXES]
+FEED_CACHE_NAME = ".feed_cache.json"
+FEED_CONNECTIONS = 4
+FEED_INTERVAL_S = 300.0
+FEED_TIMEOUT_S = 30.0
+
+# Status of a file whose request failed (timeout, refused or dropped connection)
+FEED_ERROR = "error"
+
+
+def read_feed_cache(raw_dir=RAW_DIR):
+    """
+    Validators (ETag, Last-Modified) of the files fetched so far, per file name.
+    """
+    path = Path(raw_dir) / FEED_CACHE_NAME
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_feed_cache(cache, raw_dir=RAW_DIR):
+    path = Path(raw_dir) / FEED_CACHE_NAME
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+
+def _connect(url, timeout=FEED_TIMEOUT_S):
+    parts = urlsplit(url)
+    cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    return cls(parts.hostname, parts.port, timeout=timeout)
+
+
+def _get(conn, path, headers):
+    # the body is read in full so the connection can serve the next request
+    conn.request("GET", path, headers=headers)
+    resp = conn.getresponse()
+    return resp.status, dict(resp.getheaders()), resp.read()
+
+
+async def _fetch_file(pool, base_url, name, validators):
+    """
+    Conditional GET of one file on a pooled connection.
+
+    A dropped keep-alive connection is reopened once. A timeout, or a
+    reconnect that fails too, only fails this file: the connection is
+    closed (the next request on it reconnects) and FEED_ERROR is returned.
+
+    Returns:
+        tuple: (status, response headers, body), or (FEED_ERROR, {}, the
+        exception) if the request failed.
+    """
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    path = urlsplit(urljoin(base_url, name)).path
+
+    conn = await pool.get()
+    try:
+        try:
+            return await asyncio.to_thread(_get, conn, path, headers)
+        except (http.client.HTTPException, ConnectionError):
+            # the server closed an idle keep-alive connection; reconnect once
+            conn.close()
+            return await asyncio.to_thread(_get, conn, path, headers)
+    except (http.client.HTTPException, OSError) as exc:
+        # TimeoutError and refused connections are OSErrors
+        conn.close()
+        return FEED_ERROR, {}, exc
+    finally:
+        pool.put_nowait(conn)
+
+
+async def fetch_feed(base_url, names=FEED_FILES, cache=None, connections=FEED_CONNECTIONS):
+    """
+    Fetch the feed files that changed since the validators in cache.
+
+    Requests go out concurrently over a pool of at most `connections`
+    keep-alive connections (the blocking http.client calls run in threads).
+    Each request carries the file's ETag (If-None-Match) and Last-Modified
+    (If-Modified-Since) from the previous fetch, so an unchanged file costs
+    one 304 response without a body.
+
+    Args:
+        base_url (str): Feed URL the file names are relative to.
+        names (list[str]): File names to poll.
+        cache (dict | None): Validators per file name (read_feed_cache()).
+        connections (int): Size of the connection pool.
+
+    Returns:
+        dict[str, tuple]: (status, response headers, body) per file name;
+        see _fetch_file() for failed requests.
+    """
+    cache = cache or {}
+    base_url = base_url if base_url.endswith("/") else base_url + "/"
+
+    pool = asyncio.Queue()
+    conns = [_connect(base_url) for _ in range(max(1, min(connections, len(names))))]
+    for conn in conns:
+        pool.put_nowait(conn)
+
+    try:
+        responses = await asyncio.gather(*(
+            _fetch_file(pool, base_url, name, cache.get(name, {})) for name in names
+        ))
+    finally:
+        for conn in conns:
+            conn.close()
+
+    return dict(zip(names, responses))
+
+
+def ingest_feed(base_url, names=FEED_FILES, raw_dir=RAW_DIR, connections=FEED_CONNECTIONS):
+    """
+    Poll the feed once and hand the new or changed files to load_file().
+
+    A downloaded file is written under raw_dir/.feed/ and parsed with
+    load_file() first; only a file that parses replaces the copy in raw_dir
+    and has its validators cached (raw_dir/.feed_cache.json), so a truncated
+    or malformed download is fetched again on the next poll.
+
+    Args:
+        base_url (str): Feed URL the file names are relative to.
+        names (list[str]): File names to poll (e.g. "24_25.csv").
+        raw_dir: Directory the accepted files are written to.
+        connections (int): Size of the connection pool.
+
+    Returns:
+        tuple[dict, dict]: HTTP status per file name (FEED_ERROR if its
+        request failed), and the load_file() frame of every file that was
+        accepted.
+    """
+    raw_dir = Path(raw_dir)
+    staging = raw_dir / ".feed"
+    staging.mkdir(parents=True, exist_ok=True)
+
+    # a file deleted locally is fetched in full again
+    cache = {
+        name: v for name, v in read_feed_cache(raw_dir).items()
+        if (raw_dir / Path(name).name).exists()
+    }
+    responses = asyncio.run(fetch_feed(base_url, names, cache, connections))
+
+    statuses, frames = {}, {}
+    for name, (status, headers, body) in responses.items():
+        statuses[name] = status
+        if status == 304:
+            continue
+        if status == FEED_ERROR:
+            print(f"{name}: request failed ({body!r}), keeping the current copy")
+            continue
+        if status != 200:
+            print(f"{name}: HTTP {status}, keeping the current copy")
+            continue
+
+        part = staging / Path(name).name
+        part.write_bytes(body)
+        try:
+            frames[name] = load_file(part)
+        except Exception as exc:
+            print(f"{name}: download does not parse ({exc}), keeping the current copy")
+            part.unlink()
+            continue
+
+        os.replace(part, raw_dir / part.name)
+        cache[name] = {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+    write_feed_cache(cache, raw_dir)
+    return statuses, frames
+
+
+def run_feed(base_url, names=FEED_FILES, raw_dir=RAW_DIR, interval=FEED_INTERVAL_S,
+             max_polls=None, connections=FEED_CONNECTIONS):
+    """
+    Poll the feed every `interval` seconds (see ingest_feed()).
+
+    Accepted files land in raw_dir, where `python main.py --watch` picks them up.
+    Failed requests are logged and retried on the next poll; polling goes on.
+    """
+    polls = 0
+    try:
+        while max_polls is None or polls < max_polls:
+            t0 = time.perf_counter()
+            try:
+                statuses, frames = ingest_feed(base_url, names, raw_dir, connections)
+            except OSError as exc:
+                print(f"Poll failed ({exc!r}), retrying in {interval:g}s")
+            else:
+                unchanged = sum(s == 304 for s in statuses.values())
+                failed = sum(s == FEED_ERROR for s in statuses.values())
+                print(f"{len(statuses)} files polled in {time.perf_counter() - t0:.2f}s: "
+                      f"{len(frames)} updated ({', '.join(frames) or '-'}), {unchanged} unchanged, "
+                      f"{failed} failed")
+            polls += 1
+            if max_polls is None or polls < max_polls:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped polling")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Poll a feed for season and odds CSV files")
+    parser.add_argument("url", help="feed URL the file names are relative to")
+    parser.add_argument("--files", nargs="+", default=FEED_FILES, help="file names to poll")
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--interval", type=float, default=FEED_INTERVAL_S, help="seconds between polls")
+    parser.add_argument("--polls", type=int, default=None, help="stop after this many polls")
+    parser.add_argument("--connections", type=int, default=FEED_CONNECTIONS, help="connection pool size")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_feed(args.url, args.files, args.raw_dir, args.interval, args.polls, args.connections)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
+import copy
+import os
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import joblib
-import matplotlib.pyplot as plt
+from joblib import Parallel, delayed
 
 
 from sklearn.linear_model import LogisticRegression
@@ -9,7 +12,17 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report, log_loss
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
-from sklearn.metrics import ConfusionMatrixDisplay
+
+from src.rendering import render_confusion_matrix, submit_figure
+from src.dates import parse_dates
+
+
+PERMUTATION_REPEATS = 10
+PERMUTATION_SEED = 42
+PERMUTATION_IMPORTANCE_PATH = Path("results/permutation_importance.txt")
+# Most stacked rows one permutation job predicts at once (repeats are chunked to fit)
+PERMUTATION_CHUNK_ROWS = 100_000
+
 
 def save_confusion_matrix_png(cm, labels, title, out_path, display_labels=None):
     """
@@ -17,17 +30,17 @@ def save_confusion_matrix_png(cm, labels, title, out_path, display_labels=None):
     This helper centralizes plotting logic so that all models (and the bookmaker
     baseline) produce comparable, consistently formatted confusion matrix figures
     for reporting and reproducibility.
-    """
-    out_path = Path(out_path)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=display_labels or labels)
-    fig, ax = plt.subplots()
-    disp.plot(ax=ax, values_format="d")
-    ax.set_title(title)
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=200)
-    plt.close(fig)
+    Rendering is queued on the background render pool (see src.rendering), so
+    the call returns immediately; it is a no-op in headless mode.
+    """
+    return submit_figure(
+        render_confusion_matrix,
+        cm,
+        display_labels or labels,
+        title,
+        str(out_path),
+    )
 
 
 
@@ -117,7 +130,62 @@ def evaluate_bookmaker(df: pd.DataFrame):
     }
 
 
-def train_models(df: pd.DataFrame, book_metrics: dict = None):
+def _chronological_rows(df: pd.DataFrame) -> pd.DataFrame:
+    # rows by date, without those missing a feature or the target
+    df = df.copy()
+    if "match_date" in df.columns:
+        df["match_date"] = parse_dates(df["match_date"])
+        df = df.sort_values("match_date").reset_index(drop=True)
+
+    valid = df.filter(regex="^diff_").notna().all(axis=1) & df["target"].notna()
+    return df.loc[valid].reset_index(drop=True)
+
+
+def _split_rows(rows: pd.DataFrame):
+    x = rows.filter(regex="^diff_")
+    y = rows["target"]
+
+    split_idx = int(len(x) * 0.8)
+
+    x_train, x_test = x.iloc[:split_idx], x.iloc[split_idx:]
+    y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
+    return x, x_train, x_test, y_train, y_test
+
+
+def chronological_split(df: pd.DataFrame):
+    """
+    Features and targets of the model dataset, split 80/20 in time.
+
+    Args:
+        df (pd.DataFrame): Model dataset with diff_* features and target.
+
+    Returns:
+        tuple: (x, x_train, x_test, y_train, y_test) with rows missing a
+        feature or the target dropped.
+    """
+    return _split_rows(_chronological_rows(df))
+
+
+def log_reg_pipeline():
+    """
+    Unfitted logistic regression of train_models(): standardized features
+    and a multinomial lbfgs fit. The batch refits of the online model and
+    the walk-forward backtest use the same pipeline.
+
+    Returns:
+        Pipeline: StandardScaler + LogisticRegression.
+    """
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("clf", LogisticRegression(
+            solver="lbfgs",
+            max_iter=2000,
+            random_state=42
+        ))
+    ])
+
+
+def train_models(df: pd.DataFrame, book_metrics: dict = None, write_summary: bool = True):
     """
     Train and evaluate ML classifiers on engineered match-level features.
 
@@ -139,44 +207,34 @@ def train_models(df: pd.DataFrame, book_metrics: dict = None):
         book_metrics (dict | None): Optional bookmaker baseline metrics as returned
             by evaluate_bookmaker(), used to include baseline performance in the
             final summary.
+        write_summary (bool): Write the final summary (see
+            write_results_summary()); callers that evaluate the bookmaker
+            concurrently write it themselves afterwards.
 
     Returns:
-        tuple: (log_reg_model, rf_model, metrics)
+        tuple: (log_reg_model, rf_model, metrics, test_proba)
             - log_reg_model: sklearn Pipeline (StandardScaler + LogisticRegression)
             - rf_model: RandomForestClassifier
             - metrics (dict): Nested dictionary with per-model metrics (accuracy,
               log_loss, classes).
+            - test_proba (dict): Test-set probabilities per model ("log_reg",
+              "rf"), as DataFrames in x_test order with one column per class
+              and the match_ids as index (a RangeIndex without match_id), so
+              later stages reuse them instead of predicting again.
     """
 
-    df = df.copy()
-    if "match_date" in df.columns:
-        df["match_date"] = pd.to_datetime(df["match_date"], errors="coerce")
-        df = df.sort_values("match_date").reset_index(drop=True)
-    
-    x = df.filter(regex="^diff_")
-    y = df["target"]
-    valid = x.notna().all(axis=1) & y.notna()
-    x = x.loc[valid].reset_index(drop=True)
-    y = y.loc[valid].reset_index(drop=True)
-    
-    split_idx = int(len(x) * 0.8)
-
-    x_train, x_test = x.iloc[:split_idx], x.iloc[split_idx:]
-    y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
+    rows = _chronological_rows(df)
+    x, x_train, x_test, y_train, y_test = _split_rows(rows)
+    test_ids = (
+        pd.Index(rows["match_id"].iloc[len(x_train):], name="match_id")
+        if "match_id" in rows.columns else pd.RangeIndex(len(x_test))
+    )
 
     print(f"Train size: {len(x_train)} | Test size: {len(x_test)}")
 
     metrics = {}
     
-    log_reg = Pipeline([
-        ("scaler", StandardScaler()),
-        ("clf", LogisticRegression(
-            solver="lbfgs",
-            max_iter=2000,
-            random_state=42
-        ))
-    ])
-
+    log_reg = log_reg_pipeline()
     log_reg.fit(x_train, y_train)
 
     coef = log_reg.named_steps["clf"].coef_
@@ -369,10 +427,27 @@ def train_models(df: pd.DataFrame, book_metrics: dict = None):
 
     print("Feature list saved to models/features_list.txt")
 
-    # ======================================================
-    # FINAL RESULTS SUMMARY (MODELS + BOOKMAKER)
-    # ======================================================
+    if write_summary:
+        write_results_summary(metrics, book_metrics)
+
+    test_proba = {
+        "log_reg": pd.DataFrame(y_proba_log, index=test_ids, columns=log_reg.classes_),
+        "rf": pd.DataFrame(y_proba_rf, index=test_ids, columns=rf.classes_),
+    }
+    return log_reg, rf, metrics, test_proba
+
+
+def write_results_summary(metrics: dict, book_metrics: dict = None):
+    """
+    Write the final comparison of the ML models and the bookmaker baseline.
 
+    Args:
+        metrics (dict): Per-model metrics as returned by train_models().
+        book_metrics (dict | None): Bookmaker metrics from evaluate_bookmaker().
+
+    Returns:
+        pd.DataFrame: Accuracy and log-loss per model.
+    """
     summary_rows = {
         "Logistic Regression": {
             "Accuracy": metrics["log_reg"]["accuracy"],
@@ -406,6 +481,174 @@ def train_models(df: pd.DataFrame, book_metrics: dict = None):
     with open("results/final_results_summary.txt", "w", encoding="utf-8") as f:
         f.write(summary_text)
 
+    return summary_df
+
+
+# ======================================================
+# PERMUTATION FEATURE IMPORTANCE
+# ======================================================
+
+def _row_scores(proba, y_codes, n_rows):
+    """
+    Log-loss and accuracy of each consecutive block of n_rows predictions.
+    """
+    proba = np.clip(proba, 1e-15, 1)
+    proba = proba / proba.sum(axis=1, keepdims=True)
+    picked = np.log(proba[np.arange(len(proba)), np.tile(y_codes, len(proba) // n_rows)])
+    correct = proba.argmax(axis=1) == np.tile(y_codes, len(proba) // n_rows)
+    return -picked.reshape(-1, n_rows).mean(axis=1), correct.reshape(-1, n_rows).mean(axis=1)
+
+
+def _single_threaded(model):
+    # a shallow copy predicting on the calling thread (the fitted trees are
+    # shared), so permutation jobs do not each start a pool of their own
+    if "n_jobs" not in model.get_params(deep=False):
+        return model
+    model = copy.copy(model)
+    model.n_jobs = 1
+    return model
+
+
+def _permuted_scores(model, x_test, y_codes, column, orders):
+    """
+    Scores of a model with one column shuffled, once per row order.
+
+    The repeats are stacked into a single frame so the model predicts them in
+    one call; permutation_importance() passes at most PERMUTATION_CHUNK_ROWS
+    rows' worth of orders.
+    """
+    n_rows = len(x_test)
+    stacked = pd.concat([x_test] * len(orders), ignore_index=True)
+    values = x_test[column].to_numpy()
+    stacked[column] = np.concatenate([values[order] for order in orders])
+    return _row_scores(model.predict_proba(stacked), y_codes, n_rows)
+
+
+def permutation_importance(models, x_test, y_test, baseline_proba, n_repeats=PERMUTATION_REPEATS,
+                           seed=PERMUTATION_SEED, n_jobs=-1, out_path=PERMUTATION_IMPORTANCE_PATH):
+    """
+    Permutation importance of every feature on the chronological test set.
+
+    Importance is the increase in test log-loss (and drop in accuracy) when one
+    feature's values are shuffled across test matches, averaged over
+    n_repeats shuffles. Unlike impurity importance or coefficients, it is
+    comparable across models and unaffected by feature scaling.
+
+    The baseline scores come from the test-set probabilities the caller
+    already computed. Features run in parallel (threads, since the models
+    release the GIL while predicting), at most one thread per core, and the
+    models predict single-threaded inside them. The repeats of one feature
+    are predicted in stacked calls of at most PERMUTATION_CHUNK_ROWS rows,
+    which bounds the memory of every job. Every model sees the same row
+    orders.
+
+    Args:
+        models (dict): Fitted classifiers by display name.
+        x_test (pd.DataFrame): Test features.
+        y_test (pd.Series): Test targets.
+        baseline_proba (dict): Unpermuted test probabilities per model name
+            (columns in the order of the model's classes_).
+        n_repeats (int): Shuffles per feature.
+        seed (int): Seed of the row orders.
+        n_jobs (int): Parallel jobs (-1 uses every core; capped at the
+            number of cores).
+        out_path: Text report of the importances.
+
+    Returns:
+        pd.DataFrame: model, feature, log-loss increase (mean, std) and
+        accuracy drop (mean), sorted by model and importance.
+    """
+    rng = np.random.default_rng(seed)
+    orders = {
+        col: [rng.permutation(len(x_test)) for _ in range(n_repeats)]
+        for col in x_test.columns
+    }
+
+    cores = os.cpu_count() or 1
+    n_jobs = cores if n_jobs < 0 else min(n_jobs, cores)
+    chunk = max(1, PERMUTATION_CHUNK_ROWS // max(1, len(x_test)))
+    tasks = [
+        (col, start) for col in x_test.columns for start in range(0, n_repeats, chunk)
+    ]
+
+    rows = []
+    for name, model in models.items():
+        classes = list(model.classes_)
+        y_codes = np.array([classes.index(v) for v in y_test])
+        base_ll, base_acc = _row_scores(np.asarray(baseline_proba[name]), y_codes, len(x_test))
+
+        worker = _single_threaded(model)
+        chunks = Parallel(n_jobs=n_jobs, prefer="threads")(
+            delayed(_permuted_scores)(worker, x_test, y_codes, col, orders[col][start:start + chunk])
+            for col, start in tasks
+        )
+        lls = {col: [] for col in x_test.columns}
+        accs = {col: [] for col in x_test.columns}
+        for (col, _), (ll, acc) in zip(tasks, chunks):
+            lls[col].append(ll)
+            accs[col].append(acc)
+
+        for col in x_test.columns:
+            ll, acc = np.concatenate(lls[col]), np.concatenate(accs[col])
+            rows.append({
+                "model": name,
+                "feature": col,
+                "log_loss_increase": (ll - base_ll[0]).mean(),
+                "log_loss_increase_std": (ll - base_ll[0]).std(),
+                "accuracy_drop": (base_acc[0] - acc).mean(),
+            })
+
+    table = pd.DataFrame(rows).sort_values(
+        ["model", "log_loss_increase"], ascending=[True, False], kind="stable"
+    ).reset_index(drop=True)
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("PERMUTATION FEATURE IMPORTANCE (TEST SET)\n")
+        f.write("================================\n\n")
+        f.write(f"Shuffles per feature: {n_repeats}\n\n")
+        for name, part in table.groupby("model", sort=False):
+            f.write(f"{name}\n")
+            f.write("Feature                              Log-loss increase (std)  Accuracy drop\n")
+            f.write("-" * 78 + "\n")
+            for r in part.itertuples():
+                f.write(f"{r.feature:35s} {r.log_loss_increase:+.4f} ({r.log_loss_increase_std:.4f})"
+                        f"        {r.accuracy_drop:+.4f}\n")
+            f.write("\n")
+
+    print(f"Permutation importance saved to {out_path}")
+
+    return table
+
+
+def evaluate_permutation_importance(df: pd.DataFrame, log_reg, rf, n_repeats: int = PERMUTATION_REPEATS,
+                                    test_proba: dict = None):
+    """
+    Permutation importance of the trained models on their test set.
+
+    The unshuffled test-set probabilities are the baseline of every shuffle;
+    they are taken from train_models() when given, and predicted once
+    otherwise.
+
+    Args:
+        df (pd.DataFrame): The model dataset train_models() was given.
+        log_reg, rf: Models returned by train_models().
+        n_repeats (int): Shuffles per feature.
+        test_proba (dict | None): Test-set probabilities returned by
+            train_models().
+
+    Returns:
+        pd.DataFrame: See permutation_importance().
+    """
+    _, _, x_test, _, y_test = chronological_split(df)
+    models = {"Logistic Regression": log_reg, "Random Forest": rf}
+    if test_proba is not None:
+        baseline = {
+            "Logistic Regression": test_proba["log_reg"].to_numpy(),
+            "Random Forest": test_proba["rf"].to_numpy(),
+        }
+    else:
+        baseline = {name: model.predict_proba(x_test) for name, model in models.items()}
+    return permutation_importance(models, x_test, y_test, baseline, n_repeats)
 
-    return log_reg, rf, metrics
-    
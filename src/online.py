@@ -0,0 +1,347 @@
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, log_loss
+
+from src.dates import parse_dates
+from src.models import log_reg_pipeline
+
+
+# ======================================================
+# ONLINE MULTINOMIAL LOGISTIC REGRESSION
+# ======================================================
+
+ONLINE_MODEL_PATH = Path("models/online_model.json")
+ONLINE_REPORT_PATH = Path("results/online_model_report.txt")
+
+CLASSES = [-1, 0, 1]
+
+DEFAULT_PARAMS = {
+    "learning_rate": 0.01,      # AdaGrad step size
+    "epochs": 1,                # passes over each matchweek's rows
+    "C": 1.0,                   # inverse L2 strength, as in LogisticRegression
+    "reconcile_every": 8,       # matchweeks between batch refits (0 never)
+}
+
+
+def new_online_model(features, params=None):
+    """
+    Untrained online model: running standardizer, weights and AdaGrad state.
+
+    Args:
+        features (list[str]): Feature columns, in model order.
+        params (dict | None): Overrides of DEFAULT_PARAMS.
+
+    Returns:
+        dict: Model state (numpy arrays; see save_online_model()).
+    """
+    n_classes, n_features = len(CLASSES), len(features)
+    return {
+        "params": {**DEFAULT_PARAMS, **(params or {})},
+        "features": list(features),
+        "classes": list(CLASSES),
+        "n_seen": 0,
+        "mean": np.zeros(n_features),
+        "m2": np.zeros(n_features),
+        "coef": np.zeros((n_classes, n_features)),
+        "intercept": np.zeros(n_classes),
+        "grad_sq": np.zeros((n_classes, n_features + 1)),
+        "n_updates": 0,
+        "since_reconcile": 0,
+        "as_of": None,
+        "reconciliations": [],
+    }
+
+
+def _rows(state, df):
+    # rows with every feature and the target present
+    x = df[state["features"]]
+    valid = x.notna().all(axis=1)
+    if "target" in df.columns:
+        valid &= df["target"].notna()
+    return x[valid].to_numpy(dtype=float), valid
+
+
+def _scale(state, x):
+    std = np.sqrt(state["m2"] / max(state["n_seen"], 1))
+    return (x - state["mean"]) / np.where(std > 0, std, 1.0)
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def update_standardizer(state, x):
+    """
+    Merge a batch into the running feature means and variances.
+
+    Uses the pairwise (Chan et al.) update, so the statistics equal a
+    StandardScaler fitted on every row seen so far while only n, the mean and
+    the sum of squared deviations are kept.
+    """
+    n_a, n_b = state["n_seen"], len(x)
+    if n_b == 0:
+        return state
+    mean_b = x.mean(axis=0)
+    m2_b = ((x - mean_b) ** 2).sum(axis=0)
+    delta = mean_b - state["mean"]
+    n = n_a + n_b
+
+    state["mean"] = state["mean"] + delta * n_b / n
+    state["m2"] = state["m2"] + m2_b + delta ** 2 * n_a * n_b / n
+    state["n_seen"] = n
+    return state
+
+
+def partial_fit(state, df):
+    """
+    Update the model on new rows (e.g. one matchweek).
+
+    The standardizer absorbs the rows first; then params["epochs"] full-batch
+    AdaGrad steps on the multinomial log-loss (with the L2 penalty of
+    LogisticRegression, spread over all rows seen) update the weights. Cost
+    depends only on the number of new rows, not on the history.
+
+    Args:
+        state (dict): Model state (new_online_model()).
+        df (pd.DataFrame): New rows with the feature columns and target.
+
+    Returns:
+        dict: The updated state.
+    """
+    x, valid = _rows(state, df)
+    if len(x) == 0:
+        return state
+    y = df.loc[valid, "target"].to_numpy()
+    onehot = (y[:, None] == np.array(state["classes"])[None, :]).astype(float)
+
+    update_standardizer(state, x)
+    z = _scale(state, x)
+
+    p = state["params"]
+    ridge = 1.0 / (p["C"] * state["n_seen"])
+    for _ in range(p["epochs"]):
+        err = _softmax(z @ state["coef"].T + state["intercept"]) - onehot
+        grad = np.column_stack([err.T @ z / len(z) + ridge * state["coef"], err.mean(axis=0)])
+        state["grad_sq"] += grad ** 2
+        step = p["learning_rate"] * grad / (np.sqrt(state["grad_sq"]) + 1e-8)
+        state["coef"] -= step[:, :-1]
+        state["intercept"] -= step[:, -1]
+
+    if "match_date" in df.columns:
+        state["as_of"] = parse_dates(df["match_date"]).max().strftime("%Y-%m-%d")
+    state["n_updates"] += 1
+    state["since_reconcile"] += 1
+    return state
+
+
+def predict_online(state, df):
+    """
+    Outcome probabilities, columns in CLASSES order (NaN where features are missing).
+    """
+    x = df[state["features"]].to_numpy(dtype=float)
+    proba = _softmax(_scale(state, np.nan_to_num(x)) @ state["coef"].T + state["intercept"])
+    proba[np.isnan(x).any(axis=1)] = np.nan
+    return proba
+
+
+def reconcile(state, history):
+    """
+    Refit in batch on the full history and move the online model onto it.
+
+    The online and batch log-loss on the history are recorded, then the
+    standardizer and weights are replaced with the batch fit (the AdaGrad
+    accumulators are kept, so later steps stay small).
+
+    Args:
+        state (dict): Model state.
+        history (pd.DataFrame): Every row the model should have learned from.
+
+    Returns:
+        dict: The reconciliation record (also appended to the state).
+    """
+    x, valid = _rows(state, history)
+    y = history.loc[valid, "target"].to_numpy()
+    batch = log_reg_pipeline().fit(x, y)
+    scaler, clf = batch.named_steps["scaler"], batch.named_steps["clf"]
+
+    record = {
+        "n_rows": len(x),
+        "n_updates": state["n_updates"],
+        "online_log_loss": (
+            float(log_loss(y, predict_online(state, history[valid]), labels=state["classes"]))
+            if state["n_seen"] else None
+        ),
+        "batch_log_loss": float(log_loss(y, clf.predict_proba(scaler.transform(x)), labels=clf.classes_)),
+    }
+
+    order = [list(clf.classes_).index(c) for c in state["classes"]]
+    state["n_seen"] = len(x)
+    state["mean"] = scaler.mean_.copy()
+    state["m2"] = scaler.var_ * len(x)
+    state["coef"] = clf.coef_[order].copy()
+    state["intercept"] = clf.intercept_[order].copy()
+    state["since_reconcile"] = 0
+    state["reconciliations"].append(record)
+    return record
+
+
+def update_online_model(state, week, history=None):
+    """
+    Weekly update: partial fit on the new rows, plus a batch reconciliation
+    every params["reconcile_every"] updates when the history is given.
+
+    Args:
+        state (dict): Model state.
+        week (pd.DataFrame): The new matchweek's rows.
+        history (pd.DataFrame | None): All rows up to and including week.
+
+    Returns:
+        dict: The updated state.
+    """
+    partial_fit(state, week)
+    every = state["params"]["reconcile_every"]
+    if history is not None and every and state["since_reconcile"] >= every:
+        reconcile(state, history)
+    return state
+
+
+def save_online_model(state, path=ONLINE_MODEL_PATH):
+    """
+    Checkpoint the model state as JSON.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in state.items()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_online_model(path=ONLINE_MODEL_PATH):
+    """
+    Read a state written by save_online_model().
+    """
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    for key in ["mean", "m2", "coef", "intercept", "grad_sq"]:
+        state[key] = np.array(state[key], dtype=float)
+    return state
+
+
+def matchweeks(dates):
+    """
+    Matchweek (Monday-to-Sunday calendar week) of each match date.
+    """
+    return parse_dates(dates).dt.to_period("W-SUN")
+
+
+def walk_forward(df, params=None, train_frac=0.8):
+    """
+    Replay the test period week by week with the online model.
+
+    The model is reconciled (batch fit) on the training period, then for every
+    matchweek of the test period it predicts the week's matches before
+    learning from them.
+
+    Args:
+        df (pd.DataFrame): Model dataset sorted by date (diff_* features, target).
+        params (dict | None): Overrides of DEFAULT_PARAMS.
+        train_frac (float): Share of matches before the test period.
+
+    Returns:
+        tuple[dict, pd.DataFrame, list[float]]: Final state, test predictions
+        (match_id, target, p_away, p_draw, p_home) and seconds per weekly update.
+    """
+    df = df.reset_index(drop=True)
+    features = [c for c in df.columns if c.startswith("diff_")]
+    split_idx = int(len(df) * train_frac)
+
+    state = new_online_model(features, params)
+    reconcile(state, df.iloc[:split_idx])
+
+    test = df.iloc[split_idx:]
+    predictions, update_s = [], []
+    for _, week in test.groupby(matchweeks(test["match_date"]), sort=True):
+        proba = predict_online(state, week)
+        predictions.append(pd.DataFrame({
+            "match_id": week["match_id"].to_numpy(),
+            "target": week["target"].to_numpy(),
+            "p_away": proba[:, 0],
+            "p_draw": proba[:, 1],
+            "p_home": proba[:, 2],
+        }))
+
+        t0 = time.perf_counter()
+        partial_fit(state, week)
+        update_s.append(time.perf_counter() - t0)
+
+        every = state["params"]["reconcile_every"]
+        if every and state["since_reconcile"] >= every:
+            reconcile(state, df.loc[:week.index.max()])
+
+    return state, pd.concat(predictions, ignore_index=True), update_s
+
+
+def run_online_evaluation(df, params=None, out_path=ONLINE_REPORT_PATH, model_path=ONLINE_MODEL_PATH):
+    """
+    Walk-forward evaluation of the online model against a frozen batch model.
+
+    Writes a report and checkpoints the final state, which later weeks can
+    continue from with update_online_model().
+
+    Args:
+        df (pd.DataFrame): Model dataset sorted by date.
+        params (dict | None): Overrides of DEFAULT_PARAMS.
+        out_path: Text report.
+        model_path: Checkpoint of the final state.
+
+    Returns:
+        dict: accuracy and log_loss of the online model, the frozen model's
+        log_loss, and the mean update time in milliseconds.
+    """
+    state, preds, update_s = walk_forward(df, params)
+    proba = preds[["p_away", "p_draw", "p_home"]].to_numpy()
+    y = preds["target"]
+
+    split_idx = int(len(df) * 0.8)
+    train, test = df.iloc[:split_idx], df.iloc[split_idx:]
+    features = state["features"]
+    frozen = log_reg_pipeline().fit(train[features], train["target"])
+
+    metrics = {
+        "accuracy": accuracy_score(y, np.array(CLASSES)[proba.argmax(axis=1)]),
+        "log_loss": log_loss(y, proba, labels=CLASSES),
+        "frozen_log_loss": log_loss(test["target"], frozen.predict_proba(test[features]), labels=CLASSES),
+        "update_ms": 1000 * float(np.mean(update_s)),
+    }
+
+    print("\n Online logistic regression (weekly updates)")
+    print(f"{len(update_s)} matchweeks, {metrics['update_ms']:.2f} ms per update, "
+          f"{len(state['reconciliations']) - 1} batch reconciliations")
+    print("Log-loss:", metrics["log_loss"], "| frozen batch model:", metrics["frozen_log_loss"])
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("ONLINE LOGISTIC REGRESSION (WALK-FORWARD)\n")
+        f.write("================================\n\n")
+        f.write(f"Matchweeks: {len(update_s)}\n")
+        f.write(f"Mean update time: {metrics['update_ms']:.3f} ms\n")
+        f.write(f"Accuracy: {metrics['accuracy']}\n")
+        f.write(f"Log-loss: {metrics['log_loss']}\n")
+        f.write(f"Frozen batch model log-loss: {metrics['frozen_log_loss']}\n\n")
+        f.write("Reconciliations (log-loss on history, online before -> batch refit)\n")
+        for r in state["reconciliations"]:
+            online = "-" if r["online_log_loss"] is None else f"{r['online_log_loss']:.4f}"
+            f.write(f"  after {r['n_updates']:3d} updates, {r['n_rows']} rows: {online} -> {r['batch_log_loss']:.4f}\n")
+
+    save_online_model(state, model_path)
+    print(f"Online model report saved to {out_path}, state to {model_path}")
+
+    return metrics
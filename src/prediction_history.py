@@ -0,0 +1,295 @@
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src import run_registry
+from src.dates import parse_dates
+from src.probabilistic_evaluation import BOOK_COLUMNS, bookmaker_probabilities
+from src.run_registry import CLASS_ORDER
+
+
+# ======================================================
+# PREDICTION HISTORY (APPEND-ONLY SQLITE)
+# ======================================================
+
+HISTORY_PATH = Path("results/prediction_history.sqlite")
+
+PREDICTION_COLUMNS = [
+    "match_id", "model", "model_version", "prediction_time",
+    "match_date", "season", "home_team", "away_team",
+    "p_away", "p_draw", "p_home", "book_away", "book_draw", "book_home",
+]
+
+# Columns returned by the queries: predictions with the outcome joined in
+COLUMNS = PREDICTION_COLUMNS[:8] + ["target"] + PREDICTION_COLUMNS[8:]
+
+# Outcomes live in their own table: a prediction is usually stored before the
+# match is played, and the result is appended once it is known
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    match_id         TEXT NOT NULL,
+    model            TEXT NOT NULL,
+    model_version    TEXT NOT NULL,
+    prediction_time  TEXT NOT NULL,
+    match_date       TEXT,
+    season           INTEGER,
+    home_team        TEXT,
+    away_team        TEXT,
+    p_away           REAL,
+    p_draw           REAL,
+    p_home           REAL,
+    book_away        REAL,
+    book_draw        REAL,
+    book_home        REAL,
+    PRIMARY KEY (match_id, model_version, prediction_time)
+);
+
+CREATE TABLE IF NOT EXISTS outcomes (
+    match_id     TEXT PRIMARY KEY,
+    target       INTEGER NOT NULL,
+    recorded_at  TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_history_latest
+    ON predictions(match_id, model, prediction_time);
+CREATE INDEX IF NOT EXISTS idx_history_home ON predictions(home_team, season);
+CREATE INDEX IF NOT EXISTS idx_history_away ON predictions(away_team, season);
+
+CREATE TRIGGER IF NOT EXISTS history_no_update BEFORE UPDATE ON predictions
+BEGIN
+    SELECT RAISE(ABORT, 'prediction history is append-only');
+END;
+
+CREATE TRIGGER IF NOT EXISTS history_no_delete BEFORE DELETE ON predictions
+BEGIN
+    SELECT RAISE(ABORT, 'prediction history is append-only');
+END;
+
+CREATE TRIGGER IF NOT EXISTS outcomes_no_update BEFORE UPDATE ON outcomes
+BEGIN
+    SELECT RAISE(ABORT, 'prediction history is append-only');
+END;
+
+CREATE TRIGGER IF NOT EXISTS outcomes_no_delete BEFORE DELETE ON outcomes
+BEGIN
+    SELECT RAISE(ABORT, 'prediction history is append-only');
+END;
+"""
+
+# Latest prediction of each (match, model) among the rows matching the filters;
+# the subquery is one seek on idx_history_latest per row
+LATEST = """
+    p.prediction_time = (
+        SELECT MAX(q.prediction_time) FROM predictions q
+        WHERE q.match_id = p.match_id AND q.model = p.model
+    )
+"""
+
+# Predictions with their outcome (NULL until the match is played); the join
+# is one primary-key seek per row
+SELECT = f"""
+    SELECT {", ".join("o.target" if c == "target" else f"p.{c}" for c in COLUMNS)}
+    FROM predictions p LEFT JOIN outcomes o ON o.match_id = p.match_id
+"""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def connect(path: Path | str = HISTORY_PATH) -> sqlite3.Connection:
+    """
+    Open the prediction history, creating the database and schema if needed
+    (see run_registry.connect()).
+    """
+    return run_registry.connect(path, SCHEMA)
+
+
+def model_version(name: str, model) -> str:
+    """
+    Version tag of a fitted model: its name and a hash of its pickled state.
+
+    Refitting with the same data and parameters gives the same version, so
+    repeated runs of an unchanged model differ only in prediction_time.
+
+    Args:
+        name (str): Model name, e.g. "log_reg" or "rf".
+        model: Fitted estimator.
+
+    Returns:
+        str: e.g. "log_reg-3f2a9c1e04b7".
+    """
+    return f"{name}-{joblib.hash(model)[:12]}"
+
+
+def record_outcomes(df: pd.DataFrame, recorded_at: str | None = None,
+                    path: Path | str = HISTORY_PATH) -> int:
+    """
+    Append the outcomes of played matches.
+
+    Rows with a missing target (unplayed fixtures) are skipped. The first
+    outcome stored for a match is kept; the table is append-only like the
+    predictions.
+
+    Args:
+        df (pd.DataFrame): Matches with columns match_id and target.
+        recorded_at (str | None): ISO timestamp; defaults to now (UTC).
+        path (Path | str): History location.
+
+    Returns:
+        int: Number of outcomes added.
+    """
+    played = df.loc[df["target"].notna(), ["match_id", "target"]]
+    rows = zip(
+        played["match_id"].astype(str),
+        played["target"].astype(int).tolist(),
+        [recorded_at or _now()] * len(played),
+    )
+    with closing(connect(path)) as con, con:
+        before = con.total_changes
+        con.executemany("INSERT OR IGNORE INTO outcomes VALUES (?, ?, ?)", rows)
+        return con.total_changes - before
+
+
+def append_predictions(df: pd.DataFrame, model: str, version: str, proba,
+                       prediction_time: str | None = None,
+                       path: Path | str = HISTORY_PATH) -> int:
+    """
+    Append one model's predictions with the bookmaker probabilities.
+
+    Rows are never updated or deleted (the tables have triggers that abort
+    both); appending a (match_id, model_version, prediction_time) that is
+    already stored is a no-op. The known outcomes in df are appended with
+    record_outcomes(); unplayed fixtures (target NaN) get theirs later.
+
+    Args:
+        df (pd.DataFrame): Matches being predicted, with columns match_id,
+            match_date, season, home_team, away_team, target (NaN if not
+            played yet) and the odds_lose/odds_draw/odds_win bookmaker odds.
+        model (str): Model name.
+        version (str): Model version (see model_version()).
+        proba: Array of shape (n_matches, 3) with probabilities in
+            CLASS_ORDER (away win, draw, home win).
+        prediction_time (str | None): ISO timestamp of the predictions;
+            defaults to now (UTC).
+        path (Path | str): History location.
+
+    Returns:
+        int: Number of predictions added.
+
+    Raises:
+        ValueError: If proba does not have one row per match and column per class.
+    """
+    proba = np.asarray(proba, dtype=float)
+    if proba.shape != (len(df), len(CLASS_ORDER)):
+        raise ValueError(f"proba has shape {proba.shape}, expected ({len(df)}, {len(CLASS_ORDER)})")
+    book = pd.DataFrame(bookmaker_probabilities(df))[BOOK_COLUMNS].to_numpy(dtype=float)
+    prediction_time = prediction_time or _now()
+
+    rows = pd.DataFrame({
+        "match_id": df["match_id"].astype(str).to_numpy(),
+        "model": model,
+        "model_version": version,
+        "prediction_time": prediction_time,
+        "match_date": parse_dates(df["match_date"]).dt.strftime("%Y-%m-%d").to_numpy(),
+        "season": df["season"].astype(int).to_numpy(),
+        "home_team": df["home_team"].to_numpy(),
+        "away_team": df["away_team"].to_numpy(),
+        "p_away": proba[:, 0],
+        "p_draw": proba[:, 1],
+        "p_home": proba[:, 2],
+        "book_away": book[:, 0],
+        "book_draw": book[:, 1],
+        "book_home": book[:, 2],
+    })[PREDICTION_COLUMNS]
+
+    with closing(connect(path)) as con, con:
+        before = con.total_changes
+        con.executemany(
+            f"INSERT OR IGNORE INTO predictions ({', '.join(PREDICTION_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(PREDICTION_COLUMNS))})",
+            rows.itertuples(index=False, name=None),
+        )
+        added = con.total_changes - before
+
+    record_outcomes(df, prediction_time, path)
+    return added
+
+
+def team_predictions(team: str, season: int | None = None, model: str | None = None,
+                     latest: bool = False, path: Path | str = HISTORY_PATH) -> pd.DataFrame:
+    """
+    Predictions for the matches of one team (home or away).
+
+    Uses the home_team and away_team indexes, so the cost grows with the
+    team's rows rather than with the size of the history.
+
+    Args:
+        team (str): Team name as in data_merged (e.g. "arsenal").
+        season (int | None): Restrict to one season.
+        model (str | None): Restrict to one model; all models when None.
+        latest (bool): Keep only the latest prediction per match and model.
+        path (Path | str): History location.
+
+    Returns:
+        pd.DataFrame: COLUMNS (target NaN for unplayed matches), by match
+        date, model and prediction time.
+    """
+    home, away = "p.home_team = ?", "p.away_team = ?"
+    params = [team, team]
+    if season is not None:
+        home, away = f"{home} AND p.season = ?", f"{away} AND p.season = ?"
+        params = [team, season, team, season]
+
+    where = [f"({home} OR {away})"]
+    if model is not None:
+        where.append("p.model = ?")
+        params.append(model)
+    if latest:
+        where.append(LATEST)
+
+    query = f"""
+        {SELECT}
+        WHERE {" AND ".join(where)}
+        ORDER BY p.match_date, p.match_id, p.model, p.prediction_time
+    """
+    with closing(connect(path)) as con:
+        return pd.read_sql_query(query, con, params=params)
+
+
+def latest_predictions(match_ids=None, model: str | None = None,
+                       path: Path | str = HISTORY_PATH) -> pd.DataFrame:
+    """
+    Latest prediction per match and model.
+
+    Args:
+        match_ids (list[str] | None): Restrict to these matches (index seeks);
+            every match in the history when None.
+        model (str | None): Restrict to one model; all models when None.
+        path (Path | str): History location.
+
+    Returns:
+        pd.DataFrame: COLUMNS (target NaN for unplayed matches), one row
+        per (match, model).
+    """
+    where, params = [LATEST], []
+    if match_ids is not None:
+        match_ids = [str(m) for m in match_ids]
+        where.append(f"p.match_id IN ({', '.join('?' * len(match_ids))})")
+        params += match_ids
+    if model is not None:
+        where.append("p.model = ?")
+        params.append(model)
+
+    query = f"""
+        {SELECT}
+        WHERE {" AND ".join(where)}
+        ORDER BY p.match_date, p.match_id, p.model
+    """
+    with closing(connect(path)) as con:
+        return pd.read_sql_query(query, con, params=params)
@@ -5,6 +5,12 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 
+from src.dates import parse_dates
+
+
+# Bookmaker probability columns in CLASS_ORDER (away win, draw, home win)
+BOOK_COLUMNS = ["book_away", "book_draw", "book_home"]
+
 
 def bookmaker_probabilities(row):
     """
@@ -14,11 +20,17 @@ def bookmaker_probabilities(row):
     normalized to sum to 1 per match. This produces a probability distribution
     that can be directly compared to model predicted probabilities.
 
+    The arithmetic is element-wise, so a whole DataFrame can be passed
+    instead of a row: pd.DataFrame(bookmaker_probabilities(df))[BOOK_COLUMNS]
+    gives one row per match in CLASS_ORDER.
+
     Args:
-        row: A pandas row containing odds columns: odds_win, odds_draw, odds_lose.
+        row: A pandas row (or DataFrame) containing odds columns: odds_win,
+            odds_draw, odds_lose.
 
     Returns:
-        dict: Normalized bookmaker probabilities with keys:
+        dict: Normalized bookmaker probabilities (scalars, or Series for a
+        DataFrame) with keys:
             - "book_home"
             - "book_draw"
             - "book_away"
@@ -126,7 +138,7 @@ def run_probabilistic_evaluation(
         print("Loading dataset...")
     df = pd.read_csv(data_path)
 
-    df["match_date"] = pd.to_datetime(df["match_date"])
+    df["match_date"] = parse_dates(df["match_date"], source=str(data_path))
     df = df.sort_values("match_date").reset_index(drop=True)
     df = df.dropna().reset_index(drop=True)
     
@@ -159,7 +171,7 @@ def run_probabilistic_evaluation(
     df_test["model_draw"] = proba[:, 1]
     df_test["model_home_win"] = proba[:, 2]
     
-    book_probs = df_test.apply(bookmaker_probabilities, axis=1, result_type="expand")
+    book_probs = pd.DataFrame(bookmaker_probabilities(df_test))
     df_test = pd.concat([df_test, book_probs], axis=1)
     
     if verbose:
@@ -0,0 +1,188 @@
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+# ======================================================
+# PER-STAGE INSTRUMENTATION
+# ======================================================
+
+PROFILE_DIR = Path("results/profiles")
+
+
+def count_rows(obj):
+    """
+    Count DataFrame/Series rows in a stage input or output.
+
+    Tuples and lists (e.g. the (home, away) pair from prepare_home_away) are
+    summed over their pandas members. Returns None when nothing tabular is found.
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, (tuple, list)):
+        counts = [count_rows(o) for o in obj]
+        counts = [c for c in counts if c is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def rss_mb():
+    """
+    Current resident set size of the process in MB (None if unavailable).
+
+    Read from /proc/self/statm on Linux; elsewhere falls back to the
+    lifetime peak from getrusage.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 ** 2) if sys.platform == "darwin" else peak / 1024
+
+
+class StageProfiler:
+    """
+    Record wall time, CPU time, memory and row counts for pipeline stages.
+
+    CPU time is that of the thread running the stage, and memory is the
+    change in process RSS over the stage.
+
+    Each stage produces one record; the list of records is written as a JSON
+    profile at the end of the run. Python-level peak allocations are tracked
+    with tracemalloc when trace_memory is True (slower), and a cProfile dump
+    per stage is written when cprofile_dir is given.
+
+    Args:
+        run_name (str | None): Identifier used for the profile file name.
+        trace_memory (bool): Track tracemalloc peak per stage.
+        cprofile_dir (Path | str | None): Directory for per-stage .prof files
+            (one sub-directory per run).
+    """
+
+    def __init__(self, run_name=None, trace_memory=False, cprofile_dir=None):
+        self.run_name = run_name or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self.trace_memory = trace_memory
+        self.cprofile_dir = Path(cprofile_dir) if cprofile_dir else None
+        self.records = []
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Context manager measuring one stage.
+
+        The yielded dict is the stage record; callers may set "rows_out"
+        (or any extra key) on it before the block exits.
+        """
+        record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+
+        profiler = None
+        if self.cprofile_dir is not None:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        # CPU time of the calling thread, so stages running concurrently in
+        # other threads are not counted; work in child processes is not either
+        wall0 = time.perf_counter()
+        cpu0 = time.thread_time()
+        rss0 = rss_mb()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall0, 6)
+            record["cpu_s"] = round(time.thread_time() - cpu0, 6)
+
+            if profiler is not None:
+                profiler.disable()
+                run_dir = self.cprofile_dir / self.run_name
+                run_dir.mkdir(parents=True, exist_ok=True)
+                prof_path = run_dir / f"{len(self.records):02d}_{name}.prof"
+                profiler.dump_stats(prof_path)
+                record["cprofile"] = str(prof_path)
+
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                record["tracemalloc_peak_mb"] = round(peak / 1024 ** 2, 3)
+                if started_tracing:
+                    tracemalloc.stop()
+
+            rss1 = rss_mb()
+            record["rss_mb"] = None if rss1 is None else round(rss1, 3)
+            # the process RSS is shared, so with concurrent stages the delta
+            # includes their allocations too (run with --jobs 1 to isolate)
+            record["rss_delta_mb"] = None if rss0 is None or rss1 is None else round(rss1 - rss0, 3)
+            self.records.append(record)
+
+    def call(self, name, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) as a measured stage and return its result.
+
+        Row counts are inferred from DataFrame arguments and the return value.
+        """
+        rows_in = count_rows(list(args) + list(kwargs.values()))
+        with self.stage(name, rows_in=rows_in) as record:
+            result = fn(*args, **kwargs)
+            record["rows_out"] = count_rows(result)
+        return result
+
+    def summary(self):
+        """
+        Stage records as a DataFrame (one row per stage).
+        """
+        summary = pd.DataFrame(self.records)
+        for col in ["rows_in", "rows_out"]:
+            summary[col] = summary[col].astype("Int64")
+        return summary
+
+    def write(self, path=None):
+        """
+        Write the profile as JSON.
+
+        Args:
+            path (Path | str | None): Output file; defaults to
+                results/profiles/profile_<run_name>.json.
+
+        Returns:
+            Path: The written file.
+        """
+        path = Path(path) if path else PROFILE_DIR / f"profile_{self.run_name}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        payload = {
+            "run_name": self.run_name,
+            "started_at": self.started_at,
+            "total_wall_s": round(sum(r["wall_s"] for r in self.records), 6),
+            "total_cpu_s": round(sum(r["cpu_s"] for r in self.records), 6),
+            "trace_memory": self.trace_memory,
+            "stages": self.records,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+
+        return path
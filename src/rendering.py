@@ -0,0 +1,152 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from sklearn.metrics import ConfusionMatrixDisplay
+
+
+# ======================================================
+# BACKGROUND FIGURE RENDERING
+# ======================================================
+
+PLOTS_ENABLED = os.environ.get("EPL_NO_PLOTS", "").lower() not in ("1", "true", "yes")
+RENDER_WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()  # pipeline stages submit from several threads
+_pending = []
+
+
+def set_plots_enabled(enabled: bool):
+    """
+    Switch figure rendering on or off for the whole process.
+
+    When disabled (headless mode), every render request is dropped before any
+    matplotlib work happens. This is meant for CI and retraining jobs that only
+    need metrics and never look at the PNGs.
+
+    Args:
+        enabled (bool): False to skip all rendering.
+    """
+    global PLOTS_ENABLED
+    PLOTS_ENABLED = bool(enabled)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=RENDER_WORKERS)
+    return _executor
+
+
+def _new_axes():
+    """
+    Create a standalone Agg figure and axes without touching pyplot state.
+
+    Figures created this way are not registered with the pyplot figure manager,
+    so they are released as soon as the render function returns.
+    """
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def _save(fig, out_path, **savefig_kwargs):
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    fig.tight_layout()
+    fig.savefig(out_path, **savefig_kwargs)
+    fig.clear()
+
+
+def render_confusion_matrix(cm, display_labels, title, out_path):
+    """
+    Render a confusion matrix to a PNG file (runs inside a worker process).
+    """
+    fig, ax = _new_axes()
+    disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=display_labels)
+    disp.plot(ax=ax, values_format="d")
+    ax.set_title(title)
+    _save(fig, out_path, dpi=200)
+
+
+def render_bar(labels, values, ylabel, title, out_path):
+    """
+    Render a simple bar chart to a PNG file (runs inside a worker process).
+    """
+    fig, ax = _new_axes()
+    ax.bar([str(label) for label in labels], list(values))
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    _save(fig, out_path, bbox_inches="tight")
+
+
+def render_histogram(values, bins, xlabel, ylabel, title, out_path, weights=None):
+    """
+    Render a histogram to a PNG file (runs inside a worker process).
+
+    Pre-binned data can be drawn by passing bin centers as values, the bin
+    edges as bins and the bin counts as weights.
+    """
+    fig, ax = _new_axes()
+    ax.hist(values, bins=bins, weights=weights)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    _save(fig, out_path, bbox_inches="tight")
+
+
+def submit_figure(render_fn, *args, **kwargs):
+    """
+    Queue a figure for rendering in the background process pool.
+
+    The caller only pays for pickling the (small) plot inputs; the actual
+    drawing and PNG encoding happen in a worker process so training and
+    evaluation are not blocked. In headless mode the request is ignored.
+
+    Args:
+        render_fn: One of the module-level render_* functions.
+        *args, **kwargs: Arguments forwarded to render_fn.
+
+    Returns:
+        concurrent.futures.Future | None: Future of the render job, or None
+        when plotting is disabled.
+    """
+    if not PLOTS_ENABLED:
+        return None
+
+    future = _get_executor().submit(render_fn, *args, **kwargs)
+    _pending.append(future)
+    return future
+
+
+def wait_for_figures():
+    """
+    Block until every queued figure has been written to disk.
+
+    Errors raised inside a worker are re-raised here so that a failed render
+    is not silently lost.
+
+    Returns:
+        int: Number of figures that were waited on.
+    """
+    n = len(_pending)
+    while _pending:
+        _pending.pop(0).result()
+    return n
+
+
+def _shutdown():
+    global _executor
+    if _executor is not None:
+        _pending.clear()
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+atexit.register(_shutdown)
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import sqlite3
+import uuid
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.dates import parse_dates
+
+
+# ======================================================
+# RUN REGISTRY (SQLITE)
+# ======================================================
+
+REGISTRY_PATH = Path("results/run_registry.sqlite")
+
+CLASS_ORDER = [-1, 0, 1]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    started_at  TEXT NOT NULL,
+    config      TEXT NOT NULL,
+    data_hash   TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id  TEXT NOT NULL REFERENCES runs(run_id),
+    model   TEXT NOT NULL,
+    metric  TEXT NOT NULL,
+    value   REAL,
+    PRIMARY KEY (run_id, model, metric)
+);
+
+CREATE TABLE IF NOT EXISTS predictions (
+    run_id          TEXT NOT NULL REFERENCES runs(run_id),
+    model           TEXT NOT NULL,
+    match_id        TEXT NOT NULL,
+    match_date      TEXT,
+    season          INTEGER,
+    matchweek_num   INTEGER,
+    target          INTEGER,
+    p_away          REAL,
+    p_draw          REAL,
+    p_home          REAL,
+    log_loss        REAL,
+    PRIMARY KEY (run_id, model, match_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_runs_started_at ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_predictions_match ON predictions(match_id);
+CREATE INDEX IF NOT EXISTS idx_predictions_model ON predictions(model, run_id);
+CREATE INDEX IF NOT EXISTS idx_predictions_run_season
+    ON predictions(run_id, model, season, log_loss);
+"""
+
+
+def connect(path: Path | str = REGISTRY_PATH, schema: str = SCHEMA) -> sqlite3.Connection:
+    """
+    Open the run registry, creating the database and schema if needed.
+
+    Args:
+        path (Path | str): Location of the SQLite file.
+        schema (str): Idempotent DDL run on every connection (the
+            prediction history passes its own).
+
+    Returns:
+        sqlite3.Connection: Open connection (caller is responsible for closing).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path)
+    con.executescript(schema)
+    return con
+
+
+def hash_files(paths) -> str:
+    """
+    Compute a SHA-256 fingerprint over the content of several files.
+
+    Files are hashed in sorted path order so the fingerprint only changes when
+    the data itself changes.
+
+    Args:
+        paths: Iterable of file paths.
+
+    Returns:
+        str: Hex digest.
+    """
+    h = hashlib.sha256()
+    for p in sorted(Path(p) for p in paths):
+        h.update(p.name.encode())
+        with open(p, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def start_run(config: dict, data_hash: str, path: Path | str = REGISTRY_PATH) -> str:
+    """
+    Register a new pipeline run.
+
+    Args:
+        config (dict): Run configuration (hyperparameters, split, flags). Must be
+            JSON-serializable; non-serializable values are stored as strings.
+        data_hash (str): Fingerprint of the input data (see hash_files).
+        path (Path | str): Registry location.
+
+    Returns:
+        str: The new run_id.
+    """
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    run_id = f"{started_at.replace(':', '').replace('-', '')[:15]}_{uuid.uuid4().hex[:8]}"
+
+    with closing(connect(path)) as con, con:
+        con.execute(
+            "INSERT INTO runs (run_id, started_at, config, data_hash) VALUES (?, ?, ?, ?)",
+            (run_id, started_at, json.dumps(config, sort_keys=True, default=str), data_hash),
+        )
+
+    return run_id
+
+
+def log_metrics(run_id: str, model: str, metrics: dict, path: Path | str = REGISTRY_PATH):
+    """
+    Store scalar metrics for one model of a run.
+
+    Non-numeric entries (e.g. the list of classes returned by train_models)
+    are skipped.
+
+    Args:
+        run_id (str): Run identifier returned by start_run().
+        model (str): Model name, e.g. "log_reg", "rf" or "bookmaker".
+        metrics (dict): Metric name -> value.
+        path (Path | str): Registry location.
+    """
+    rows = [
+        (run_id, model, name, float(value))
+        for name, value in metrics.items()
+        if isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+    ]
+
+    with closing(connect(path)) as con, con:
+        con.executemany(
+            "INSERT OR REPLACE INTO metrics (run_id, model, metric, value) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+
+def log_predictions(run_id: str, model: str, df: pd.DataFrame, proba, path: Path | str = REGISTRY_PATH):
+    """
+    Store per-match predicted probabilities for one model of a run.
+
+    The per-match log-loss (negative log-probability of the realized outcome)
+    is stored alongside the probabilities so that aggregate log-loss over any
+    slice is a plain AVG() in SQL.
+
+    Args:
+        run_id (str): Run identifier returned by start_run().
+        model (str): Model name.
+        df (pd.DataFrame): Matches being predicted, with columns match_id,
+            match_date, season, matchweek_num and target.
+        proba: Array of shape (n_matches, 3) with probabilities in
+            CLASS_ORDER (away win, draw, home win).
+        path (Path | str): Registry location.
+    """
+    proba = np.asarray(proba, dtype=float)
+    target = df["target"].to_numpy()
+    col = np.searchsorted(CLASS_ORDER, target)
+    p_true = np.clip(proba[np.arange(len(df)), col], 1e-15, 1.0)
+
+    rows = pd.DataFrame({
+        "run_id": run_id,
+        "model": model,
+        "match_id": df["match_id"].astype(str).to_numpy(),
+        "match_date": parse_dates(df["match_date"]).dt.strftime("%Y-%m-%d").to_numpy(),
+        "season": df["season"].astype(int).to_numpy(),
+        "matchweek_num": df["matchweek_num"].astype(int).to_numpy(),
+        "target": target.astype(int),
+        "p_away": proba[:, 0],
+        "p_draw": proba[:, 1],
+        "p_home": proba[:, 2],
+        "log_loss": -np.log(p_true),
+    })
+
+    with closing(connect(path)) as con, con:
+        con.executemany(
+            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows.itertuples(index=False, name=None),
+        )
+
+
+def log_loss_by_season(last_n_runs: int = 50, model: str | None = None,
+                       path: Path | str = REGISTRY_PATH) -> pd.DataFrame:
+    """
+    Mean per-match log-loss by run, model and season for the most recent runs.
+
+    Args:
+        last_n_runs (int): Number of most recent runs to include.
+        model (str | None): Restrict to one model; all models when None.
+        path (Path | str): Registry location.
+
+    Returns:
+        pd.DataFrame: Columns run_id, started_at, model, season, n_matches,
+        log_loss, newest run first.
+    """
+    query = """
+        WITH recent AS (
+            SELECT run_id, started_at, rowid AS seq FROM runs
+            ORDER BY started_at DESC, rowid DESC
+            LIMIT ?
+        )
+        SELECT p.run_id, r.started_at, p.model, p.season,
+               COUNT(*) AS n_matches, AVG(p.log_loss) AS log_loss
+        FROM recent r
+        JOIN predictions p ON p.run_id = r.run_id
+        WHERE (? IS NULL OR p.model = ?)
+        GROUP BY p.run_id, p.model, p.season
+        ORDER BY r.started_at DESC, r.seq DESC, p.model, p.season
+    """
+    with closing(connect(path)) as con:
+        return pd.read_sql_query(query, con, params=(last_n_runs, model, model))
+
+
+def run_metrics(last_n_runs: int = 50, path: Path | str = REGISTRY_PATH) -> pd.DataFrame:
+    """
+    Metrics of the most recent runs in long format.
+
+    Returns:
+        pd.DataFrame: Columns run_id, started_at, data_hash, model, metric, value.
+    """
+    query = """
+        SELECT r.run_id, r.started_at, r.data_hash, m.model, m.metric, m.value
+        FROM (
+            SELECT *, rowid AS seq FROM runs
+            ORDER BY started_at DESC, rowid DESC
+            LIMIT ?
+        ) r
+        JOIN metrics m ON m.run_id = r.run_id
+        ORDER BY r.started_at DESC, r.seq DESC, m.model, m.metric
+    """
+    with closing(connect(path)) as con:
+        return pd.read_sql_query(query, con, params=(last_n_runs,))
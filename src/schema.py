@@ -0,0 +1,113 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# ======================================================
+# COMPACT DTYPE SCHEMA
+# ======================================================
+
+# Low-cardinality labels stored as pandas categoricals
+CATEGORY_COLUMNS = {
+    "team", "opponent", "home_team", "away_team",
+    "referee", "season", "league", "competition", "venue", "matchweek",
+    "team_formation", "opponent_formation", "home_formation", "away_formation",
+    "result",
+}
+
+MEMORY_REPORTS = []
+# stages running concurrently (src.dag) append to and reset the same list
+_REPORTS_LOCK = threading.Lock()
+
+
+def _is_integral(values: np.ndarray) -> bool:
+    return bool(np.all(np.mod(values, 1) == 0))
+
+
+def compact_column(s: pd.Series) -> pd.Series:
+    """
+    Downcast one column to the smallest dtype that preserves its values.
+
+    - categorical names (see CATEGORY_COLUMNS) -> category
+    - integer columns, and float columns holding only whole numbers without
+      NaN -> the smallest signed integer type (int8/int16/int32)
+    - other float columns (rates, averages, odds, xG) -> float32, which keeps
+      ~7 significant digits, far more than the source data carries
+    - datetimes, booleans and free-form strings (match_id) are left unchanged
+    """
+    name = s.name
+
+    if name in CATEGORY_COLUMNS:
+        return s if isinstance(s.dtype, pd.CategoricalDtype) else s.astype("category")
+
+    if pd.api.types.is_bool_dtype(s) or not pd.api.types.is_numeric_dtype(s):
+        return s
+
+    if pd.api.types.is_integer_dtype(s):
+        compact = pd.to_numeric(s, downcast="integer")
+        return s if compact.dtype == s.dtype else compact
+
+    values = s.to_numpy()
+    if len(values) and not np.isnan(values).any() and _is_integral(values):
+        return pd.to_numeric(s, downcast="integer")
+
+    return s if s.dtype == np.float32 else s.astype(np.float32)
+
+
+def compact_frame(df: pd.DataFrame, label: str | None = None) -> pd.DataFrame:
+    """
+    Apply the compact schema to every column of a frame.
+
+    When a label is given, the deep memory usage before and after is recorded
+    in MEMORY_REPORTS (see memory_report()).
+
+    Args:
+        df (pd.DataFrame): Frame produced by a data_loader stage.
+        label (str | None): Stage name used in the memory report.
+
+    Returns:
+        pd.DataFrame: Frame with compact dtypes (same values and index); the
+        input itself is returned when it is already compact.
+    """
+    before = df.memory_usage(deep=True).sum() if label else None
+
+    changed = {}
+    for col in df.columns:
+        s = df[col]
+        compact = compact_column(s)
+        if compact is not s:
+            changed[col] = compact
+
+    # only converted columns are replaced; the others are shared, not copied
+    out = df.assign(**changed) if changed else df
+
+    if label:
+        after = out.memory_usage(deep=True).sum()
+        with _REPORTS_LOCK:
+            MEMORY_REPORTS.append({
+                "stage": label,
+                "rows": len(out),
+                "before_mb": before / 1024 ** 2,
+                "after_mb": after / 1024 ** 2,
+            })
+
+    return out
+
+
+def memory_report(reset: bool = False) -> pd.DataFrame:
+    """
+    Memory usage before/after compaction for every labelled frame so far.
+
+    Args:
+        reset (bool): Clear the collected reports after returning them.
+
+    Returns:
+        pd.DataFrame: Columns stage, rows, before_mb, after_mb, saved_pct.
+    """
+    with _REPORTS_LOCK:
+        report = pd.DataFrame(MEMORY_REPORTS, columns=["stage", "rows", "before_mb", "after_mb"])
+        if reset:
+            MEMORY_REPORTS.clear()
+    report["saved_pct"] = 100 * (1 - report["after_mb"] / report["before_mb"])
+    return report
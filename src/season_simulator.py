@@ -0,0 +1,266 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.scoreline import fit_dixon_coles, outcome_probabilities, scoreline_matrix
+
+
+# ======================================================
+# MONTE CARLO SEASON SIMULATION
+# ======================================================
+
+SIMULATION_PATH = Path("results/season_simulation.csv")
+DEFAULT_SIMULATIONS = 100_000
+CHUNK_SIZE = 10_000
+TOP_N = 4
+RELEGATED = 3
+
+
+def _season_matches(matches, season, league=None):
+    keep = matches["season"] == season
+    if league is not None:
+        keep &= matches["league"] == league
+    return matches[keep]
+
+
+def current_table(matches, season, league=None):
+    """
+    League table of the played matches of one season.
+
+    Args:
+        matches (pd.DataFrame): Match-level history with season, home_team,
+            away_team, home_goals, away_goals (and league).
+        season: Season end year.
+        league (str | None): League (football-data Div code); None uses every
+            match of the season, which is only a table for single-league data.
+
+    Returns:
+        pd.DataFrame: team, played, points, goal_diff sorted by points and
+        goal difference.
+    """
+    played = _season_matches(matches, season, league)
+    gd = played["home_goals"] - played["away_goals"]
+
+    rows = pd.concat([
+        pd.DataFrame({
+            "team": played["home_team"].astype(str),
+            "points": np.select([gd > 0, gd == 0], [3, 1], 0),
+            "goal_diff": gd,
+        }),
+        pd.DataFrame({
+            "team": played["away_team"].astype(str),
+            "points": np.select([gd < 0, gd == 0], [3, 1], 0),
+            "goal_diff": -gd,
+        }),
+    ], ignore_index=True)
+
+    table = rows.groupby("team").agg(
+        played=("points", "size"),
+        points=("points", "sum"),
+        goal_diff=("goal_diff", "sum"),
+    )
+    return table.sort_values(["points", "goal_diff"], ascending=False).reset_index()
+
+
+def remaining_fixtures(matches, season, league=None):
+    """
+    Fixtures of a double round robin that have not been played yet.
+
+    Args:
+        matches (pd.DataFrame): Match-level history.
+        season: Season end year.
+        league (str | None): League to pair teams within (see current_table()).
+
+    Returns:
+        pd.DataFrame: home_team, away_team of every unplayed pairing.
+    """
+    played = _season_matches(matches, season, league)
+    teams = sorted(set(played["home_team"].astype(str)) | set(played["away_team"].astype(str)))
+    done = set(zip(played["home_team"].astype(str), played["away_team"].astype(str)))
+
+    return pd.DataFrame(
+        [(h, a) for h in teams for a in teams if h != a and (h, a) not in done],
+        columns=["home_team", "away_team"],
+    )
+
+
+def _simulate_chunk(args):
+    """
+    Simulate n_runs seasons at once and count final positions and points.
+
+    Outcomes of every (run, fixture) pair are drawn from one uniform matrix;
+    points are accumulated with two (fixtures x teams) incidence matrices, and
+    positions come from one argsort per run. Ties on points are broken by the
+    current goal difference, then at random.
+    """
+    n_runs, seed, base_points, tiebreak, home_idx, away_idx, probs, max_points = args
+    rng = np.random.default_rng(seed)
+    n_teams = len(base_points)
+    n_fixtures = len(home_idx)
+
+    u = rng.random((n_runs, n_fixtures))
+    home_win = u < probs[:, 0]
+    draw = ~home_win & (u < probs[:, 0] + probs[:, 1])
+    away_win = ~home_win & ~draw
+
+    home_inc = np.zeros((n_fixtures, n_teams))
+    home_inc[np.arange(n_fixtures), home_idx] = 1
+    away_inc = np.zeros((n_fixtures, n_teams))
+    away_inc[np.arange(n_fixtures), away_idx] = 1
+
+    home_pts = 3 * home_win + draw
+    away_pts = 3 * away_win + draw
+    points = base_points + home_pts @ home_inc + away_pts @ away_inc
+    points = points.round().astype(np.int64)
+
+    score = points + tiebreak + rng.random((n_runs, n_teams)) * 1e-6
+    order = np.argsort(-score, axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n_teams)[None, :], axis=1)
+
+    teams = np.broadcast_to(np.arange(n_teams), (n_runs, n_teams))
+    position_counts = np.bincount(
+        (teams * n_teams + positions).ravel(), minlength=n_teams * n_teams
+    ).reshape(n_teams, n_teams)
+    points_counts = np.bincount(
+        (teams * (max_points + 1) + points).ravel(), minlength=n_teams * (max_points + 1)
+    ).reshape(n_teams, max_points + 1)
+
+    return position_counts, points_counts
+
+
+def simulate_season(table, fixtures, probs, n_sims=DEFAULT_SIMULATIONS, seed=0,
+                    chunk_size=CHUNK_SIZE, max_workers=None, top_n=TOP_N, relegated=RELEGATED):
+    """
+    Monte Carlo distribution of the final table from fixture probabilities.
+
+    Runs are split into chunks of chunk_size; each chunk gets its own child
+    of np.random.SeedSequence(seed), so results depend only on seed, n_sims
+    and chunk_size, not on how many worker processes run the chunks. Within a
+    chunk every run is simulated at once with array operations.
+
+    Args:
+        table (pd.DataFrame): Current table (current_table()).
+        fixtures (pd.DataFrame): Remaining fixtures with home_team, away_team.
+        probs (np.ndarray): (n_fixtures, 3) home/draw/away probabilities.
+        n_sims (int): Number of simulated seasons.
+        seed (int | tuple[int, ...]): Root seed (SeedSequence entropy).
+        chunk_size (int): Runs per chunk (memory ~ chunk_size x fixtures).
+        max_workers (int | None): Worker processes; 1 runs in-process.
+        top_n (int): Places counted for the top-N probability.
+        relegated (int): Places counted as relegation.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]:
+            - summary per team: current and expected points, 5th/95th points
+              percentiles, expected position, p_title, p_top<N>, p_relegation
+            - position probabilities (teams x positions 1..n_teams)
+    """
+    teams = table["team"].tolist()
+    index = {t: i for i, t in enumerate(teams)}
+    n_teams = len(teams)
+
+    home_idx = fixtures["home_team"].map(index).to_numpy()
+    away_idx = fixtures["away_team"].map(index).to_numpy()
+    probs = np.asarray(probs, dtype=float)
+    base_points = table["points"].to_numpy(dtype=float)
+    tiebreak = table["goal_diff"].to_numpy(dtype=float) * 1e-3 / max(1, np.abs(table["goal_diff"]).max())
+
+    games_left = np.bincount(np.r_[home_idx, away_idx], minlength=n_teams)
+    max_points = int((base_points + 3 * games_left).max())
+
+    sizes = [chunk_size] * (n_sims // chunk_size)
+    if n_sims % chunk_size:
+        sizes.append(n_sims % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (size, s, base_points, tiebreak, home_idx, away_idx, probs, max_points)
+        for size, s in zip(sizes, seeds)
+    ]
+
+    if max_workers == 1 or len(tasks) <= 1:
+        results = list(map(_simulate_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+
+    position_counts = sum(r[0] for r in results)
+    points_counts = sum(r[1] for r in results)
+
+    position_probs = pd.DataFrame(
+        position_counts / n_sims, index=teams, columns=range(1, n_teams + 1)
+    )
+
+    points_grid = np.arange(max_points + 1)
+    points_cdf = np.cumsum(points_counts, axis=1) / n_sims
+    summary = pd.DataFrame({
+        "team": teams,
+        "points": table["points"].to_numpy(),
+        "exp_points": points_counts @ points_grid / n_sims,
+        "points_p05": (points_cdf < 0.05).sum(axis=1),
+        "points_p95": (points_cdf < 0.95).sum(axis=1),
+        "exp_position": position_probs.to_numpy() @ np.arange(1, n_teams + 1),
+        "p_title": position_probs[1].to_numpy(),
+        f"p_top{top_n}": position_probs.loc[:, 1:top_n].sum(axis=1).to_numpy(),
+        "p_relegation": position_probs.loc[:, n_teams - relegated + 1:].sum(axis=1).to_numpy(),
+    })
+
+    return summary.sort_values("exp_position").reset_index(drop=True), position_probs
+
+
+def run_season_simulation(matches, n_sims=DEFAULT_SIMULATIONS, seed=0, max_workers=None,
+                          out_path=SIMULATION_PATH):
+    """
+    Simulate the rest of the latest season of every league with Dixon-Coles
+    fixture probabilities.
+
+    Leagues are simulated separately: for each one, the goals model is fitted
+    on that league's history, its home/draw/away probabilities are computed
+    for every unplayed fixture of the league's latest season, and the table
+    is simulated among its own teams. The summaries are written to out_path
+    with a league column.
+
+    Args:
+        matches (pd.DataFrame): Match history (data_merged).
+        n_sims (int): Number of simulated seasons per league.
+        seed (int): Root seed (each league gets its own stream).
+        max_workers (int | None): Worker processes.
+        out_path: Output CSV for the per-team summary.
+
+    Returns:
+        pd.DataFrame: Per-team summary (see simulate_season()) with league
+        and season columns.
+    """
+    if "league" not in matches.columns:
+        matches = matches.assign(league=None)
+
+    summaries = []
+    for i, (league, history) in enumerate(matches.groupby("league", dropna=False, sort=True, observed=True)):
+        league = None if pd.isna(league) else league
+        season = int(history["season"].astype(int).max())
+        table = current_table(history, season)
+        fixtures = remaining_fixtures(history, season)
+
+        params = fit_dixon_coles(history)
+        probs = outcome_probabilities(
+            scoreline_matrix(params, fixtures["home_team"], fixtures["away_team"])
+        )[["p_home", "p_draw", "p_away"]].to_numpy()
+
+        summary, _ = simulate_season(table, fixtures, probs, n_sims, (seed, i), max_workers=max_workers)
+        summary.insert(0, "season", season)
+        summary.insert(0, "league", league)
+        summaries.append(summary)
+
+        print(f"{league or 'League'} {season}: {len(fixtures)} fixtures left, {n_sims} simulations")
+        print(summary.drop(columns=["league", "season"]).round(3).to_string(index=False))
+
+    summary = pd.concat(summaries, ignore_index=True)
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    summary.to_csv(out_path, index=False)
+    print(f"Season simulation saved to {out_path}")
+
+    return summary
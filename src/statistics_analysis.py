@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
-import matplotlib.pyplot as plt
+
+from src.rendering import render_bar, render_histogram, submit_figure
 
 RESULTS_PATH = Path("results/match_probabilities_comparison.csv")
 
@@ -34,67 +36,137 @@ def load_results():
     return pd.read_csv(RESULTS_PATH)
 
 
-def stat_model_vs_bookmaker_rate(df):
+OUTCOMES = [(-1, "Away win"), (0, "Draw"), (1, "Home win")]
+STATS_KEYS = ["model", "target", "season", "matchweek_num", "proba_diff_bin"]
+DIFF_BINS = 30
+DEFAULT_MODEL = "log_reg"
+
+
+def add_probability_difference(df):
+    """
+    Add the model − bookmaker probability on the realized outcome (vectorized).
+
+    Returns:
+        pandas.DataFrame: Copy of df with a 'proba_diff' column.
+    """
+    target = df["target"].to_numpy()
+    conditions = [target == 1, target == 0]
+
+    model_p = np.select(conditions, [df["model_home_win"], df["model_draw"]], df["model_away_win"])
+    book_p = np.select(conditions, [df["book_home"], df["book_draw"]], df["book_away"])
+
+    return df.assign(proba_diff=model_p - book_p)
+
+
+def build_stats_table(df):
+    """
+    Aggregate the probabilistic comparison into one grouped table.
+
+    The per-match comparison is reduced in a single groupby pass over
+    (model, outcome, season, matchweek, probability-difference bin). Every
+    statistic and plot below is a sum over this table, so the match-level
+    frame is scanned only once regardless of how many stats are reported or
+    how the results are sliced afterwards.
+
+    Args:
+        df (pandas.DataFrame): Output of load_results(). A 'model' column is
+            optional; when absent all rows are attributed to DEFAULT_MODEL.
+
+    Returns:
+        pandas.DataFrame: One row per group with columns
+            model, target, season, matchweek_num, proba_diff_bin,
+            bin_lo, bin_hi, n_matches, n_model_wins, sum_proba_diff,
+            sum_proba_diff_when_win.
+    """
+    df = add_probability_difference(df)
+    if "model" not in df.columns:
+        df["model"] = DEFAULT_MODEL
+
+    wins = df["model_beats_bookmaker"].astype(bool)
+    edges = np.histogram_bin_edges(df["proba_diff"], bins=DIFF_BINS)
+    bins = np.clip(np.searchsorted(edges, df["proba_diff"], side="right") - 1, 0, DIFF_BINS - 1)
+
+    df = df.assign(
+        model_beats_bookmaker=wins.astype(int),
+        proba_diff_when_win=df["proba_diff"].where(wins, 0.0),
+        proba_diff_bin=bins,
+    )
+
+    table = (
+        df.groupby(STATS_KEYS, observed=True, sort=True)
+        .agg(
+            n_matches=("target", "size"),
+            n_model_wins=("model_beats_bookmaker", "sum"),
+            sum_proba_diff=("proba_diff", "sum"),
+            sum_proba_diff_when_win=("proba_diff_when_win", "sum"),
+        )
+        .reset_index()
+    )
+
+    table.insert(5, "bin_lo", edges[table["proba_diff_bin"]])
+    table.insert(6, "bin_hi", edges[table["proba_diff_bin"] + 1])
+
+    return table
+
+
+def _by_outcome(table):
+    grouped = table.groupby("target")[["n_matches", "n_model_wins"]].sum()
+    names = dict(OUTCOMES)
+    grouped.index = grouped.index.map(names)
+    return grouped
+
+
+def stat_model_vs_bookmaker_rate(table):
     """
     Percentage of matches where the model assigns a higher probability
     than the bookmaker to the realized outcome.
     """
-    rate = df["model_beats_bookmaker"].mean()
+    rate = table["n_model_wins"].sum() / table["n_matches"].sum()
     print("\n📊 STAT 1 — Model vs Bookmaker (confidence on real outcome)")
     print(f"Model > bookmaker on real outcome: {rate*100:.1f}%")
     return rate
 
 
-def stat_result_distribution_when_model_wins(df):
+def stat_result_distribution_when_model_wins(table):
     """
     Distribution of real outcomes when the model is more confident
     than the bookmaker.
     """
-    subset = df[df["model_beats_bookmaker"]]
-
-    mapping = {-1: "Away win", 0: "Draw", 1: "Home win"}
-    distribution = subset["target"].map(mapping).value_counts(normalize=True)
+    wins = _by_outcome(table)["n_model_wins"]
+    distribution = (wins / wins.sum()).sort_values(ascending=False)
+    distribution.index.name = "target"
+    distribution.name = "proportion"
 
     print("\n📊 STAT 2 — Result distribution when model > bookmaker")
     print(distribution * 100)
     return distribution
 
 
-def stat_model_advantage_by_result(df):
+def stat_model_advantage_by_result(table):
     """
     For each real outcome, percentage of matches where the model
     is more confident than the bookmaker.
     """
     print("\n📊 STAT 3 — Model advantage by real outcome")
 
+    by_outcome = _by_outcome(table)
+
     results = {}
-    for label, name in [(-1, "Away win"), (0, "Draw"), (1, "Home win")]:
-        df_label = df[df["target"] == label]
-        rate = df_label["model_beats_bookmaker"].mean()
+    for _, name in OUTCOMES:
+        row = by_outcome.loc[name] if name in by_outcome.index else None
+        rate = row["n_model_wins"] / row["n_matches"] if row is not None else float("nan")
         results[name] = rate
         print(f"{name}: {rate*100:.1f}%")
 
     return results
 
 
-def stat_average_probability_difference(df):
+def stat_average_probability_difference(table):
     """
     Average probability difference (model - bookmaker) on the real outcome.
     """
-
-    def proba_diff(row):
-        if row["target"] == 1:
-            return row["model_home_win"] - row["book_home"]
-        elif row["target"] == 0:
-            return row["model_draw"] - row["book_draw"]
-        else:
-            return row["model_away_win"] - row["book_away"]
-
-    df = df.copy()
-    df["proba_diff"] = df.apply(proba_diff, axis=1)
-
-    avg_diff = df["proba_diff"].mean()
-    avg_diff_when_win = df[df["model_beats_bookmaker"]]["proba_diff"].mean()
+    avg_diff = table["sum_proba_diff"].sum() / table["n_matches"].sum()
+    avg_diff_when_win = table["sum_proba_diff_when_win"].sum() / table["n_model_wins"].sum()
 
     print("\n📊 STAT 4 — Average probability difference (model − bookmaker)")
     print(f"Overall average diff: {avg_diff:.3f}")
@@ -102,79 +174,80 @@ def stat_average_probability_difference(df):
 
     return avg_diff, avg_diff_when_win
 
-def plot_result_distribution_when_model_wins(df):
-    subset = df[df["model_beats_bookmaker"]]
-
-    mapping = {-1: "Away win", 0: "Draw", 1: "Home win"}
-    counts = subset["target"].map(mapping).value_counts(normalize=True)
-
-    plt.figure()
-    counts.mul(100).plot(kind="bar")
-    plt.ylabel("Percentage (%)")
-    plt.title("Result distribution when model > bookmaker")
-    plt.tight_layout()
-    plt.savefig(
-        VIS_PATH/ "result_distribution_when_model_beats_bookmaker.png",
-        bbox_inches="tight"
+def plot_result_distribution_when_model_wins(table):
+    wins = _by_outcome(table)["n_model_wins"]
+    counts = (wins / wins.sum()).sort_values(ascending=False)
+
+    submit_figure(
+        render_bar,
+        counts.index.tolist(),
+        (counts * 100).tolist(),
+        "Percentage (%)",
+        "Result distribution when model > bookmaker",
+        str(VIS_PATH / "result_distribution_when_model_beats_bookmaker.png"),
     )
-    plt.close()
 
-def plot_model_advantage_by_result(df):
-    results = {}
+def plot_model_advantage_by_result(table):
+    by_outcome = _by_outcome(table)
+    results = (by_outcome["n_model_wins"] / by_outcome["n_matches"] * 100).reindex(
+        [name for _, name in OUTCOMES]
+    )
 
-    for label, name in [(-1, "Away win"), (0, "Draw"), (1, "Home win")]:
-        df_label = df[df["target"] == label]
-        results[name] = df_label["model_beats_bookmaker"].mean() * 100
-
-    plt.figure()
-    plt.bar(results.keys(), results.values())
-    plt.ylabel("Percentage (%)")
-    plt.title("Model advantage by real outcome")
-    plt.tight_layout()
-    plt.savefig(
-        VIS_PATH / "model_advantage_by_real_outcome.png",
-        bbox_inches="tight"
+    submit_figure(
+        render_bar,
+        results.index.tolist(),
+        results.tolist(),
+        "Percentage (%)",
+        "Model advantage by real outcome",
+        str(VIS_PATH / "model_advantage_by_real_outcome.png"),
     )
 
-def plot_probability_difference_distribution(df):
-
-    def proba_diff(row):
-        if row["target"] == 1:
-            return row["model_home_win"] - row["book_home"]
-        elif row["target"] == 0:
-            return row["model_draw"] - row["book_draw"]
-        else:
-            return row["model_away_win"] - row["book_away"]
-
-    df = df.copy()
-    df["proba_diff"] = df.apply(proba_diff, axis=1)
-
-    plt.figure()
-    plt.hist(df["proba_diff"], bins=30)
-    plt.xlabel("Model probability − Bookmaker probability")
-    plt.ylabel("Number of matches")
-    plt.title("Distribution of probability differences")
-    plt.tight_layout()
-    plt.savefig(
-        VIS_PATH / "probability_difference_distribution.png",
-        bbox_inches="tight"
+def plot_probability_difference_distribution(table):
+    counts = table.groupby("proba_diff_bin")["n_matches"].sum()
+    edges = np.linspace(table["bin_lo"].min(), table["bin_hi"].max(), DIFF_BINS + 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    submit_figure(
+        render_histogram,
+        centers[counts.index],
+        edges,
+        "Model probability − Bookmaker probability",
+        "Number of matches",
+        "Distribution of probability differences",
+        str(VIS_PATH / "probability_difference_distribution.png"),
+        weights=counts.to_numpy(),
     )
 
 
 
-def run_stats():
-    print("Loading probabilistic comparison results...")
-    df = load_results()
+def run_stats(df=None):
+    """
+    Compute all summary statistics and plots on the probabilistic comparison.
+
+    Args:
+        df (pandas.DataFrame | None): Comparison table; loaded from
+            RESULTS_PATH when omitted.
+
+    Returns:
+        pandas.DataFrame: The aggregated stats table (see build_stats_table),
+        which can be sliced further by model, season or matchweek.
+    """
+    if df is None:
+        print("Loading probabilistic comparison results...")
+        df = load_results()
+
+    table = build_stats_table(df)
 
-    stat_model_vs_bookmaker_rate(df)
-    stat_result_distribution_when_model_wins(df)
-    stat_model_advantage_by_result(df)
-    stat_average_probability_difference(df)
-    plot_result_distribution_when_model_wins(df)
-    plot_model_advantage_by_result(df)
-    plot_probability_difference_distribution(df)
+    stat_model_vs_bookmaker_rate(table)
+    stat_result_distribution_when_model_wins(table)
+    stat_model_advantage_by_result(table)
+    stat_average_probability_difference(table)
+    plot_result_distribution_when_model_wins(table)
+    plot_model_advantage_by_result(table)
+    plot_probability_difference_distribution(table)
 
     print("\nStatistical analysis completed")
+    return table
 
 
 if __name__ == "__main__":
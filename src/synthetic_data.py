@@ -0,0 +1,343 @@
+from datetime import date
+from math import factorial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_loader import LEAGUE_DIVISIONS
+
+
+# ======================================================
+# SYNTHETIC RAW DATA GENERATOR
+# ======================================================
+
+# FBref competition name per football-data.co.uk division code (the inverse
+# of data_loader.LEAGUE_DIVISIONS); leagues are generated in this order
+LEAGUE_NAMES = {code: name for name, code in LEAGUE_DIVISIONS.items()}
+LEAGUE_CODES = list(LEAGUE_NAMES)
+
+FORMATIONS = ["4-2-3-1", "4-3-3", "3-4-3", "4-4-2", "3-5-2", "4-1-4-1", "5-3-2"]
+
+REFEREES = [
+    "M Oliver", "P Tierney", "A Taylor", "C Kavanagh", "S Attwell",
+    "J Brooks", "R Jones", "S Hooper", "T Robinson", "D England",
+]
+
+LAST_SEASON_END = 2024
+
+
+def league_code(i):
+    """
+    Division code of the i-th generated league ("E0" first).
+    """
+    return LEAGUE_CODES[i] if i < len(LEAGUE_CODES) else f"L{i}"
+
+
+def season_prefix(end_year):
+    """
+    Football-data file prefix of a season, e.g. 2022 -> "21_22".
+    """
+    return f"{(end_year - 1) % 100:02d}_{end_year % 100:02d}"
+
+
+def round_robin(n_teams):
+    """
+    Double round-robin schedule (circle method).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (home, away) team indices, each of shape
+        (2 * (n_teams - 1), n_teams // 2) — one row per matchweek.
+    """
+    teams = list(range(n_teams))
+    home, away = [], []
+    for r in range(n_teams - 1):
+        pairs = [(teams[i], teams[n_teams - 1 - i]) for i in range(n_teams // 2)]
+        if r % 2:
+            pairs = [(a, h) for h, a in pairs]
+        home.append([h for h, _ in pairs])
+        away.append([a for _, a in pairs])
+        teams = [teams[0]] + [teams[-1]] + teams[1:-1]
+
+    home, away = np.array(home), np.array(away)
+    return np.vstack([home, away]), np.vstack([away, home])
+
+
+def generate_fixtures(n_seasons, n_leagues, teams_per_league=20, seed=0):
+    """
+    Generate fixtures and simulated match statistics.
+
+    Goals are drawn from Poisson distributions driven by latent team attack and
+    defence strengths plus a home advantage, and the remaining statistics are
+    derived from them with noise, so that rolling features carry some signal.
+
+    Args:
+        n_seasons (int): Number of seasons per league (latest ends in LAST_SEASON_END).
+        n_leagues (int): Number of leagues.
+        teams_per_league (int): Even number of teams per league.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: One row per match with home_*/away_* statistics.
+    """
+    if teams_per_league % 2:
+        raise ValueError("teams_per_league must be even")
+
+    rng = np.random.default_rng(seed)
+    home_tmpl, away_tmpl = round_robin(teams_per_league)
+    n_weeks, per_week = home_tmpl.shape
+    seasons = range(LAST_SEASON_END - n_seasons + 1, LAST_SEASON_END + 1)
+
+    frames = []
+    for li in range(n_leagues):
+        div = league_code(li)
+        attack = rng.normal(0, 0.25, teams_per_league)
+        defence = rng.normal(0, 0.25, teams_per_league)
+
+        for end_year in seasons:
+            perm = rng.permutation(teams_per_league)
+            home = perm[home_tmpl].ravel()
+            away = perm[away_tmpl].ravel()
+            week = np.repeat(np.arange(1, n_weeks + 1), per_week)
+            start = np.datetime64(date(end_year - 1, 8, 10))
+            day = start + (7 * (week - 1) + rng.integers(0, 3, week.size)).astype("timedelta64[D]")
+
+            frames.append(pd.DataFrame({
+                "div": div,
+                "season": end_year,
+                "matchweek": week,
+                "match_date": day,
+                "home_idx": home,
+                "away_idx": away,
+                "home_rate": np.exp(0.3 + attack[home] - defence[away]),
+                "away_rate": np.exp(0.05 + attack[away] - defence[home]),
+            }))
+
+            # strengths drift between seasons
+            attack += rng.normal(0, 0.05, teams_per_league)
+            defence += rng.normal(0, 0.05, teams_per_league)
+
+    df = pd.concat(frames, ignore_index=True)
+    n = len(df)
+
+    df["home_team"] = "Team " + df["div"] + " " + (df["home_idx"] + 1).astype(str).str.zfill(2)
+    df["away_team"] = "Team " + df["div"] + " " + (df["away_idx"] + 1).astype(str).str.zfill(2)
+    df["referee"] = rng.choice(REFEREES, n)
+
+    for side in ["home", "away"]:
+        rate = df[f"{side}_rate"].to_numpy()
+        xg = rate * rng.gamma(8, 1 / 8, n)
+        shots = rng.poisson(4 + 5 * rate)
+        sot = rng.binomial(shots, 0.35)
+        df[f"{side}_goals"] = np.minimum(rng.poisson(rate), sot + rng.poisson(0.1, n))
+        df[f"{side}_xg"] = xg.round(1)
+        df[f"{side}_npxg"] = (xg * 0.9).round(1)
+        df[f"{side}_shots"] = shots
+        df[f"{side}_sot"] = sot
+        df[f"{side}_dist"] = rng.normal(17, 2.5, n).round(1)
+        df[f"{side}_fouls"] = rng.poisson(11, n)
+        df[f"{side}_corners"] = rng.poisson(2 + 2 * rate)
+        df[f"{side}_yellow"] = rng.poisson(1.7, n)
+        df[f"{side}_red"] = rng.binomial(1, 0.04, n)
+        df[f"{side}_passes"] = rng.poisson(300 + 120 * rate)
+        df[f"{side}_tackles"] = rng.poisson(17, n)
+        df[f"{side}_interceptions"] = rng.poisson(9, n)
+        df[f"{side}_blocks"] = rng.poisson(12, n)
+        df[f"{side}_clearances"] = rng.poisson(20, n)
+        df[f"{side}_formation"] = rng.choice(FORMATIONS, n)
+
+    share = df["home_passes"] / (df["home_passes"] + df["away_passes"])
+    df["home_poss"] = (100 * share).round().astype(int)
+    df["away_poss"] = 100 - df["home_poss"]
+
+    return df
+
+
+def _team_rows(df, side, other):
+    """
+    FBref-style team rows (one per match) for one side of each fixture.
+    """
+    passes = df[f"{side}_passes"]
+    completed = (passes * 0.8).round().astype(int)
+    tackles = df[f"{side}_tackles"]
+    interceptions = df[f"{side}_interceptions"]
+    saves = np.maximum(df[f"{other}_sot"] - df[f"{other}_goals"], 0)
+    result = np.select(
+        [df[f"{side}_goals"] > df[f"{other}_goals"], df[f"{side}_goals"] == df[f"{other}_goals"]],
+        ["W", "D"],
+        "L",
+    )
+
+    return pd.DataFrame({
+        "team": df[f"{side}_team"],
+        "season": df["season"],
+        "date": (
+            df["match_date"].dt.month.astype(str) + "/"
+            + df["match_date"].dt.day.astype(str) + "/"
+            + df["match_date"].dt.year.astype(str)
+        ),
+        "time": "15:00",
+        "comp": df["div"].map(LEAGUE_NAMES).fillna("League " + df["div"]),
+        "round": "Matchweek " + df["matchweek"].astype(str),
+        "venue": "Home" if side == "home" else "Away",
+        "result": result,
+        "gf": df[f"{side}_goals"],
+        "ga": df[f"{other}_goals"],
+        "opponent": df[f"{other}_team"],
+        "xg": df[f"{side}_xg"],
+        "xga": df[f"{other}_xg"],
+        "poss": df[f"{side}_poss"],
+        "formation": df[f"{side}_formation"],
+        "opp formation": df[f"{other}_formation"],
+        "referee": df["referee"],
+        "sh": df[f"{side}_shots"],
+        "sot": df[f"{side}_sot"],
+        "dist": df[f"{side}_dist"],
+        "fk": (df[f"{side}_shots"] * 0.05).round().astype(int),
+        "pk": 0,
+        "pkatt": 0,
+        "npxg": df[f"{side}_npxg"],
+        "g-xg": (df[f"{side}_goals"] - df[f"{side}_xg"]).round(1),
+        "sota": df[f"{other}_sot"],
+        "saves": saves,
+        "save%": (100 * saves / df[f"{other}_sot"].where(df[f"{other}_sot"] > 0)).round(1),
+        "cs": (df[f"{other}_goals"] == 0).astype(int),
+        "psxg": df[f"{other}_xg"],
+        "psxg+/-": (df[f"{other}_xg"] - df[f"{other}_goals"]).round(1),
+        "cmp": completed,
+        "att": passes,
+        "cmp%": (100 * completed / passes).round(1),
+        "totdist": passes * 18,
+        "prgdist": passes * 6,
+        "ast": np.minimum(df[f"{side}_goals"], df[f"{side}_sot"]),
+        "xag": (df[f"{side}_xg"] * 0.7).round(1),
+        "xa": (df[f"{side}_xg"] * 0.6).round(1),
+        "kp": (df[f"{side}_shots"] * 0.7).round().astype(int),
+        "sca": df[f"{side}_shots"] * 2,
+        "gca": df[f"{side}_goals"] * 2,
+        "tkl": tackles,
+        "tklw": (tackles * 0.6).round().astype(int),
+        "blocks": df[f"{side}_blocks"],
+        "int": interceptions,
+        "tkl+int": tackles + interceptions,
+        "clr": df[f"{side}_clearances"],
+        "prgc": (passes * 0.05).round().astype(int),
+        "mis": (passes * 0.04).round().astype(int),
+        "dis": (passes * 0.03).round().astype(int),
+        "rec": (passes * 0.15).round().astype(int),
+    })
+
+
+def _odds(p, margin):
+    return (1 / (p * (1 + margin))).round(2)
+
+
+def football_data_rows(df, rng):
+    """
+    Football-data.co.uk style rows (match info and bookmaker odds).
+    """
+    lam_h, lam_a = df["home_rate"].to_numpy(), df["away_rate"].to_numpy()
+
+    # outcome probabilities from independent Poisson goals (truncated at 10)
+    goals = np.arange(11)
+    fact = np.array([factorial(k) for k in goals], dtype=float)
+    ph = np.exp(-lam_h[:, None]) * lam_h[:, None] ** goals / fact
+    pa = np.exp(-lam_a[:, None]) * lam_a[:, None] ** goals / fact
+    joint = ph[:, :, None] * pa[:, None, :]
+    p_home = np.tril(np.ones((11, 11)), -1)[None] * joint
+    p_draw = np.eye(11)[None] * joint
+    p_home, p_draw = p_home.sum(axis=(1, 2)), p_draw.sum(axis=(1, 2))
+    p_away = 1 - p_home - p_draw
+    total = goals[:, None] + goals[None, :]
+    p_over = (joint * (total > 2.5)[None]).sum(axis=(1, 2))
+
+    def noise():
+        return rng.normal(1, 0.03, len(df))
+
+    home_goals, away_goals = df["home_goals"], df["away_goals"]
+
+    out = pd.DataFrame({
+        "Div": df["div"],
+        "Date": df["match_date"].dt.strftime("%d/%m/%Y"),
+        "Time": "15:00",
+        "HomeTeam": df["home_team"],
+        "AwayTeam": df["away_team"],
+        "FTHG": home_goals,
+        "FTAG": away_goals,
+        "FTR": np.select([home_goals > away_goals, home_goals == away_goals], ["H", "D"], "A"),
+        "Referee": df["referee"],
+        "HS": df["home_shots"],
+        "AS": df["away_shots"],
+        "HST": df["home_sot"],
+        "AST": df["away_sot"],
+        "HF": df["home_fouls"],
+        "AF": df["away_fouls"],
+        "HC": df["home_corners"],
+        "AC": df["away_corners"],
+        "HY": df["home_yellow"],
+        "AY": df["away_yellow"],
+        "HR": df["home_red"],
+        "AR": df["away_red"],
+    })
+
+    for prefix, margin in [("B365", 0.05), ("PS", 0.025), ("Max", 0.0), ("Avg", 0.04)]:
+        out[f"{prefix}H"] = _odds(p_home * noise(), margin)
+        out[f"{prefix}D"] = _odds(p_draw * noise(), margin)
+        out[f"{prefix}A"] = _odds(p_away * noise(), margin)
+
+    for prefix, margin in [("B365", 0.05), ("Max", 0.0), ("Avg", 0.04)]:
+        out[f"{prefix}>2.5"] = _odds(p_over * noise(), margin)
+        out[f"{prefix}<2.5"] = _odds((1 - p_over) * noise(), margin)
+
+    return out
+
+
+def generate_raw_dataset(out_dir, n_seasons=4, n_leagues=1, teams_per_league=20, seed=0):
+    """
+    Write a schema-compatible synthetic raw dataset.
+
+    Produces the same two kinds of raw input the pipeline reads from data/raw:
+        - one FBref-style team statistics file (two rows per match), like
+          matchdata_21-25.csv, covering every league and season;
+        - one football-data.co.uk style file per (league, season) with match
+          info and odds, named "<yy>_<yy>.csv" for the first league and
+          "<yy>_<yy>_<Div>.csv" for the others.
+
+    Args:
+        out_dir (Path | str): Destination directory (created if needed).
+        n_seasons (int): Seasons per league.
+        n_leagues (int): Number of leagues.
+        teams_per_league (int): Teams per league (even).
+        seed (int): Random seed.
+
+    Returns:
+        dict: Paths and metadata with keys "matchdata", "raw_dir",
+        "season_prefixes", "n_matches" and "n_team_rows".
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed + 1)
+
+    df = generate_fixtures(n_seasons, n_leagues, teams_per_league, seed)
+
+    team_rows = pd.concat([_team_rows(df, "home", "away"), _team_rows(df, "away", "home")])
+    team_rows = team_rows.sort_index(kind="stable").reset_index(drop=True)
+    matchdata_path = out_dir / "matchdata.csv"
+    team_rows.to_csv(matchdata_path, index=False)
+
+    odds = football_data_rows(df, rng)
+    prefixes = []
+    for (div, end_year), idx in df.groupby(["div", "season"]).groups.items():
+        prefix = season_prefix(end_year)
+        name = f"{prefix}.csv" if div == league_code(0) else f"{prefix}_{div}.csv"
+        odds.loc[idx].to_csv(out_dir / name, index=False)
+        if prefix not in prefixes:
+            prefixes.append(prefix)
+
+    return {
+        "matchdata": matchdata_path,
+        "raw_dir": out_dir,
+        "season_prefixes": tuple(sorted(prefixes)),
+        "n_matches": len(df),
+        "n_team_rows": len(team_rows),
+    }
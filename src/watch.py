@@ -0,0 +1,368 @@
+import hashlib
+import time
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from src.data_loader import (
+    PARTITION_KEYS,
+    RAW_DIR,
+    RAW_FILE_MATCHDATA,
+    build_partitions,
+    combine_partitions,
+    discover_season_files,
+    load_raw,
+)
+from src.dataset_store import STORE_DIR, export_csv, write_dataset, write_partitions
+from src.ratings import RATINGS_PATH, add_rating_features, save_ratings
+
+
+# ======================================================
+# WATCH MODE (INCREMENTAL REBUILDS)
+# ======================================================
+
+WATCH_INTERVAL_S = 2.0
+PROCESSED_DIR = Path("data/processed")
+MODELS_DIR = Path("models")
+PREDICTIONS_PATH = Path("results/latest_predictions.csv")
+
+# Saved models whose predictions are refreshed (see train_models())
+PREDICTION_MODELS = {
+    "log_reg": "logistic_regression.pkl",
+    "rf": "random_forest.pkl",
+}
+
+OUTCOME_NAMES = {-1: "away", 0: "draw", 1: "home"}
+
+
+def snapshot(raw_dir=RAW_DIR, raw_file=RAW_FILE_MATCHDATA):
+    """
+    Modification time and size of every CSV file in raw_dir and of raw_file.
+
+    Returns:
+        dict[str, tuple[int, int]]: (mtime_ns, size) per file path.
+    """
+    files = sorted(set(Path(raw_dir).glob("*.csv")) | {Path(raw_file)})
+    return {str(f): (f.stat().st_mtime_ns, f.stat().st_size) for f in files if f.exists()}
+
+
+def file_digest(path):
+    """
+    SHA-1 of a file's content (a touched but unchanged file keeps its digest).
+    """
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+
+
+def partition_digests(df_base):
+    """
+    Content hash of the rows of every (league, season) partition.
+
+    Args:
+        df_base (pd.DataFrame): Frame with league and season columns, e.g.
+            the team-level table of load_raw().
+
+    Returns:
+        dict[tuple, str]: Digest per (league, season).
+    """
+    return {
+        key: hashlib.sha1(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes()).hexdigest()
+        for key, part in df_base.groupby(PARTITION_KEYS, observed=True, sort=True)
+    }
+
+
+def start_watch(raw_file=RAW_FILE_MATCHDATA, raw_dir=RAW_DIR, season_prefixes=None,
+                cutoff=None, max_workers=None):
+    """
+    Build every partition once and keep the outputs for incremental rebuilds.
+
+    By default every season file in raw_dir is watched, including seasons
+    added later (e.g. 25_26.csv), and no match is cut off: unlike the
+    batch pipeline, watch mode follows the current season.
+
+    Args:
+        raw_file: Raw team-level statistics CSV.
+        raw_dir: Directory with the football-data season files.
+        season_prefixes: Season file prefixes to include; None includes
+            every file named after a season.
+        cutoff: Last match date to keep; None keeps every match.
+        max_workers (int | None): Worker processes for the partition builds.
+
+    Returns:
+        dict: Watch state (raw file snapshot and digests, the team-level
+        table, the season files, the outputs of every partition and the
+        digests of the partitions written by refresh_outputs()).
+    """
+    df_base = load_raw(raw_file)
+    files = discover_season_files(raw_dir, season_prefixes)
+    state = {
+        "raw_file": str(raw_file),
+        "raw_dir": str(raw_dir),
+        "season_prefixes": season_prefixes,
+        "cutoff": cutoff,
+        "max_workers": max_workers,
+        "snapshot": snapshot(raw_dir, raw_file),
+        "digests": {},
+        "base": df_base,
+        "base_digests": partition_digests(df_base),
+        "files": files,
+        "results": build_partitions(df_base, files, cutoff, max_workers=max_workers),
+        "written": {},
+    }
+    state["digests"] = {path: file_digest(path) for path in state["snapshot"]}
+    return state
+
+
+def changed_files(state):
+    """
+    Raw files added, removed or whose content changed since the last poll.
+
+    Only files whose modification time or size moved are hashed. The given
+    state's snapshot and digests are updated (poll() passes a working copy
+    and keeps it only once the rebuild succeeded).
+
+    Returns:
+        list[str]: Changed file paths.
+    """
+    current = snapshot(state["raw_dir"], state["raw_file"])
+    changed = []
+    for path in sorted(set(current) | set(state["snapshot"])):
+        if current.get(path) == state["snapshot"].get(path):
+            continue
+        digest = file_digest(path) if path in current else None
+        if digest != state["digests"].get(path):
+            changed.append(path)
+        if digest is None:
+            state["digests"].pop(path, None)
+        else:
+            state["digests"][path] = digest
+
+    state["snapshot"] = current
+    return changed
+
+
+def affected_partitions(state, changed):
+    """
+    (league, season) partitions whose inputs are among the changed files.
+
+    A changed team statistics file is reloaded and only the partitions whose
+    rows differ are affected; a changed season file affects the partitions it
+    held before and holds now. The state's team-level table and season file
+    list are updated.
+
+    Args:
+        state (dict): Watch state (start_watch()).
+        changed (list[str]): Changed file paths (changed_files()).
+
+    Returns:
+        set[tuple]: Affected (league, season) keys.
+    """
+    keys = set()
+    raw_file = str(Path(state["raw_file"]))
+
+    if raw_file in changed and Path(raw_file).exists():
+        df_base = load_raw(raw_file)
+        digests = partition_digests(df_base)
+        old = state["base_digests"]
+        keys |= {k for k in set(digests) | set(old) if digests.get(k) != old.get(k)}
+        state["base"], state["base_digests"] = df_base, digests
+
+    season_files = [p for p in changed if p != raw_file]
+    if season_files:
+        files = discover_season_files(state["raw_dir"], state["season_prefixes"])
+        for table in (state["files"], files):
+            rows = table[table["path"].isin(season_files)]
+            keys |= set(zip(rows["league"], rows["season"]))
+        state["files"] = files
+
+    return keys
+
+
+def rebuild_partitions(state, keys):
+    """
+    Rebuild the given partitions and combine them with the cached ones.
+
+    Returns:
+        dict[str, pd.DataFrame]: Combined frames keyed by PARTITION_OUTPUTS name.
+    """
+    results = {k: v for k, v in state["results"].items() if k not in keys}
+    results.update(build_partitions(
+        state["base"], state["files"], state["cutoff"], keys=keys, max_workers=state["max_workers"]
+    ))
+    state["results"] = results
+    return combine_partitions(results)
+
+
+def predict_matches(df_model, models_dir=MODELS_DIR):
+    """
+    Outcome probabilities of the saved models for every match with features.
+
+    Args:
+        df_model (pd.DataFrame): Model dataset with rating features.
+        models_dir: Directory with the pickles written by train_models();
+            missing models are skipped.
+
+    Returns:
+        pd.DataFrame: match_id, match_date, target and one p_<outcome> column
+        per model and outcome (NaN where features are missing).
+    """
+    out = df_model[[c for c in ["match_id", "match_date", "league", "season", "target"] if c in df_model]].copy()
+
+    for name, file in PREDICTION_MODELS.items():
+        path = Path(models_dir) / file
+        if not path.exists():
+            continue
+        model = joblib.load(path)
+        features = list(model.feature_names_in_)
+        valid = df_model[features].notna().all(axis=1)
+        proba = model.predict_proba(df_model.loc[valid, features])
+        for i, cls in enumerate(model.classes_):
+            out[f"{name}_p_{OUTCOME_NAMES[cls]}"] = pd.Series(proba[:, i], index=df_model.index[valid])
+
+    return out
+
+
+def refresh_outputs(parts, df_base=None, out_dir=PROCESSED_DIR, root=STORE_DIR,
+                    ratings_path=RATINGS_PATH, models_dir=MODELS_DIR,
+                    predictions_path=PREDICTIONS_PATH, written=None):
+    """
+    Recompute ratings and predictions and save the processed datasets.
+
+    Elo ratings carry over between seasons, so they are recomputed over the
+    whole (combined) history; this takes milliseconds. Saving is
+    incremental: the digest of every (league, season) partition of every
+    dataset is compared with the one last written, only the partitions that
+    differ are rewritten in the store (write_partitions(); a dataset not
+    written yet is written in full), and only the CSVs of datasets with a
+    rewritten partition are exported again from the store (export_csv()).
+
+    Args:
+        parts (dict[str, pd.DataFrame]): Combined partition outputs.
+        df_base (pd.DataFrame | None): Team-level table to save as
+            matchdata_base, if it changed.
+        out_dir: Directory for the processed CSVs.
+        root: Store root directory.
+        ratings_path: Output of the rating state.
+        models_dir: Directory with the trained models.
+        predictions_path: Output CSV of the refreshed predictions.
+        written (dict | None): Partition digests per dataset of the last
+            save, updated in place (the watch state keeps it); None writes
+            every partition.
+
+    Returns:
+        pd.DataFrame: The predictions.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = {} if written is None else written
+
+    df_model, ratings = add_rating_features(parts["model_data"], parts["data_merged"])
+    save_ratings(ratings, ratings_path)
+
+    frames = dict(parts, model_data=df_model)
+    if df_base is not None:
+        frames["matchdata_base"] = df_base
+    for name, df in frames.items():
+        digests = partition_digests(df)
+        old = written.get(name, {})
+        keys = {k for k in set(digests) | set(old) if digests.get(k) != old.get(k)}
+        if not keys:
+            continue
+        if name in written:
+            write_partitions(df, name, keys, root)
+        else:
+            write_dataset(df, name, root)
+        export_csv(name, out_dir / f"{name}.csv", root)
+        written[name] = digests
+
+    predictions = predict_matches(df_model, models_dir)
+    predictions_path = Path(predictions_path)
+    predictions_path.parent.mkdir(parents=True, exist_ok=True)
+    predictions.to_csv(predictions_path, index=False)
+
+    return predictions
+
+
+def poll(state, **outputs):
+    """
+    Check the raw files once and rebuild what they affect.
+
+    The poll works on a copy of the state that replaces it only when every
+    step succeeded. If a file cannot be read (e.g. it is being rewritten in
+    place), the exception propagates and the state is left as it was, so
+    the next poll sees the same files as changed and tries again.
+
+    Args:
+        state (dict): Watch state (start_watch()), updated in place.
+        **outputs: Output locations passed to refresh_outputs().
+
+    Returns:
+        dict | None: changed files, rebuilt partitions and seconds taken;
+        None if no raw file changed.
+    """
+    pending = dict(state, digests=dict(state["digests"]))
+    changed = changed_files(pending)
+    if not changed:
+        state.update(pending)
+        return None
+
+    t0 = time.perf_counter()
+    keys = affected_partitions(pending, changed)
+    if keys:
+        parts = rebuild_partitions(pending, keys)
+        base_changed = str(Path(pending["raw_file"])) in changed
+        refresh_outputs(parts, pending["base"] if base_changed else None, written=pending["written"], **outputs)
+
+    state.update(pending)
+    return {"changed": changed, "partitions": sorted(keys), "seconds": time.perf_counter() - t0}
+
+
+def watch(interval=WATCH_INTERVAL_S, max_polls=None, raw_file=RAW_FILE_MATCHDATA, raw_dir=RAW_DIR,
+          season_prefixes=None, cutoff=None, max_workers=None, **outputs):
+    """
+    Poll data/raw and keep the processed datasets and predictions up to date.
+
+    Every partition is built once at start; afterwards only the
+    (league, season) partitions whose raw inputs changed are rebuilt (steps
+    2-7), then ratings, the processed datasets and the predictions of the
+    saved models are refreshed. Model training stays with the full pipeline.
+
+    Args:
+        interval (float): Seconds between polls.
+        max_polls (int | None): Stop after this many polls (None runs until
+            interrupted).
+        raw_file, raw_dir, season_prefixes, cutoff: Raw inputs (see start_watch()).
+        max_workers (int | None): Worker processes for the partition builds.
+        **outputs: Output locations passed to refresh_outputs().
+
+    Returns:
+        dict: The final watch state.
+    """
+    t0 = time.perf_counter()
+    state = start_watch(raw_file, raw_dir, season_prefixes, cutoff, max_workers)
+    predictions = refresh_outputs(
+        combine_partitions(state["results"]), state["base"], written=state["written"], **outputs
+    )
+    print(f"Built {len(state['results'])} partitions and {len(predictions)} predictions "
+          f"in {time.perf_counter() - t0:.2f}s; watching {raw_dir} every {interval:g}s")
+
+    polls = 0
+    try:
+        while max_polls is None or polls < max_polls:
+            time.sleep(interval)
+            polls += 1
+            try:
+                update = poll(state, **outputs)
+            except Exception as exc:
+                # e.g. a season file caught half-written; the next poll retries it
+                print(f"Poll failed ({exc!r}), retrying in {interval:g}s")
+                continue
+            if update is None:
+                continue
+            names = ", ".join(Path(p).name for p in update["changed"])
+            rebuilt = ", ".join(f"{league}/{season}" for league, season in update["partitions"]) or "none"
+            print(f"{names} changed: rebuilt {rebuilt} in {update['seconds']:.2f}s")
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+    return state
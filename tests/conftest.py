@@ -0,0 +1,5 @@
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "perf: time/memory budget tests (opt-in with EPL_PERF=1)",
+    )
@@ -0,0 +1,132 @@
+import json
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from src.data_loader import (
+    load_raw,
+    prepare_home_away,
+    pivot_matches,
+    build_all,
+    merge_dataset,
+    build_data_before_engineering,
+    build_team_rolling_features,
+    build_match_level_features,
+)
+from src.models import train_models
+from src.rendering import set_plots_enabled
+from src.synthetic_data import generate_raw_dataset
+
+# Performance budgets: every measured function must stay within
+# baseline * (1 + PERF_TOLERANCE) + PERF_SLACK on a fixed-size synthetic input.
+# The baseline holds wall-clock times of one machine, so the budgets are
+# opt-in; run them on that machine (or after refreshing the baseline) with:
+#   EPL_PERF=1 python -m pytest tests/test_performance.py
+# Refresh the stored baseline after an intended change with:
+#   EPL_PERF_UPDATE_BASELINE=1 python -m pytest tests/test_performance.py
+
+BASELINE_PATH = Path(__file__).with_name("perf_baseline.json")
+PERF_SIZE = {"n_seasons": 8, "n_leagues": 2, "teams_per_league": 20, "seed": 0}
+PERF_TOLERANCE = float(os.environ.get("EPL_PERF_TOLERANCE", "0.5"))
+PERF_SLACK = {"wall_s": 0.05, "peak_mb": 2.0}
+UPDATE_BASELINE = os.environ.get("EPL_PERF_UPDATE_BASELINE") == "1"
+REPEATS = 3
+
+RUN_PERF = os.environ.get("EPL_PERF") == "1" or UPDATE_BASELINE
+
+pytestmark = [
+    pytest.mark.perf,
+    pytest.mark.skipif(not RUN_PERF, reason="perf budgets are opt-in: set EPL_PERF=1"),
+]
+
+
+def measure(fn, *args, repeats=REPEATS, **kwargs):
+    """
+    Best-of-repeats wall time and tracemalloc peak (MB) of fn(*args, **kwargs).
+
+    Memory is measured on a separate run so tracing overhead does not
+    inflate the timings.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, {"wall_s": best, "peak_mb": peak / 1024 ** 2}
+
+
+def check_budget(name, measured):
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+
+    if UPDATE_BASELINE:
+        baseline[name] = {k: round(v, 4) for k, v in measured.items()}
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        return
+
+    if name not in baseline:
+        pytest.skip(f"no stored baseline for {name}")
+
+    for metric, value in measured.items():
+        budget = baseline[name][metric] * (1 + PERF_TOLERANCE) + PERF_SLACK[metric]
+        assert value <= budget, (
+            f"{name} {metric} regressed: {value:.4f} > budget {budget:.4f} "
+            f"(baseline {baseline[name][metric]:.4f})"
+        )
+
+
+@pytest.fixture(scope="module")
+def perf_data(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("perf")
+    meta = generate_raw_dataset(tmp, **PERF_SIZE)
+
+    df_base = load_raw(meta["matchdata"])
+    home, away = prepare_home_away(df_base)
+    df_clean = pivot_matches(home, away)
+    df_all = build_all(meta["raw_dir"], season_prefixes=meta["season_prefixes"])
+    df_merged = merge_dataset(df_clean, df_all)
+    df_before = build_data_before_engineering(df_merged)
+    df_after = build_team_rolling_features(df_before)
+    df_model = build_match_level_features(df_after).dropna().reset_index(drop=True)
+
+    return {
+        "clean": df_clean,
+        "all": df_all,
+        "before": df_before,
+        "model": df_model,
+    }
+
+
+def test_perf_merge_dataset(perf_data):
+    _, measured = measure(merge_dataset, perf_data["clean"], perf_data["all"])
+    check_budget("merge_dataset", measured)
+
+
+def test_perf_build_team_rolling_features(perf_data):
+    _, measured = measure(build_team_rolling_features, perf_data["before"])
+    check_budget("build_team_rolling_features", measured)
+
+
+def test_perf_train_and_score(perf_data, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    set_plots_enabled(False)
+    try:
+        (log_reg, rf, _, _), measured = measure(train_models, perf_data["model"], repeats=1)
+    finally:
+        set_plots_enabled(True)
+    check_budget("train_models", measured)
+
+    x = perf_data["model"].filter(regex="^diff_")
+    x_test = x.iloc[int(len(x) * 0.8):]
+    _, measured = measure(lambda: (log_reg.predict_proba(x_test), rf.predict_proba(x_test)))
+    check_budget("score_models", measured)
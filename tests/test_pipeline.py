@@ -1,4 +1,10 @@
+import pickle
+import sqlite3
+from contextlib import closing
+from functools import lru_cache
+
 import numpy as np
+import pytest
 import pandas as pd
 from pathlib import Path
 
@@ -6,10 +12,61 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 
-from src.models import evaluate_bookmaker
+from src.models import (
+    chronological_split,
+    evaluate_bookmaker,
+    log_reg_pipeline,
+    permutation_importance,
+    save_confusion_matrix_png,
+)
+from src.rendering import set_plots_enabled
+from src.statistics_analysis import build_stats_table
+from src import prediction_history, run_registry
+from src.profiling import StageProfiler
+from src.synthetic_data import generate_raw_dataset
+from src.benchmark import run_data_loader_stages
+from src.schema import compact_frame
+from src.dates import FORMAT_CACHE, detect_date_format, parse_dates
+from src.data_loader import (
+    load_raw,
+    build_partitioned,
+    build_partitioned_from_store,
+    collect_joins,
+    ingest_streaming,
+    join_report,
+    load_model_data_from_store,
+    match_keys,
+    merge_dataset,
+)
+from src.feature_store import (
+    build_feature_store,
+    ewm_features,
+    ewm_state,
+    feature_name,
+    update_ewm_state,
+)
+from src.feature_spec import FEATURE_SPEC, compile_plan, execute_plan
+from src.ratings import compute_ratings, predict_fixture
+from src.scoreline import fit_dixon_coles, scoreline_matrix, outcome_probabilities
+from src.season_simulator import current_table, remaining_fixtures, run_season_simulation, simulate_season
+from src.dag import critical_path, run_stages, run_summary, stage
+from src.watch import poll, start_watch
+from src.feed import FEED_ERROR, ingest_feed, run_feed
+from src.online import (
+    load_online_model,
+    new_online_model,
+    partial_fit,
+    predict_online,
+    reconcile,
+    save_online_model,
+    walk_forward,
+)
+from src.feature_matrix import backtest, backtest_tasks, open_feature_matrix, write_feature_matrix
+from src.dataset_store import export_csv, write_dataset, read_manifest, select_partitions, load_dataset
 from src.probabilistic_evaluation import bookmaker_probabilities
     
-def load_model_data():
+@lru_cache(maxsize=1)
+def _read_model_data():
     path = Path("data/processed/model_data.csv")
     assert path.exists(), "model_data.csv does not exist"
     df = pd.read_csv(path)
@@ -17,6 +74,11 @@ def load_model_data():
     df = df.sort_values("match_date").reset_index(drop=True)
     df = df.dropna().reset_index(drop=True)
     return df
+
+
+def load_model_data():
+    # parsed once per session; each test gets its own copy
+    return _read_model_data().copy()
     
 def test_dataset_not_empty():
     df = load_model_data()
@@ -136,13 +198,19 @@ def test_model_reproducibility():
 
     assert np.allclose(model1.coef_, model2.coef_)
     
-def test_bookmaker_probabilities_consistent():
+def test_bookmaker_probabilities_consistent(tmp_path, monkeypatch):
     df = load_model_data()
 
     split_idx = int(len(df) * 0.8)
     df_test = df.iloc[split_idx:].reset_index(drop=True)
 
-    metrics = evaluate_bookmaker(df_test)
+    # the report is written under results/, keep it out of the repository
+    monkeypatch.chdir(tmp_path)
+    set_plots_enabled(False)
+    try:
+        metrics = evaluate_bookmaker(df_test)
+    finally:
+        set_plots_enabled(True)
 
     assert 0 <= metrics["accuracy"] <= 1
     assert metrics["log_loss"] > 0
@@ -171,5 +239,745 @@ def test_accuracy_above_random_baseline():
     assert acc > 0.33
 
 
+def test_headless_mode_skips_rendering(tmp_path):
+    out_path = tmp_path / "cm.png"
+    set_plots_enabled(False)
+    try:
+        future = save_confusion_matrix_png(
+            cm=np.eye(3, dtype=int),
+            labels=[-1, 0, 1],
+            title="headless",
+            out_path=out_path,
+        )
+    finally:
+        set_plots_enabled(True)
+
+    assert future is None
+    assert not out_path.exists()
+
+
+def test_stats_table_matches_row_level_stats():
+    rng = np.random.default_rng(0)
+    n = 60
+    model = rng.dirichlet([1, 1, 1], size=n)
+    book = rng.dirichlet([1, 1, 1], size=n)
+    df = pd.DataFrame({
+        "season": rng.choice([2024, 2025], size=n),
+        "matchweek_num": rng.integers(1, 5, size=n),
+        "target": rng.choice([-1, 0, 1], size=n),
+        "model_away_win": model[:, 0],
+        "model_draw": model[:, 1],
+        "model_home_win": model[:, 2],
+        "book_away": book[:, 0],
+        "book_draw": book[:, 1],
+        "book_home": book[:, 2],
+    })
+    col = df["target"].map({-1: 0, 0: 1, 1: 2}).to_numpy()
+    diff = model[np.arange(n), col] - book[np.arange(n), col]
+    df["model_beats_bookmaker"] = diff > 0
+
+    table = build_stats_table(df)
+
+    assert table["n_matches"].sum() == n
+    assert table["n_model_wins"].sum() == (diff > 0).sum()
+    assert np.isclose(table["sum_proba_diff"].sum(), diff.sum())
+    assert np.isclose(table["sum_proba_diff_when_win"].sum(), diff[diff > 0].sum())
+
+
+def test_run_registry_log_loss_by_season(tmp_path):
+    db = tmp_path / "registry.sqlite"
+    df = load_model_data().iloc[-40:].reset_index(drop=True)
+    proba = np.full((len(df), 3), 1 / 3)
+
+    run_ids = []
+    for _ in range(3):
+        run_id = run_registry.start_run({"seed": 42}, "abc", path=db)
+        run_registry.log_metrics(run_id, "uniform", {"log_loss": np.log(3), "classes": [-1, 0, 1]}, path=db)
+        run_registry.log_predictions(run_id, "uniform", df, proba, path=db)
+        run_ids.append(run_id)
+
+    out = run_registry.log_loss_by_season(last_n_runs=2, path=db)
+
+    assert set(out["run_id"]) == set(run_ids[1:])
+    assert out["n_matches"].sum() == 2 * len(df)
+    assert np.allclose(out["log_loss"], np.log(3))
+
+
+def test_stage_profiler_records_rows_and_writes_json(tmp_path):
+    df = load_model_data()
+    prof = StageProfiler(run_name="test", trace_memory=True)
+
+    out = prof.call("head", lambda d: d.head(10), df)
+    path = prof.write(tmp_path / "profile.json")
+
+    record = prof.records[0]
+    assert len(out) == 10
+    assert record["rows_in"] == len(df) and record["rows_out"] == 10
+    assert record["wall_s"] >= 0 and record["tracemalloc_peak_mb"] >= 0
+    assert record["rss_mb"] > 0 and record["rss_delta_mb"] is not None
+    assert path.exists()
+
+
+def test_synthetic_dataset_runs_through_data_loader(tmp_path):
+    meta = generate_raw_dataset(tmp_path, n_seasons=2, n_leagues=2, teams_per_league=6)
+    prof = StageProfiler()
+
+    df_model = run_data_loader_stages(meta, tmp_path, prof)
+
+    assert len(df_model) == meta["n_matches"]
+    assert df_model["match_id"].is_unique
+    assert df_model["odds_win"].notna().all()
+    assert set(df_model["target"].unique()).issubset({-1, 0, 1})
+
+
+def test_compact_frame_preserves_values():
+    df = pd.DataFrame({
+        "team": ["arsenal", "chelsea", "arsenal"],
+        "season": [2024, 2024, 2025],
+        "goals_for": [2.0, 0.0, 3.0],
+        "xg": [1.25, np.nan, 0.5],
+        "points": [3, 0, 3],
+        "match_id": ["a", "b", "c"],
+    })
+
+    out = compact_frame(df)
+
+    assert isinstance(out["team"].dtype, pd.CategoricalDtype)
+    assert isinstance(out["season"].dtype, pd.CategoricalDtype)
+    assert out["goals_for"].dtype == np.int8
+    assert out["points"].dtype == np.int8
+    assert out["xg"].dtype == np.float32
+    assert out["match_id"].tolist() == ["a", "b", "c"]
+    pd.testing.assert_frame_equal(out.astype(object), df.astype(object), check_dtype=False)
+
+
+def test_merge_dataset_joins_on_int_keys_and_reports_mismatches():
+    matches = pd.read_csv("data/processed/data_merged.csv").head(50)
+    matchdata = matches[["match_id", "match_date", "home_team", "away_team", "home_goals"]]
+    odds = matches[["match_id", "match_date", "home_team", "away_team", "odds_avg_home_win"]]
+    # one match without odds, one odds row twice
+    odds = pd.concat([odds.iloc[1:], odds.iloc[[5]]], ignore_index=True)
+
+    home_keys, away_keys = match_keys(
+        (matchdata["match_date"], matchdata["home_team"], matchdata["away_team"]),
+        (matchdata["match_date"], matchdata["away_team"], matchdata["home_team"]),
+    )
+    assert home_keys.dtype == np.int64
+    assert pd.Series(home_keys).is_unique
+    assert not np.isin(home_keys, away_keys).any()
+
+    join_report(reset=True)
+    merged = merge_dataset(matchdata, odds)
+    report = join_report(reset=True).set_index("side")
+
+    # inside a collector (one per partition task) the records stay local
+    with collect_joins() as joins:
+        merge_dataset(matchdata, odds)
+    assert len(joins) == 2 and join_report().empty
+
+    assert len(merged) == 51
+    assert merged["match_id"].tolist()[:5] == matchdata["match_id"].tolist()[:5]
+    assert merged["odds_avg_home_win"].isna().sum() == 1
+    assert report.loc["left", ["unmatched", "duplicated"]].tolist() == [1, 0]
+    assert report.loc["right", ["unmatched", "duplicated"]].tolist() == [0, 2]
+    assert matchdata["match_id"].iloc[0] in report.loc["left", "examples"]
+
+
+def test_parse_dates_detects_format_once_and_keeps_datetimes():
+    fbref = pd.Series(["8/13/2021", "8/14/2021", None, "12/1/2021", "8/13/2021"])
+    odds = pd.Series(["05/08/2022", "13/08/2022", "13/08/22"])
+
+    assert detect_date_format(fbref) == "%m/%d/%Y"
+    assert detect_date_format(odds) == "%d/%m/%Y"
+
+    parsed = parse_dates(fbref, source="fbref.csv")
+    assert FORMAT_CACHE["fbref.csv"] == "%m/%d/%Y"
+    assert parsed.tolist()[:2] == [pd.Timestamp("2021-08-13"), pd.Timestamp("2021-08-14")]
+    assert pd.isna(parsed[2])
+    assert parsed[3] == pd.Timestamp("2021-12-01")
+
+    # day-first values the detected format misses fall back to the other candidates
+    assert parse_dates(odds).tolist() == [
+        pd.Timestamp("2022-08-05"), pd.Timestamp("2022-08-13"), pd.Timestamp("2022-08-13"),
+    ]
+    assert parse_dates(parsed) is parsed
+
+
+def test_partitioned_build_matches_serial_build(tmp_path):
+    meta = generate_raw_dataset(tmp_path, n_seasons=2, n_leagues=2, teams_per_league=6)
+    df_serial = run_data_loader_stages(meta, tmp_path, StageProfiler())
+
+    df_base = load_raw(meta["matchdata"])
+    parts = build_partitioned(
+        df_base, meta["raw_dir"], meta["season_prefixes"], max_workers=2
+    )
+    df_part = parts["model_data"]
+
+    assert set(df_part["league"]) == {"E0", "E1"}
+    pd.testing.assert_frame_equal(df_part.astype(object), df_serial.astype(object))
+
+
+def test_streaming_ingestion_matches_serial_build(tmp_path):
+    meta = generate_raw_dataset(tmp_path, n_seasons=2, n_leagues=2, teams_per_league=6)
+    df_serial = run_data_loader_stages(meta, tmp_path, StageProfiler())
+
+    # chunks smaller than a partition, so partition files are appended to
+    manifests = ingest_streaming(
+        meta["matchdata"], meta["raw_dir"], meta["season_prefixes"],
+        chunksize=37, root=tmp_path / "store",
+    )
+    base = manifests["matchdata_base"]
+    assert len(base["partitions"]) == 4
+    assert sum(p["rows"] for p in base["partitions"]) == 2 * meta["n_matches"]
+
+    # workers write their outputs to the store and return manifests only
+    manifests = build_partitioned_from_store(tmp_path / "store", max_workers=2)
+    assert len(manifests["model_data"]["partitions"]) == 4
+    assert sum(p["rows"] for p in manifests["model_data"]["partitions"]) == len(df_serial)
+
+    df_store = load_model_data_from_store(tmp_path / "store")
+    pd.testing.assert_frame_equal(df_store.astype(object), df_serial.astype(object))
+
+    export_csv("data_merged", tmp_path / "data_merged.csv", tmp_path / "store")
+    df_merged = pd.read_csv(tmp_path / "data_merged.csv")
+    assert len(df_merged) == meta["n_matches"] and df_merged["match_id"].is_unique
+
+
+def test_dataset_store_reads_only_matching_partitions(tmp_path):
+    df = load_model_data()
+    df["match_date"] = pd.to_datetime(df["match_date"])
+    write_dataset(compact_frame(df), "model_data", root=tmp_path)
+
+    manifest = read_manifest("model_data", root=tmp_path)
+    assert len(select_partitions(manifest, seasons=[2024, 2025])) == 2
+    assert len(select_partitions(manifest, start="2024-01-01", end="2024-03-01")) == 1
+
+    out = load_dataset(
+        "model_data", seasons=[2024, 2025], columns=["match_id", "season", "target"], root=tmp_path
+    )
+    expected = df[df["season"].isin([2024, 2025])]
+
+    assert out.columns.tolist() == ["match_id", "season", "target"]
+    assert sorted(out["match_id"]) == sorted(expected["match_id"])
+    assert out["target"].dtype == np.int8
+
+    window = load_dataset("model_data", start="2024-01-01", end="2024-03-01", root=tmp_path)
+    assert window["match_date"].between("2024-01-01", "2024-03-01").all()
+    assert len(window) == df["match_date"].between("2024-01-01", "2024-03-01").sum()
+
+
+def test_feature_store_matches_rolling_means():
+    df = pd.DataFrame({
+        "match_id": [f"m{i}" for i in range(8)],
+        "match_date": pd.date_range("2024-08-01", periods=8, freq="7D"),
+        "season": [2025] * 8,
+        "team": ["arsenal"] * 4 + ["chelsea"] * 4,
+        "points": [3, 0, np.nan, 1, 1, 1, 3, 0],
+    })
+
+    store = build_feature_store(df, metrics=["points"], windows=(2, None))
+
+    for window, col in [(2, "avg_points_L2"), (None, "avg_points_STD")]:
+        rolled = df.groupby("team")["points"].transform(
+            lambda s: s.shift(1).rolling(window or len(s), min_periods=1).mean()
+        )
+        assert col == feature_name("points", window)
+        np.testing.assert_allclose(store[col], rolled, rtol=1e-6)
+
+    assert store["avg_points_L2"].dtype == np.float32
+    assert np.isnan(store.loc[store["team"] == "chelsea", "avg_points_L2"].iloc[0])
+
+
+def test_feature_spec_compiles_to_shared_plan():
+    plan = compile_plan(FEATURE_SPEC)
+
+    # 17 window features share 16 (metric, venue) inputs and 2 windows
+    assert len(plan["aggregates"]) == 17
+    assert len(plan["inputs"]) == 16
+    assert sorted(plan["windows"]) == [5, 10]
+    assert plan["outputs"][-1] == "avg_discipline_L5"
+
+    with pytest.raises(ValueError):
+        compile_plan([{"name": "x", "combine": ("a", "+", "b")}])
+
+    df = pd.DataFrame({
+        "season": [2025] * 4,
+        "team": ["arsenal"] * 4,
+        "is_home": [1, 0, 1, 0],
+        "goals_for": [2, 0, 1, 3],
+        "goals_against": [0, 0, 1, 1],
+    })
+    spec = [
+        {"name": "gf_sum_L2", "metric": "goals_for", "window": 2, "agg": "sum"},
+        {"name": "gf_home_L2", "metric": "goals_for", "window": 2, "venue": "home"},
+        {"name": "ga_L2", "metric": "goals_against", "window": 2},
+        {"name": "net", "combine": ("gf_sum_L2", "-", "ga_L2")},
+    ]
+    features = execute_plan(compile_plan(spec), df)
+
+    np.testing.assert_allclose(features["gf_sum_L2"], [np.nan, 2, 2, 1])
+    np.testing.assert_allclose(features["gf_home_L2"], [np.nan, 2, 2, 1])
+    np.testing.assert_allclose(features["net"], [np.nan, 2, 2, 0.5])
+
+
+def test_ewm_state_updates_match_batch_features():
+    df = pd.DataFrame({
+        "match_id": [f"m{i}" for i in range(6)],
+        "match_date": pd.date_range("2024-08-01", periods=6, freq="7D"),
+        "season": [2025] * 6,
+        "team": ["arsenal"] * 6,
+        "points": [3.0, 0.0, np.nan, 1.0, 3.0, 3.0],
+    })
+
+    batch = ewm_features(df, ["points"], halflives=(2,))["ewm_points_H2"]
+    expected = df["points"].ewm(halflife=2, adjust=False, ignore_na=True).mean().shift(1)
+    np.testing.assert_allclose(batch, expected)
+
+    # state after the first five matches + one O(1) update == batch value of a 7th match
+    state = ewm_state(df.iloc[:5], ["points"], halflife=2)
+    updated = update_ewm_state(state, 2025, "arsenal", {"points": 3.0}, halflife=2)
+    full = ewm_state(df, ["points"], halflife=2)
+
+    assert len(state) == 1
+    assert updated["points"] == pytest.approx(full.loc[(2025, "arsenal"), "points"])
+
+
+def test_ratings_incremental_update_matches_full_history():
+    matches = pd.read_csv("data/processed/data_merged.csv")
+    matches = matches.sort_values(["match_date", "match_id"]).reset_index(drop=True)
+
+    full, full_state = compute_ratings(matches)
+    first, state = compute_ratings(matches.iloc[:900])
+    rest, state = compute_ratings(matches.iloc[900:], state=state)
+
+    np.testing.assert_allclose(pd.concat([first, rest])["elo_home"], full["elo_home"])
+    assert state["teams"] == full_state["teams"]
+    assert full["elo_home"].iloc[0] == full["elo_away"].iloc[0] == 1500
+
+    with pytest.raises(ValueError):
+        compute_ratings(matches.iloc[:10], state=state)
+
+    fixture = predict_fixture(state, "liverpool", "southampton")
+    assert 0.5 < fixture["elo_home_expected"] < 1
+
+    glicko, _ = compute_ratings(matches, {"glicko": True})
+    assert (glicko["rd_home"] <= 350).all()
+
+    # Glicko in rating points of a doubled scale gives the same expectations
+    doubled = {"glicko": True, "scale": 800.0, "home_advantage": 120.0,
+               "rd_initial": 700.0, "rd_min": 60.0, "rd_inflation": 40.0}
+    glicko_doubled, _ = compute_ratings(matches, doubled)
+    np.testing.assert_allclose(glicko_doubled["elo_home_expected"], glicko["elo_home_expected"])
+    np.testing.assert_allclose(glicko_doubled["rd_home"], 2 * glicko["rd_home"])
+
+    # an unplayed fixture is rated but moves no rating
+    unplayed = matches.copy()
+    unplayed.loc[500, ["home_goals", "away_goals"]] = np.nan
+    for params in (None, {"glicko": True}):
+        with_fixture, fixture_state = compute_ratings(unplayed, params)
+        without, state = compute_ratings(unplayed.drop(index=500), params)
+        assert with_fixture.drop(index=500).notna().all().all()
+        np.testing.assert_allclose(with_fixture.drop(index=500)["elo_home"], without["elo_home"])
+        assert fixture_state["teams"] == state["teams"]
+        assert 0 < with_fixture.loc[500, "elo_home_expected"] < 1
+
+
+def test_dixon_coles_probabilities_are_consistent():
+    matches = pd.read_csv("data/processed/data_merged.csv")
+
+    params = fit_dixon_coles(matches)
+    probs = scoreline_matrix(params, ["liverpool", "southampton"], ["southampton", "liverpool"])
+    outcomes = outcome_probabilities(probs)
+
+    assert params["success"]
+    assert params["home"] > 0
+    assert probs.shape == (2, 11, 11)
+    np.testing.assert_allclose(probs.sum(axis=(1, 2)), 1.0)
+    np.testing.assert_allclose(outcomes[["p_home", "p_draw", "p_away"]].sum(axis=1), 1.0)
+    np.testing.assert_allclose(outcomes["p_over25"] + outcomes["p_under25"], 1.0)
+    assert outcomes.loc[0, "p_home"] > outcomes.loc[1, "p_home"]
+
+
+def test_season_simulation_is_reproducible_and_consistent():
+    matches = pd.read_csv("data/processed/data_merged.csv")
+    table = current_table(matches, 2025)
+    fixtures = remaining_fixtures(matches, 2025)
+    probs = np.tile([0.45, 0.27, 0.28], (len(fixtures), 1))
+
+    summary, positions = simulate_season(
+        table, fixtures, probs, n_sims=3000, seed=7, chunk_size=1000, max_workers=1
+    )
+    summary_pool, _ = simulate_season(
+        table, fixtures, probs, n_sims=3000, seed=7, chunk_size=1000, max_workers=2
+    )
+
+    assert len(table) == 20
+    assert len(fixtures) + table["played"].sum() // 2 == 380
+    pd.testing.assert_frame_equal(summary, summary_pool)
+    np.testing.assert_allclose(positions.sum(axis=0), 1.0)
+    np.testing.assert_allclose(positions.sum(axis=1), 1.0)
+    assert summary["p_top4"].sum() == pytest.approx(4)
+    assert summary["p_relegation"].sum() == pytest.approx(3)
+    assert (summary["exp_points"] >= summary["points"]).all()
+
+
+def test_season_simulation_keeps_leagues_apart(tmp_path):
+    epl = pd.read_csv("data/processed/data_merged.csv")
+    epl = epl[epl["season"] == 2025]
+    other = epl.assign(
+        league="X1",
+        home_team="x " + epl["home_team"],
+        away_team="x " + epl["away_team"],
+    )
+    matches = pd.concat([epl, other], ignore_index=True)
+    # as after compact_frame(): a categorical league, here with an unused division
+    matches["league"] = pd.Categorical(matches["league"], categories=sorted({*matches["league"], "Z9"}))
+
+    assert len(current_table(matches, 2025, league="X1")) == 20
+    fixtures = remaining_fixtures(matches, 2025, league="X1")
+    assert fixtures["home_team"].str.startswith("x ").all() and fixtures["away_team"].str.startswith("x ").all()
+
+    summary = run_season_simulation(matches, n_sims=500, max_workers=1, out_path=tmp_path / "sim.csv")
+
+    assert set(summary["league"]) == {epl["league"].iloc[0], "X1"}
+    per_league = summary.groupby("league", observed=True)
+    assert (per_league.size() == 20).all()
+    np.testing.assert_allclose(per_league["p_top4"].sum(), 4)
+    np.testing.assert_allclose(per_league["p_relegation"].sum(), 3)
+
+
+def test_stage_graph_runs_independent_stages_concurrently():
+    import threading
+    import time
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    def branch(value):
+        barrier.wait()  # only passes if both branches run at the same time
+        time.sleep(0.05)
+        return value
+
+    stages = [
+        stage("a", lambda: branch(1)),
+        stage("b", lambda: branch({"x": 2})),
+        stage("c", lambda a, x: a + x, deps=["a", ("b", "x")], load=lambda: 5),
+        stage("d", lambda c: c * 10, deps=["c"]),
+    ]
+
+    stats = {}
+    outputs, wall_s = run_stages(stages, max_workers=2, stats=stats)
+    assert outputs == {"a": 1, "b": {"x": 2}, "c": 3, "d": 30}
+    assert stats["max_concurrent"] == 2
+
+    path, total = critical_path(stages, wall_s)
+    assert path[0] in ("a", "b") and path[1:] == ["c", "d"]
+    assert total == pytest.approx(wall_s[path[0]] + wall_s["c"] + wall_s["d"])
+
+    # --only: d reads c's output back with c's loader
+    outputs, wall_s = run_stages(stages, only=["d"], max_workers=2, stats=stats)
+    assert outputs == {"d": 50}
+    assert stats["max_concurrent"] == 1
+    assert "1 stages" in run_summary(stages, wall_s, stats)
+
+    # --until: c and what it needs, not d
+    barrier.reset()
+    outputs, _ = run_stages(stages, until=["c"], max_workers=2)
+    assert set(outputs) == {"a", "b", "c"}
+
+    with pytest.raises(ValueError, match="needs the output of a"):
+        run_stages(stages, only=["c"])
+
+
+def test_watch_rebuilds_only_changed_partitions(tmp_path, monkeypatch):
+    import joblib
+
+    meta = generate_raw_dataset(tmp_path / "raw", n_seasons=2, n_leagues=2, teams_per_league=6)
+    outputs = {
+        "out_dir": tmp_path / "processed",
+        "root": tmp_path / "store",
+        "ratings_path": tmp_path / "elo.json",
+        "models_dir": tmp_path,
+        "predictions_path": tmp_path / "predictions.csv",
+    }
+    # season files are found by name, without the batch pipeline's prefix list
+    state = start_watch(meta["matchdata"], meta["raw_dir"], max_workers=1)
+    assert len(state["files"]) == 4  # 2 leagues x 2 seasons
+    untouched = state["results"][("E0", 2023)]
+
+    df_model = build_partitioned(load_raw(meta["matchdata"]), meta["raw_dir"], meta["season_prefixes"])["model_data"]
+    model = Pipeline([("scaler", StandardScaler()), ("clf", LogisticRegression())])
+    features = ["diff_avg_points_L5", "diff_avg_goals_for_L5"]
+    joblib.dump(model.fit(df_model[features].fillna(0), df_model["target"]), tmp_path / "logistic_regression.pkl")
+
+    # touching a file without changing it rebuilds nothing
+    assert poll(state, **outputs) is None
+    path = meta["raw_dir"] / "23_24_E1.csv"
+    path.touch()
+    assert poll(state, **outputs) is None
+
+    odds = pd.read_csv(path)
+    odds.loc[0, "B365H"] = 9.75
+    odds.to_csv(path, index=False)
+    update = poll(state, **outputs)
+
+    assert update["partitions"] == [("E1", 2024)]
+    assert state["results"][("E0", 2023)] is untouched
+
+    # a file caught mid-rewrite fails the poll without losing the change
+    snapshot = dict(state["snapshot"])
+    path.write_text("")
+    with pytest.raises(pd.errors.EmptyDataError):
+        poll(state, **outputs)
+    assert state["snapshot"] == snapshot
+
+    # a second change rewrites only the partitions whose content changed
+    stored = outputs["root"] / "all_matches_clean"
+    mtimes = {p: p.stat().st_mtime_ns for p in stored.rglob("part.csv")}
+    odds.loc[1, "B365H"] = 8.5
+    odds.to_csv(path, index=False)
+    poll(state, **outputs)
+    rewritten = {p for p, t in mtimes.items() if p.stat().st_mtime_ns != t}
+    assert {p.relative_to(stored).parts[:2] for p in rewritten} == {("league=E1", "season=2024")}
+
+    full = build_partitioned(load_raw(meta["matchdata"]), meta["raw_dir"], meta["season_prefixes"])
+    saved = pd.read_csv(outputs["out_dir"] / "all_matches_clean.csv")
+    assert (saved["odds_b365_home_win"] == 9.75).sum() == 1
+    assert (saved["odds_b365_home_win"] == 8.5).sum() == 1
+    assert len(saved) == len(full["all_matches_clean"])
+
+    predictions = pd.read_csv(outputs["predictions_path"])
+    assert len(predictions) == len(full["model_data"])
+    probs = predictions[["log_reg_p_away", "log_reg_p_draw", "log_reg_p_home"]].dropna()
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0)
+
+    # the watch loop logs a failed poll and keeps polling
+    import src.watch as watch_module
+
+    calls = []
+
+    def flaky_poll(state, **outputs):
+        calls.append(state)
+        if len(calls) == 1:
+            raise pd.errors.EmptyDataError("No columns to parse from file")
+        return poll(state, **outputs)
+
+    monkeypatch.setattr(watch_module, "poll", flaky_poll)
+    watch_module.watch(interval=0, max_polls=2, raw_file=meta["matchdata"], raw_dir=meta["raw_dir"],
+                       max_workers=1, **outputs)
+    assert len(calls) == 2
+
+
+def test_feed_ingestion_fetches_only_changed_files(tmp_path):
+    import hashlib
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    src_dir = tmp_path / "feed"
+    generate_raw_dataset(src_dir, n_seasons=2, n_leagues=1, teams_per_league=6)
+    names = ["22_23.csv", "23_24.csv"]
+    log = {"connections": 0, "requests": []}
+
+    class FeedHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def setup(self):
+            log["connections"] += 1
+            super().setup()
+
+        def do_GET(self):
+            body = (src_dir / self.path.rsplit("/", 1)[-1]).read_bytes()
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                log["requests"].append((self.path, 304))
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            log["requests"].append((self.path, 200))
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/feed/"
+    raw_dir = tmp_path / "raw"
+
+    try:
+        statuses, frames = ingest_feed(url, names, raw_dir, connections=1)
+        assert statuses == {"22_23.csv": 200, "23_24.csv": 200}
+        assert set(frames) == set(names) and frames["23_24.csv"]["season"].eq(2024).all()
+        assert (raw_dir / "23_24.csv").read_bytes() == (src_dir / "23_24.csv").read_bytes()
+
+        statuses, frames = ingest_feed(url, names, raw_dir, connections=1)
+        assert statuses == {"22_23.csv": 304, "23_24.csv": 304} and frames == {}
+
+        odds = pd.read_csv(src_dir / "23_24.csv")
+        odds.loc[0, "B365H"] = 9.75
+        odds.to_csv(src_dir / "23_24.csv", index=False)
+        statuses, frames = ingest_feed(url, names, raw_dir, connections=1)
+        assert statuses == {"22_23.csv": 304, "23_24.csv": 200}
+        assert frames["23_24.csv"]["odds_b365_home_win"].iloc[0] == 9.75
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # one pooled connection per poll serves both files
+    assert log["connections"] == 3 and len(log["requests"]) == 6
+
+    # with the feed down every file fails on its own and the local copies stay
+    accepted = (raw_dir / "23_24.csv").read_bytes()
+    statuses, frames = ingest_feed(url, names, raw_dir, connections=1)
+    assert statuses == {"22_23.csv": FEED_ERROR, "23_24.csv": FEED_ERROR} and frames == {}
+    assert (raw_dir / "23_24.csv").read_bytes() == accepted
+    run_feed(url, names, raw_dir, interval=0, max_polls=2, connections=1)
+
+
+def test_permutation_importance_matches_manual_shuffles(tmp_path, monkeypatch):
+    from sklearn.metrics import log_loss
 
-
+    df = load_model_data()
+    x = df.filter(regex="^diff_")
+    y = df["target"]
+    split_idx = int(len(df) * 0.8)
+    x_test, y_test = x.iloc[split_idx:].reset_index(drop=True), y.iloc[split_idx:].reset_index(drop=True)
+    model = LogisticRegression(max_iter=1000).fit(x.iloc[:split_idx], y.iloc[:split_idx])
+
+    table = permutation_importance(
+        {"LR": model}, x_test, y_test, {"LR": model.predict_proba(x_test)},
+        n_repeats=3, seed=1, n_jobs=2, out_path=tmp_path / "importance.txt",
+    )
+
+    # same row orders as permutation_importance draws: per column, then per repeat
+    rng = np.random.default_rng(1)
+    baseline = log_loss(y_test, model.predict_proba(x_test), labels=model.classes_)
+    for col in x_test.columns:
+        increases = []
+        for _ in range(3):
+            shuffled = x_test.copy()
+            shuffled[col] = x_test[col].to_numpy()[rng.permutation(len(x_test))]
+            increases.append(log_loss(y_test, model.predict_proba(shuffled), labels=model.classes_) - baseline)
+        row = table[table["feature"] == col].iloc[0]
+        assert row["log_loss_increase"] == pytest.approx(np.mean(increases), abs=1e-9)
+
+    assert len(table) == x_test.shape[1]
+    assert table["log_loss_increase"].is_monotonic_decreasing
+    assert (tmp_path / "importance.txt").exists()
+
+    # repeats predicted one per job give the same table; a forest predicts
+    # single-threaded inside the jobs without its own n_jobs being changed
+    from sklearn.ensemble import RandomForestClassifier
+    import src.models as models_module
+
+    rf = RandomForestClassifier(n_estimators=20, n_jobs=2, random_state=0).fit(x.iloc[:split_idx], y.iloc[:split_idx])
+    models = {"LR": model, "RF": rf}
+    baseline = {name: m.predict_proba(x_test) for name, m in models.items()}
+    args = dict(n_repeats=3, seed=1, n_jobs=2, out_path=tmp_path / "importance.txt")
+    stacked = permutation_importance(models, x_test, y_test, baseline, **args)
+    monkeypatch.setattr(models_module, "PERMUTATION_CHUNK_ROWS", len(x_test))
+    chunked = permutation_importance(models, x_test, y_test, baseline, **args)
+    pd.testing.assert_frame_equal(chunked, stacked)
+    assert rf.n_jobs == 2
+
+
+def test_online_model_updates_checkpoints_and_reconciles(tmp_path):
+    df = load_model_data()
+    features = [c for c in df.columns if c.startswith("diff_")]
+    state = new_online_model(features)
+
+    # weekly partial fits: the running standardizer equals a scaler fitted on every row
+    for _, week in df.iloc[:300].groupby(df["match_date"].iloc[:300].dt.to_period("W-SUN")):
+        partial_fit(state, week)
+    scaler = StandardScaler().fit(df[features].iloc[:300])
+    np.testing.assert_allclose(state["mean"], scaler.mean_)
+    np.testing.assert_allclose(state["m2"] / state["n_seen"], scaler.var_)
+
+    save_online_model(state, tmp_path / "online.json")
+    restored = load_online_model(tmp_path / "online.json")
+    np.testing.assert_allclose(predict_online(restored, df), predict_online(state, df))
+
+    # reconciliation moves the online model onto the batch refit
+    record = reconcile(state, df.iloc[:600])
+    batch = log_reg_pipeline().fit(df[features].iloc[:600], df["target"].iloc[:600])
+    np.testing.assert_allclose(predict_online(state, df), batch.predict_proba(df[features]), atol=1e-6)
+    assert record["online_log_loss"] > record["batch_log_loss"]
+
+    state, preds, update_s = walk_forward(df)
+    proba = preds[["p_away", "p_draw", "p_home"]].to_numpy()
+    assert len(preds) == len(df) - int(len(df) * 0.8)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+    assert len(state["reconciliations"]) == 1 + len(update_s) // state["params"]["reconcile_every"]
+
+
+def test_prediction_history_is_append_only_and_indexed(tmp_path):
+    db = tmp_path / "history.sqlite"
+    teams = pd.read_csv("data/processed/data_merged.csv", usecols=["match_id", "home_team", "away_team"])
+    df = load_model_data().iloc[-60:].merge(teams, on="match_id", how="left")
+    uniform = np.full((len(df), 3), 1 / 3)
+    skewed = np.tile([0.2, 0.3, 0.5], (len(df), 1))
+
+    runs = [("v1", uniform, "2025-01-01T00:00:00.000+00:00"), ("v2", skewed, "2025-01-08T00:00:00.000+00:00")]
+    for run in runs:
+        assert prediction_history.append_predictions(df, "m", *run, path=db) == len(df)
+    # the same (match_id, model_version, prediction_time) is not stored twice
+    assert prediction_history.append_predictions(df, "m", *runs[1], path=db) == 0
+
+    latest = prediction_history.latest_predictions(path=db)
+    assert len(latest) == len(df) and set(latest["model_version"]) == {"v2"}
+    assert np.allclose(latest[["p_away", "p_draw", "p_home"]], [0.2, 0.3, 0.5])
+    outcomes = df.set_index(df["match_id"].astype(str))["target"]
+    assert latest.set_index("match_id")["target"].eq(outcomes).all()
+
+    # an unplayed fixture is stored without an outcome, joined in once it is recorded
+    fixture = df.iloc[[-1]].assign(match_id="2099-01-01_a_b", target=np.nan)
+    assert prediction_history.append_predictions(fixture, "m", "v2", skewed[:1], path=db) == 1
+    assert prediction_history.latest_predictions([fixture["match_id"].iloc[0]], path=db)["target"].isna().all()
+    assert prediction_history.record_outcomes(fixture.assign(target=1), path=db) == 1
+    assert prediction_history.record_outcomes(fixture.assign(target=0), path=db) == 0
+    assert prediction_history.latest_predictions([fixture["match_id"].iloc[0]], path=db)["target"].tolist() == [1]
+
+    team, season = df.iloc[0]["home_team"], int(df.iloc[0]["season"])
+    played = df[((df["home_team"] == team) | (df["away_team"] == team)) & (df["season"] == season)]
+    out = prediction_history.team_predictions(team, season, path=db)
+    assert len(out) == 2 * len(played)
+    assert len(prediction_history.team_predictions(team, season, latest=True, path=db)) == len(played)
+
+    with closing(prediction_history.connect(db)) as con:
+        for table in ("predictions", "outcomes"):
+            with pytest.raises(sqlite3.DatabaseError, match="append-only"):
+                con.execute(f"DELETE FROM {table}")
+        plan = " ".join(
+            row[-1] for row in con.execute(
+                f"EXPLAIN QUERY PLAN {prediction_history.SELECT} WHERE "
+                "(p.home_team = ? AND p.season = ? OR p.away_team = ? AND p.season = ?) AND "
+                + prediction_history.LATEST,
+                [team, season, team, season],
+            )
+        )
+    assert "SCAN" not in plan and "idx_history_home" in plan and "idx_history_latest" in plan
+
+
+def test_feature_matrix_is_memory_mapped_and_shared_by_workers(tmp_path):
+    df = load_model_data()
+    manifest = write_feature_matrix(df, tmp_path)
+    x, y, _ = open_feature_matrix(tmp_path)
+
+    x_ref, _, _, y_train, y_test = chronological_split(df)
+    assert isinstance(x, np.memmap) and isinstance(y, np.memmap)
+    assert x.flags.c_contiguous and not x.flags.writeable
+    assert manifest["columns"] == x_ref.columns.tolist()
+    assert np.array_equal(x, x_ref.to_numpy())
+    assert np.array_equal(y, pd.concat([y_train, y_test]).to_numpy())
+
+    # tasks carry the location and row bounds, not the matrix
+    assert all(len(pickle.dumps(task)) < 200 for task in backtest_tasks(tmp_path, n_folds=3))
+
+    serial = backtest(tmp_path, n_folds=3, max_workers=1)
+    parallel = backtest(tmp_path, n_folds=3, max_workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert serial["test_rows"].sum() == len(x) - serial["train_rows"].iloc[0]